@@ -0,0 +1,159 @@
+"""Versiones async de las vistas de uso intensivo, para el despliegue ASGI (ml_platform/asgi.py).
+
+Validan la petición en el event loop y mandan el cálculo a un pool acotado: la
+predicción de spam a uno propio y las cargas, el entrenamiento y las métricas a
+otro, de modo que una subida grande no retrasa las predicciones. Las predicciones
+individuales concurrentes se agrupan en lotes con el micro-batcher. El parseo del
+cuerpo, la validación y el cálculo son los helpers de views.py que usan también
+las vistas síncronas, así que las dos rutas devuelven las mismas respuestas.
+"""
+import asyncio
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_GET, require_POST
+from rest_framework import status
+from rest_framework.utils.encoders import JSONEncoder
+from . import views
+from .micro_batcher import MicroBatcher
+from .offload import ExecutorSaturated, bulk_executor, predict_executor
+
+# Agrupa las predicciones individuales concurrentes en una pasada de predict_batch
+spam_batcher = (MicroBatcher('spam', views.spam_detector.predict_batch,
+                             settings.SPAM_MICRO_BATCH_WINDOW_MS / 1000, settings.SPAM_MICRO_BATCH_MAX_SIZE)
+                if settings.SPAM_MICRO_BATCH_WINDOW_MS > 0 else None)
+
+
+def _response(payload, status_code: int = status.HTTP_200_OK) -> JsonResponse:
+    """JSON con el mismo formato que el renderer de REST Framework (UTF-8, compacto)"""
+    return JsonResponse(payload, status=status_code, encoder=JSONEncoder, safe=False,
+                        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')})
+
+
+def _error(e, status_code: int) -> JsonResponse:
+    return _response({'error': str(e)}, status_code)
+
+
+@csrf_exempt
+@require_POST
+async def spam_predict(request):
+    """Detecta si un correo es spam usando el clasificador entrenado"""
+    try:
+        subject, body = views.spam_message(views.request_data(request))
+        if spam_batcher is not None:
+            result = await asyncio.wrap_future(spam_batcher.submit(subject, body))
+        else:
+            result = await predict_executor.run(views.spam_detector.predict, subject, body)
+        return _response(result)
+    except ValueError as e:
+        return _error(e, status.HTTP_400_BAD_REQUEST)
+    except ExecutorSaturated as e:
+        return _error(e, status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        return _error(e, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt
+@require_POST
+async def spam_predict_batch(request):
+    """Detecta spam en un lote de correos con una sola pasada vectorizada"""
+    try:
+        subjects, bodies = views.spam_messages(views.request_data(request))
+        return _response(await predict_executor.run(views.spam_batch_payload, subjects, bodies))
+    except ValueError as e:
+        return _error(e, status.HTTP_400_BAD_REQUEST)
+    except ExecutorSaturated as e:
+        return _error(e, status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        return _error(e, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# request.FILES parsea el multipart: también fuera del event loop
+def _train_spam(request) -> dict:
+    return views.spam_train_payload(views.uploaded_file(request))
+
+
+def _upload_dataset(request) -> dict:
+    return views.upload_dataset_payload(views.uploaded_file(request))
+
+
+@csrf_exempt
+@require_POST
+async def spam_train(request):
+    """Entrena el clasificador de spam con un CSV de mensajes etiquetados"""
+    try:
+        return _response(await bulk_executor.run(_train_spam, request))
+    except ValueError as e:
+        return _error(e, status.HTTP_400_BAD_REQUEST)
+    except ExecutorSaturated as e:
+        return _error(e, status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        return _error(e, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt
+@require_POST
+async def upload_dataset(request):
+    """Carga un dataset (CSV) para ser procesado"""
+    try:
+        return _response(await bulk_executor.run(_upload_dataset, request))
+    except ValueError as e:
+        return _error(e, status.HTTP_400_BAD_REQUEST)
+    except ExecutorSaturated as e:
+        return _error(e, status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        return _error(e, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# El ETag se resuelve en el pool junto con la respuesta: calcularlo lleva a sync() del
+# dataset, que tras una carga de otro worker mapea la nueva generación
+@condition(etag_func=views._dataset_info_etag, last_modified_func=views._dataset_last_modified)
+def _dataset_info(request) -> JsonResponse:
+    return _response(views.dataset_info_payload())
+
+
+@condition(etag_func=views._dataset_visualizations_etag, last_modified_func=views._dataset_last_modified)
+def _dataset_visualizations(request) -> JsonResponse:
+    sample_size, x_col, y_col = views.visualization_params(request.GET)
+    return _response(views.dataset_visualizations_payload(sample_size, x_col, y_col))
+
+
+@cache_control(no_cache=True)
+@require_GET
+async def dataset_info(request):
+    """Obtiene información del dataset NSL-KDD"""
+    try:
+        return await predict_executor.run(_dataset_info, request)
+    except ExecutorSaturated as e:
+        return _error(e, status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        return _error(e, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@cache_control(no_cache=True)
+@require_GET
+async def dataset_visualizations(request):
+    """Obtiene datos para visualizaciones del dataset NSL-KDD"""
+    try:
+        return await bulk_executor.run(_dataset_visualizations, request)
+    except ValueError as e:
+        return _error(e, status.HTTP_400_BAD_REQUEST)
+    except ExecutorSaturated as e:
+        return _error(e, status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        return _error(e, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@require_GET
+async def model_metrics(request):
+    """Obtiene métricas de evaluación de un modelo específico"""
+    try:
+        model_name, max_points = views.metrics_params(request.GET)
+        return _response(await bulk_executor.run(views.model_metrics_payload, model_name, max_points))
+    except ValueError as e:
+        return _error(e, status.HTTP_400_BAD_REQUEST)
+    except ExecutorSaturated as e:
+        return _error(e, status.HTTP_503_SERVICE_UNAVAILABLE)
+    except Exception as e:
+        return _error(e, status.HTTP_500_INTERNAL_SERVER_ERROR)
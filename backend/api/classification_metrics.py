@@ -0,0 +1,123 @@
+import numpy as np
+from typing import Dict, NamedTuple
+
+# Puntos por defecto de las curvas ROC y PR devueltas
+CURVE_POINTS = 50
+
+
+class ThresholdCounts(NamedTuple):
+    """Verdaderos y falsos positivos acumulados en cada umbral distinto (descendente)"""
+    thresholds: np.ndarray
+    true_positives: np.ndarray
+    false_positives: np.ndarray
+    positives: int
+    negatives: int
+
+
+def threshold_counts(scores: np.ndarray, labels: np.ndarray) -> ThresholdCounts:
+    """Una ordenación y dos sumas acumuladas dan TP/FP para todos los umbrales a la vez"""
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels).astype(bool)
+    if scores.shape != labels.shape:
+        raise ValueError('scores y labels deben tener la misma forma')
+    if len(scores) == 0:
+        raise ValueError('Se necesita al menos una predicción')
+
+    order = np.argsort(-scores, kind='stable')
+    sorted_scores = scores[order]
+    sorted_labels = labels[order]
+
+    # Último índice de cada grupo de scores empatados: un punto por umbral distinto
+    ends = np.append(np.flatnonzero(np.diff(sorted_scores)), len(scores) - 1)
+
+    true_positives = np.cumsum(sorted_labels, dtype=np.int64)[ends]
+    false_positives = (ends + 1) - true_positives
+    positives = int(labels.sum())
+    return ThresholdCounts(sorted_scores[ends], true_positives, false_positives,
+                           positives, len(labels) - positives)
+
+
+def confusion_matrix(labels: np.ndarray, predictions: np.ndarray, num_classes: int = 2) -> np.ndarray:
+    """Matriz de confusión (filas = real, columnas = predicho) con un único bincount"""
+    labels = np.asarray(labels, dtype=np.int64)
+    predictions = np.asarray(predictions, dtype=np.int64)
+    return np.bincount(labels * num_classes + predictions,
+                       minlength=num_classes * num_classes).reshape(num_classes, num_classes)
+
+
+def downsample_curve(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Índices de como mucho max_points puntos repartidos uniformemente a lo largo de la curva.
+
+    Se reparte por longitud de arco, así los tramos con mucha curvatura conservan
+    resolución y los rectos no gastan puntos; los extremos se mantienen siempre.
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    arc = np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))))
+    targets = np.linspace(0.0, arc[-1], max_points)
+    indices = np.minimum(np.searchsorted(arc, targets), n - 1)
+    indices[0], indices[-1] = 0, n - 1
+    return np.unique(indices)
+
+
+def binary_classification_report(scores: np.ndarray, labels: np.ndarray, threshold: float = 0.5,
+                                 max_points: int = CURVE_POINTS) -> Dict[str, object]:
+    """Métricas, matriz de confusión y curvas ROC/PR de un clasificador binario (1 = positivo)"""
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels).astype(bool)
+    counts = threshold_counts(scores, labels)
+
+    # Curva ROC desde (0, 0)
+    tps = np.concatenate(([0], counts.true_positives))
+    fps = np.concatenate(([0], counts.false_positives))
+    tpr = _rate(tps, counts.positives)
+    fpr = _rate(fps, counts.negatives)
+    # Área por la regla del trapecio (indefinida si solo hay una clase)
+    auc = None
+    if counts.positives and counts.negatives:
+        auc = round(float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)), 4)
+
+    # Umbral óptimo por el índice de Youden (máximo de TPR - FPR); el punto (0, 0) no tiene umbral
+    optimal_threshold = float(counts.thresholds[int(np.argmax((tpr - fpr)[1:]))])
+
+    # Curva precisión-recall y precisión media (suma escalonada, como average_precision_score)
+    predicted = counts.true_positives + counts.false_positives
+    precision_curve = counts.true_positives / np.maximum(predicted, 1)
+    recall_curve = _rate(counts.true_positives, counts.positives)
+    average_precision = float(np.sum(np.diff(np.concatenate(([0.0], recall_curve))) * precision_curve))
+
+    # Métricas al umbral de decisión
+    predictions = scores >= threshold
+    matrix = confusion_matrix(labels, predictions)
+    (tn, fp), (fn, tp) = matrix.tolist()
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    accuracy = (tp + tn) / len(labels) if len(labels) else 0.0
+
+    roc_points = downsample_curve(fpr, tpr, max_points)
+    pr_points = downsample_curve(recall_curve, precision_curve, max_points)
+    return {
+        'precision': round(precision, 4),
+        'recall': round(recall, 4),
+        'f1_score': round(f1, 4),
+        'accuracy': round(accuracy, 4),
+        'matriz_confusion': matrix.tolist(),
+        'curva_roc': {
+            'fpr': fpr[roc_points].tolist(),
+            'tpr': tpr[roc_points].tolist(),
+            'auc': auc,
+            'umbral_optimo': round(optimal_threshold, 4)
+        },
+        'curva_pr': {
+            'precision': precision_curve[pr_points].tolist(),
+            'recall': recall_curve[pr_points].tolist(),
+            'precision_media': round(average_precision, 4)
+        },
+        'muestras': len(labels)
+    }
+
+
+def _rate(counts: np.ndarray, total: int) -> np.ndarray:
+    return counts / total if total else np.zeros(len(counts))
@@ -0,0 +1,251 @@
+import os
+import re
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+from .storage import ARTIFACT_FILE_MODE, PathLike, atomic_write_json, exclusive_lock, read_json
+from .streaming_stats import FeatureStatsAccumulator
+
+# Versión del formato del manifiesto
+STORE_FORMAT_VERSION = 1
+
+# Una columna de texto pasa a category si tiene como mucho este número de valores distintos...
+MAX_CATEGORY_CARDINALITY = 10_000
+# ...y estos no superan esta fracción de las filas (si casi todos son únicos no compensa)
+MAX_CATEGORY_RATIO = 0.5
+
+# Mayor magnitud de un float que se puede convertir a int64 sin desbordar
+INT64_LIMIT = 2.0 ** 63
+
+# Intentos para reservar un número de generación cuando otro proceso publica a la vez
+MAX_GENERATION_RETRIES = 20
+
+# Generaciones que se conservan en disco (la actual y la anterior, que otro proceso puede tener abierta)
+KEPT_GENERATIONS = 2
+
+# Tipos de columna en el manifiesto
+KIND_NUMERIC, KIND_CATEGORY, KIND_TEXT = 'numerica', 'categoria', 'texto'
+
+GENERATION_RE = re.compile(r'^gen-(?P<number>\d+)$')
+
+# Archivo de lock entre procesos con el que se avanza current.json y se podan generaciones
+PUBLISH_LOCK_NAME = '.publish.lock'
+
+# Arrays del acumulador de estadísticas guardados junto a las columnas
+STATS_FIELDS = ('count', 'mean', 'm2', 'comoment', 'minimum', 'maximum')
+
+
+class StoredDataset(NamedTuple):
+    """Dataset leído del almacén: filas, metadatos de la carga y estadísticas acumuladas"""
+    dataframe: pd.DataFrame
+    metadata: dict
+    stats: Optional[FeatureStatsAccumulator]
+    generation: int
+    # Momento de publicación de la generación (el mismo para todos los procesos que la leen)
+    published_at: datetime
+
+
+def normalize_dtypes(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Tipos compactos: texto de baja cardinalidad a category y numéricos al menor tipo sin pérdida"""
+    columns = {}
+    for col in dataframe.columns:
+        column = dataframe[col]
+        if pd.api.types.is_bool_dtype(column) or isinstance(column.dtype, pd.CategoricalDtype):
+            columns[col] = column
+        elif pd.api.types.is_integer_dtype(column):
+            columns[col] = pd.to_numeric(column, downcast='integer')
+        elif pd.api.types.is_float_dtype(column):
+            columns[col] = _downcast_float(column)
+        elif pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column):
+            distinct = column.nunique(dropna=True)
+            if distinct <= MAX_CATEGORY_CARDINALITY and distinct <= max(1, len(column) * MAX_CATEGORY_RATIO):
+                columns[col] = column.astype('category')
+            else:
+                columns[col] = column
+        else:
+            columns[col] = column
+    return pd.DataFrame(columns, index=dataframe.index)
+
+
+def _downcast_float(column: pd.Series) -> pd.Series:
+    """Enteros guardados como float (sin NaN) a entero; si no, float32 solo cuando no pierde precisión"""
+    values = column.to_numpy()
+    finite = np.isfinite(values)
+    # Fuera del rango de int64 la conversión desborda en silencio: se queda en float
+    if (finite.all() and len(values) and np.abs(values).max() < INT64_LIMIT
+            and np.array_equal(values, np.round(values))):
+        return pd.to_numeric(column.astype(np.int64), downcast='integer')
+    narrowed = values.astype(np.float32)
+    if np.array_equal(narrowed.astype(values.dtype), values, equal_nan=True):
+        return pd.Series(narrowed, index=column.index, name=column.name)
+    return column
+
+
+def memory_bytes(dataframe: pd.DataFrame) -> int:
+    """Memoria ocupada por el DataFrame, incluido el contenido de las cadenas"""
+    return int(dataframe.memory_usage(deep=True).sum())
+
+
+class ColumnarStore:
+    """Almacén en disco del dataset cargado: un .npy por columna y un manifiesto.
+
+    Cada carga escribe una generación completa en un directorio temporal, la
+    publica con un rename atómico y después avanza current.json (nunca hacia
+    atrás), así que un lector siempre ve una generación entera. Las columnas
+    categóricas se guardan como códigos enteros y sus categorías en el
+    manifiesto. Recargar es mapear
+    los archivos: no hay que volver a parsear el CSV, y todos los workers que
+    mapean la misma generación comparten una sola copia en la caché de páginas.
+    """
+
+    def __init__(self, root: PathLike):
+        self.root = Path(root)
+
+    def save(self, dataframe: pd.DataFrame, metadata: dict,
+             stats: Optional[FeatureStatsAccumulator] = None) -> int:
+        """Publica el DataFrame (ya normalizado) como nueva generación y devuelve su número"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=self.root, prefix='.staging-'))
+        try:
+            manifest_columns = [self._write_column(staging, index, dataframe[col])
+                                for index, col in enumerate(dataframe.columns)]
+            if stats is not None:
+                for field in STATS_FIELDS:
+                    self._save_array(staging / f'stats-{field}.npy', getattr(stats, field))
+
+            # Reservar generación: rename de un directorio es atómico y falla si ya existe
+            for _ in range(MAX_GENERATION_RETRIES):
+                generation = self._next_generation()
+                manifest = {
+                    'formato': STORE_FORMAT_VERSION,
+                    'generacion': generation,
+                    'filas': len(dataframe),
+                    'columnas': manifest_columns,
+                    'estadisticas': list(stats.columns) if stats is not None else None,
+                    'publicado': datetime.now(timezone.utc).isoformat(),
+                    'metadatos': metadata
+                }
+                atomic_write_json(staging / 'manifest.json', manifest)
+                os.chmod(staging, 0o755)
+                try:
+                    os.rename(staging, self.root / f'gen-{generation:06d}')
+                    break
+                except OSError:
+                    continue
+            else:
+                raise RuntimeError('No se pudo reservar un número de generación para el dataset')
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging, ignore_errors=True)
+
+        # current.json solo avanza: si otro proceso publicó ya una generación mayor, esta
+        # queda como anterior y no se poda nada (lo hará quien publicó la mayor)
+        with exclusive_lock(self.root / PUBLISH_LOCK_NAME):
+            current = self.current_generation()
+            if current is None or generation > current:
+                atomic_write_json(self._current_path(), {'generacion': generation})
+                self._prune(generation)
+        return generation
+
+    def current_generation(self) -> Optional[int]:
+        pointer = read_json(self._current_path())
+        return pointer['generacion'] if pointer is not None else None
+
+    def pointer_stamp(self) -> Optional[Tuple[int, int]]:
+        """Marca (mtime, inodo) de current.json: cambia cada vez que se publica una generación"""
+        try:
+            stat = os.stat(self._current_path())
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino)
+
+    def load(self, generation: Optional[int] = None) -> Optional[StoredDataset]:
+        """Lee una generación (por defecto la actual); las columnas se abren mapeadas en memoria"""
+        if generation is None:
+            generation = self.current_generation()
+            if generation is None:
+                return None
+        directory = self.root / f'gen-{generation:06d}'
+        manifest = read_json(directory / 'manifest.json')
+        if manifest is None or manifest.get('formato') != STORE_FORMAT_VERSION:
+            return None
+
+        columns = {}
+        for entry in manifest['columnas']:
+            values = np.load(directory / entry['archivo'], mmap_mode='r')
+            if entry['tipo'] == KIND_NUMERIC:
+                columns[entry['nombre']] = values
+            else:
+                categorical = pd.Categorical.from_codes(values, categories=entry['categorias'])
+                columns[entry['nombre']] = (categorical if entry['tipo'] == KIND_CATEGORY
+                                            else np.asarray(categorical, dtype=object))
+        # copy=False: cada columna sigue siendo la vista de solo lectura del archivo mapeado,
+        # así que los procesos que cargan la misma generación comparten las páginas en memoria
+        dataframe = pd.DataFrame(columns, columns=[entry['nombre'] for entry in manifest['columnas']],
+                                 copy=False)
+
+        stats = None
+        if manifest['estadisticas'] is not None:
+            stats = FeatureStatsAccumulator(manifest['estadisticas'])
+            for field in STATS_FIELDS:
+                setattr(stats, field, np.load(directory / f'stats-{field}.npy'))
+        if 'publicado' in manifest:
+            published_at = datetime.fromisoformat(manifest['publicado'])
+        else:
+            # Manifiestos anteriores al campo: la fecha del propio archivo
+            published_at = datetime.fromtimestamp((directory / 'manifest.json').stat().st_mtime, timezone.utc)
+        return StoredDataset(dataframe, manifest['metadatos'], stats, generation, published_at)
+
+    def _write_column(self, directory: Path, index: int, column: pd.Series) -> dict:
+        entry = {'nombre': column.name, 'archivo': f'col-{index:04d}.npy'}
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            entry['tipo'] = KIND_CATEGORY
+            entry['categorias'] = column.cat.categories.tolist()
+            values = column.cat.codes.to_numpy()
+        elif pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+            entry['tipo'] = KIND_NUMERIC
+            values = column.to_numpy()
+        else:
+            # Texto de alta cardinalidad: mismos códigos + categorías, se reconstruye como object
+            codes, uniques = pd.factorize(column)
+            entry['tipo'] = KIND_TEXT
+            entry['categorias'] = [str(value) for value in uniques]
+            values = codes.astype(_code_dtype(len(uniques)))
+        entry['dtype'] = str(column.dtype)
+        self._save_array(directory / entry['archivo'], values)
+        return entry
+
+    def _save_array(self, path: Path, values: np.ndarray):
+        np.save(path, np.ascontiguousarray(values))
+        os.chmod(path, ARTIFACT_FILE_MODE)
+
+    def _generations(self) -> List[int]:
+        if not self.root.exists():
+            return []
+        return sorted(int(match.group('number')) for match in
+                      (GENERATION_RE.match(entry.name) for entry in self.root.iterdir()) if match)
+
+    def _next_generation(self) -> int:
+        generations = self._generations()
+        return (generations[-1] if generations else 0) + 1
+
+    def _prune(self, current: int):
+        """Borra las generaciones antiguas; los procesos que aún las mapean conservan sus páginas"""
+        for generation in self._generations():
+            if generation <= current - KEPT_GENERATIONS:
+                shutil.rmtree(self.root / f'gen-{generation:06d}', ignore_errors=True)
+
+    def _current_path(self) -> Path:
+        return self.root / 'current.json'
+
+
+def _code_dtype(size: int) -> np.dtype:
+    for dtype in (np.int8, np.int16, np.int32):
+        if size < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
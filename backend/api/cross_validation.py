@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import threading
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from .estimators import binary_targets, build_estimator
+from .storage import open_shared_array
+
+# Número de pliegues por defecto
+CV_FOLDS = 5
+
+# Procesos del pool compartido (uno por núcleo); se crea al primer uso
+PROCESS_POOL_WORKERS = os.cpu_count() or 1
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Pool de procesos reutilizado entre validaciones.
+
+    Se usa 'spawn': los trabajadores no heredan los hilos ni el estado del
+    servidor y solo importan este módulo y sus dependencias.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=PROCESS_POOL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _process_pool
+
+
+def fold_assignment(codes: np.ndarray, folds: int, random_state: int) -> np.ndarray:
+    """Pliegue de cada fila, estratificado: cada clase se reparte por turnos entre pliegues"""
+    rng = np.random.default_rng(random_state)
+    order = rng.permutation(len(codes))
+    order = order[np.argsort(codes[order], kind='stable')]
+    assignment = np.empty(len(codes), dtype=np.int8)
+    assignment[order] = np.arange(len(codes)) % folds
+    return assignment
+
+
+def evaluate_fold(features: np.ndarray, targets: np.ndarray, assignment: np.ndarray,
+                  fold: int, model_key: str, random_state: int) -> dict:
+    """Entrena con todos los pliegues salvo uno y mide la exactitud en el restante"""
+    start = time.perf_counter()
+    test = assignment == fold
+
+    model = build_estimator(model_key, random_state)
+    model.fit(features[~test], targets[~test])
+    accuracy = float(np.mean(model.predict(features[test]) == targets[test]))
+
+    return {
+        'pliegue': fold,
+        'exactitud': accuracy,
+        'muestras_prueba': int(test.sum()),
+        'tiempo_ms': (time.perf_counter() - start) * 1000,
+        'proceso': os.getpid()
+    }
+
+
+def _evaluate_fold_from_files(features_path: str, labels_path: str, negative_code: int, folds: int,
+                              fold: int, model_key: str, random_state: int) -> dict:
+    """Punto de entrada en el trabajador: solo recibe rutas, la matriz se mapea desde disco"""
+    features = open_shared_array(features_path)
+    codes = open_shared_array(labels_path)
+    assignment = fold_assignment(codes, folds, random_state)
+    return evaluate_fold(features, binary_targets(codes, negative_code), assignment,
+                         fold, model_key, random_state)
+
+
+def cross_validate(features: np.ndarray, codes: np.ndarray, negative_code: int, model_key: str,
+                   folds: int = CV_FOLDS, random_state: int = 42,
+                   paths: Optional[Tuple[str, str]] = None) -> dict:
+    """Validación cruzada k-fold estratificada.
+
+    Con paths (matriz y etiquetas en .npy) los pliegues se reparten por el pool de
+    procesos y cada trabajador mapea los archivos en lugar de recibir la matriz
+    serializada; sin ellos los pliegues se evalúan en este proceso.
+    """
+    if folds < 2:
+        raise ValueError('Se necesitan al menos 2 pliegues')
+    if len(codes) < folds:
+        raise ValueError('Hay menos filas que pliegues')
+
+    start = time.perf_counter()
+    if paths is not None:
+        executor = get_process_pool()
+        futures = [
+            executor.submit(_evaluate_fold_from_files, str(paths[0]), str(paths[1]), negative_code,
+                            folds, fold, model_key, random_state)
+            for fold in range(folds)
+        ]
+        results = [future.result() for future in futures]
+        workers = min(folds, PROCESS_POOL_WORKERS)
+    else:
+        assignment = fold_assignment(codes, folds, random_state)
+        targets = binary_targets(codes, negative_code)
+        results = [
+            evaluate_fold(features, targets, assignment, fold, model_key, random_state)
+            for fold in range(folds)
+        ]
+        workers = 1
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    scores = np.array([result['exactitud'] for result in results])
+    busy_ms = sum(result['tiempo_ms'] for result in results)
+    return {
+        'media': round(float(scores.mean()), 4),
+        'std': round(float(scores.std()), 4),
+        'scores': [round(score, 4) for score in scores.tolist()],
+        'pliegues': folds,
+        'tiempos_pliegue_ms': [round(result['tiempo_ms'], 1) for result in results],
+        'tiempo_total_ms': round(wall_ms, 1),
+        'trabajadores': workers,
+        'procesos_distintos': len({result['proceso'] for result in results}),
+        # Fracción del tiempo disponible (pared x trabajadores) que estuvieron entrenando
+        'utilizacion_trabajadores': round(busy_ms / (wall_ms * workers), 3) if wall_ms else 0.0
+    }
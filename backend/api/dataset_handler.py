@@ -1,114 +1,485 @@
+import hashlib
+import json
+import threading
+import time
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional
+from .cache import LRUCache
+from .columnar_store import ColumnarStore, memory_bytes, normalize_dtypes
+from .storage import PathLike
+from .streaming_stats import FeatureStatsAccumulator, ReservoirSample
+
+# Filas por bloque al leer un CSV en streaming
+CSV_CHUNK_SIZE = 50_000
+
+# Filas que se conservan en memoria (muestra uniforme) tras una carga en streaming
+MAX_ROWS_IN_MEMORY = 200_000
+
+# Puntos por defecto del scatter plot y tipos de ataque en los datos simulados
+SCATTER_SAMPLE_SIZE = 1000
+SCATTER_SIMULATED_TYPES = 5
+
+# Parámetros (log-media, log-desviación) de cada eje del scatter con los datos simulados
+SCATTER_SIMULATED_AXES = {'src_bytes': (7, 2), 'dst_bytes': (6, 2)}
+
+# Respuestas calculadas que se conservan por versión del dataset y parámetros
+PAYLOAD_CACHE_SIZE = 64
+
+# Perfil por tipo de ataque de las filas simuladas del NSL-KDD:
+# (protocolo, servicio, flag, log-media src_bytes, log-media dst_bytes, media de count,
+#  serror_rate, rerror_rate, wrong_fragment)
+SIMULATED_PROFILES = {
+    'normal': ('tcp', 'http', 'SF', 5.5, 7.0, 8, 0.01, 0.03, 0),
+    'neptune': ('tcp', 'private', 'S0', None, None, 180, 0.98, 0.02, 0),
+    'portsweep': ('tcp', 'private', 'REJ', None, None, 2, 0.05, 0.90, 0),
+    'ipsweep': ('icmp', 'eco_i', 'SF', 2.5, None, 1, 0.01, 0.02, 0),
+    'satan': ('tcp', 'other', 'REJ', 0.5, None, 20, 0.05, 0.70, 0),
+    'warezclient': ('tcp', 'ftp_data', 'SF', 8.0, None, 2, 0.01, 0.01, 0),
+    'teardrop': ('udp', 'private', 'SF', 5.0, None, 60, 0.01, 0.01, 3),
+    'nmap': ('icmp', 'ecr_i', 'SF', 3.0, None, 3, 0.10, 0.20, 0),
+}
+SIMULATED_DEFAULT_PROFILE = ('tcp', 'other', 'SF', 4.0, 4.0, 10, 0.10, 0.10, 0)
+
+# Valores alternativos que toman las columnas categóricas simuladas (ruido del 10%)
+SIMULATED_CATEGORIES = {
+    'protocol_type': ['tcp', 'udp', 'icmp'],
+    'service': ['http', 'private', 'domain_u', 'smtp', 'ftp_data', 'eco_i', 'ecr_i', 'other', 'telnet', 'ftp'],
+    'flag': ['SF', 'S0', 'REJ', 'RSTR', 'RSTO', 'SH'],
+}
+
+
+class DatasetSnapshot(NamedTuple):
+    """Estado publicado del dataset. No se modifica: cada carga construye uno nuevo"""
+    version: int
+    last_modified: datetime
+    using_custom_data: bool
+    dataframe: Optional[pd.DataFrame]
+    label_col: Optional[str]
+    total_records: int
+    attack_types: Dict[str, int]
+    feature_stats: List[dict]
+    # Estadísticas acumuladas al cargar (se sirven sin volver a recorrer las filas)
+    stats: Optional[FeatureStatsAccumulator]
+    generation: Optional[int]
+
 
 class DatasetHandler:
-    """Manejador del dataset NSL-KDD"""
+    """Manejador del dataset NSL-KDD.
     
-    def __init__(self):
-        self.using_custom_data = False
-        self.custom_dataframe = None
-        
+    Todo el estado visible está en un DatasetSnapshot inmutable. Las cargas lo
+    construyen aparte y lo publican cambiando una sola referencia, así que las
+    lecturas no toman locks y nunca ven una carga a medias: cada petición toma
+    el snapshot una vez y trabaja con él aunque entretanto se publique otro.
+    """
+    
+    def __init__(self, store_dir: Optional[PathLike] = None):
         # Datos simulados del NSL-KDD por defecto
-        self.total_records = 125973
-        
-        self.attack_types = {
-            'normal': 67343,
-            'neptune': 41214,
-            'portsweep': 10413,
-            'ipsweep': 3599,
-            'satan': 3633,
-            'warezclient': 890,
-            'teardrop': 892,
-            'nmap': 231
-        }
+        self._snapshot = DatasetSnapshot(
+            version=0,
+            last_modified=datetime.now(timezone.utc),
+            using_custom_data=False,
+            dataframe=None,
+            label_col=None,
+            total_records=125973,
+            attack_types={
+                'normal': 67343,
+                'neptune': 41214,
+                'portsweep': 10413,
+                'ipsweep': 3599,
+                'satan': 3633,
+                'warezclient': 890,
+                'teardrop': 892,
+                'nmap': 231
+            },
+            feature_stats=self._generate_feature_stats(),
+            stats=None,
+            generation=None
+        )
+        # Solo los que publican se serializan entre sí; las lecturas nunca lo toman
+        self._publish_lock = threading.Lock()
+        
+        # Respuestas memorizadas por versión del dataset
+        self._payload_cache = LRUCache(PAYLOAD_CACHE_SIZE)
         
-        # Estadísticas de características
-        self.feature_stats = self._generate_feature_stats()
+        # Almacén en disco del dataset cargado; al arrancar se recupera la última carga
+        self.store = ColumnarStore(store_dir) if store_dir is not None else None
+        self.restore_summary: Optional[dict] = None
+        # Marca de current.json vista por este proceso; si cambia, otro worker publicó una carga
+        self._store_stamp = None
+        self._sync_lock = threading.Lock()
+        if self.store is not None:
+            try:
+                self.restore_summary = self.restore()
+            except Exception as e:
+                # Un almacén ilegible no impide arrancar: se sigue con los datos simulados
+                self.restore_summary = {'error': f'Error al recuperar dataset: {str(e)}'}
+    
+    def snapshot(self) -> DatasetSnapshot:
+        """Estado actual del dataset (antes se sincroniza con el almacén compartido)"""
+        self.sync()
+        return self._snapshot
+    
+    @property
+    def version(self) -> int:
+        """Versión del dataset: cambia en cada carga e invalida las respuestas memorizadas"""
+        return self.snapshot().version
+    
+    @property
+    def last_modified(self) -> datetime:
+        return self.snapshot().last_modified
+    
+    def etag_token(self, snapshot: Optional[DatasetSnapshot] = None) -> str:
+        """Identifica el contenido publicado para los ETag.
+        
+        Con almacén es la generación, igual en todos los workers aunque hayan
+        arrancado en momentos distintos; la versión es un contador de cada proceso
+        y solo se usa sin almacén (o con los datos simulados, iguales en todos).
+        """
+        snapshot = snapshot or self.snapshot()
+        if snapshot.generation is not None:
+            return f'g{snapshot.generation}'
+        return f'v{snapshot.version}'
+    
+    def sync(self) -> bool:
+        """Adopta la generación que otro worker haya publicado en el almacén.
+        
+        Lo habitual es un os.stat de current.json que no cambió. Si cambió, un
+        hilo mapea las columnas de la nueva generación (sin parsear el CSV ni
+        copiar los datos) mientras el resto sigue con el snapshot anterior en vez
+        de esperarle. Devuelve True si se publicó una generación nueva.
+        """
+        if self.store is None:
+            return False
+        stamp = self.store.pointer_stamp()
+        if stamp == self._store_stamp:
+            return False
+        if not self._sync_lock.acquire(blocking=False):
+            return False
+        
+        try:
+            if stamp == self._store_stamp:
+                return False
+            self._store_stamp = stamp
+            if self.store.current_generation() == self._snapshot.generation:
+                return False
+            try:
+                self.restore_summary = self.restore()
+            except Exception as e:
+                # Se siguen sirviendo los datos anteriores; se reintenta con la próxima publicación
+                self.restore_summary = {'error': f'Error al recuperar dataset: {str(e)}'}
+                return False
+            return self.restore_summary is not None
+        finally:
+            self._sync_lock.release()
     
     def load_dataset(self, dataframe: pd.DataFrame) -> dict:
         """Carga un dataset personalizado desde un DataFrame"""
         try:
-            self.custom_dataframe = dataframe
-            self.using_custom_data = True
+            label_col = self._detect_label_column(dataframe.columns)
+            memory_before = memory_bytes(dataframe)
+            dataframe = normalize_dtypes(dataframe)
+            attack_types = dataframe[label_col].value_counts().to_dict()
+            stats = self._accumulate_stats(dataframe)
+            summary_memory = self._memory_summary(memory_before, dataframe)
+            # Publicar el nuevo estado de una vez; si algo falló se sigue con el anterior
+            snapshot = self._persist_and_publish(dataframe, len(dataframe), attack_types, label_col, stats)
             
-            # Detectar columna de etiquetas (última columna o columna 'label'/'class')
-            if 'label' in dataframe.columns:
-                label_col = 'label'
-            elif 'class' in dataframe.columns:
-                label_col = 'class'
-            elif 'attack_type' in dataframe.columns:
-                label_col = 'attack_type'
-            else:
-                # Asumir que la última columna es la etiqueta
-                label_col = dataframe.columns[-1]
+            return {
+                'registros': snapshot.total_records,
+                'caracteristicas': len(dataframe.columns) - 1,
+                'tipos_ataque': len(snapshot.attack_types),
+                'columna_etiqueta': label_col,
+                'tipos_encontrados': list(snapshot.attack_types.keys()),
+                'memoria': summary_memory,
+                'generacion_almacenada': snapshot.generation
+            }
+        except Exception as e:
+            raise Exception(f"Error al cargar dataset: {str(e)}")
+    
+    def load_csv_stream(self, source, chunksize: int = CSV_CHUNK_SIZE,
+                        max_rows_in_memory: int = MAX_ROWS_IN_MEMORY, random_state: int = 42) -> dict:
+        """Carga un CSV por bloques sin tenerlo entero en memoria.
+        
+        Los conteos por tipo de ataque y las estadísticas se actualizan bloque a bloque;
+        en memoria solo queda una muestra uniforme de como mucho max_rows_in_memory filas
+        (el archivo completo si es más pequeño).
+        """
+        try:
+            reader = pd.read_csv(source, chunksize=chunksize)
             
-            # Actualizar estadísticas
-            self.total_records = len(dataframe)
-            self.attack_types = dataframe[label_col].value_counts().to_dict()
-            self.feature_stats = self._generate_feature_stats_from_df(dataframe, label_col)
+            label_col = None
+            numeric_cols = []
+            stats = None
+            attack_counts = pd.Series(dtype=np.int64)
+            total_records = 0
+            num_chunks = 0
+            
+            sample = ReservoirSample(max_rows_in_memory, random_state)
+            
+            for chunk in reader:
+                if label_col is None:
+                    label_col = self._detect_label_column(chunk.columns)
+                    numeric_cols = list(chunk.select_dtypes(include=[np.number]).columns)
+                    stats = FeatureStatsAccumulator(numeric_cols)
+                
+                chunk.index = pd.RangeIndex(total_records, total_records + len(chunk))
+                total_records += len(chunk)
+                num_chunks += 1
+                
+                attack_counts = attack_counts.add(chunk[label_col].value_counts(), fill_value=0)
+                
+                values = chunk[numeric_cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+                stats.update(values)
+                
+                sample.update(chunk)
+            
+            if label_col is None:
+                raise ValueError('El archivo no contiene filas')
+            
+            attack_counts = attack_counts.astype(np.int64).sort_values(ascending=False)
+            attack_types = {key: int(value) for key, value in attack_counts.items()}
+            
+            # Tipos compactos y copia en disco antes de publicar el nuevo estado
+            sample = sample.values.sort_index()
+            memory_before = memory_bytes(sample)
+            sample = normalize_dtypes(sample)
+            summary_memory = self._memory_summary(memory_before, sample)
+            
+            # Publicar el nuevo estado solo cuando la lectura terminó sin errores
+            snapshot = self._persist_and_publish(sample, total_records, attack_types, label_col, stats)
             
             return {
-                'registros': self.total_records,
-                'caracteristicas': len(dataframe.columns) - 1,
-                'tipos_ataque': len(self.attack_types),
+                'registros': snapshot.total_records,
+                'caracteristicas': len(sample.columns) - 1,
+                'tipos_ataque': len(snapshot.attack_types),
                 'columna_etiqueta': label_col,
-                'tipos_encontrados': list(self.attack_types.keys())
+                'tipos_encontrados': list(snapshot.attack_types.keys()),
+                'bloques_procesados': num_chunks,
+                'filas_en_memoria': len(sample),
+                'muestra': len(sample) < snapshot.total_records,
+                'memoria': summary_memory,
+                'generacion_almacenada': snapshot.generation
             }
         except Exception as e:
-            self.using_custom_data = False
             raise Exception(f"Error al cargar dataset: {str(e)}")
     
+    def restore(self) -> Optional[dict]:
+        """Recupera la última carga guardada en el almacén (columnas mapeadas, sin parsear CSV)"""
+        if self.store is None:
+            return None
+        start = time.perf_counter()
+        self._store_stamp = self.store.pointer_stamp()
+        stored = self.store.load()
+        if stored is None:
+            return None
+        
+        metadata = stored.metadata
+        label_col = metadata['columna_etiqueta']
+        self._publish(
+            dataframe=stored.dataframe,
+            label_col=label_col,
+            total_records=metadata['total_registros'],
+            attack_types=metadata['distribucion'],
+            feature_stats=stored.stats.feature_stats(self._feature_columns(stored.stats.columns, label_col)),
+            stats=stored.stats,
+            generation=stored.generation,
+            last_modified=stored.published_at
+        )
+        return {
+            'generacion': stored.generation,
+            'filas_en_memoria': len(stored.dataframe),
+            'tiempo_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+    
+    def _persist_and_publish(self, dataframe: pd.DataFrame, total_records: int, attack_types: dict,
+                             label_col: str, stats: FeatureStatsAccumulator) -> DatasetSnapshot:
+        """Guarda la carga en el almacén (si hay) y la publica como nuevo snapshot.
+        
+        Con almacén, las filas publicadas son las columnas mapeadas de la generación
+        guardada: el proceso que cargó comparte la misma copia que el resto de workers.
+        """
+        changes = {
+            'label_col': label_col,
+            'total_records': total_records,
+            'attack_types': attack_types,
+            'feature_stats': stats.feature_stats(self._feature_columns(stats.columns, label_col)),
+            'stats': stats
+        }
+        if self.store is None:
+            return self._publish(dataframe=dataframe, generation=None, **changes)
+        
+        metadata = {
+            'total_registros': int(total_records),
+            'distribucion': {str(key): int(value) for key, value in attack_types.items()},
+            'columna_etiqueta': str(label_col)
+        }
+        # Con el lock de sync() tomado, las lecturas no intentan cargar esta generación a medio publicar
+        with self._sync_lock:
+            # La marca se toma antes de guardar: si otro worker publica a la vez, sync() lo detecta
+            self._store_stamp = self.store.pointer_stamp()
+            generation = self.store.save(dataframe, metadata, stats)
+            stored = self.store.load(generation)
+            return self._publish(dataframe=stored.dataframe, generation=generation,
+                                 last_modified=stored.published_at, **changes)
+    
+    def _memory_summary(self, before: int, dataframe: pd.DataFrame) -> dict:
+        """Huella en memoria de las filas tal como se parsearon y tras compactar los tipos"""
+        after = memory_bytes(dataframe)
+        return {
+            'antes_mb': round(before / 1024 ** 2, 2),
+            'despues_mb': round(after / 1024 ** 2, 2),
+            'reduccion_pct': round((1 - after / before) * 100, 1) if before else 0.0
+        }
+    
     def get_status(self) -> dict:
         """Retorna el estado actual del dataset"""
+        snapshot = self.snapshot()
         return {
-            'usando_datos_personalizados': self.using_custom_data,
-            'total_registros': self.total_records,
-            'tipos_ataque': len(self.attack_types),
-            'origen': 'Dataset personalizado' if self.using_custom_data else 'Datos de ejemplo (NSL-KDD simulado)'
+            'usando_datos_personalizados': snapshot.using_custom_data,
+            'total_registros': snapshot.total_records,
+            'tipos_ataque': len(snapshot.attack_types),
+            'origen': 'Dataset personalizado' if snapshot.using_custom_data else 'Datos de ejemplo (NSL-KDD simulado)',
+            'generacion_almacenada': snapshot.generation
         }
     
     def get_info(self) -> dict:
-        """Retorna información general del dataset"""
+        """Retorna información general del dataset (memorizada por versión)"""
+        snapshot = self.snapshot()
+        return self._payload_cache.get_or_compute(('info', snapshot.version),
+                                                  lambda: self._build_info(snapshot))
+    
+    def _build_info(self, snapshot: DatasetSnapshot) -> dict:
         return {
-            'total_registros': self.total_records,
-            'num_caracteristicas': len(self.custom_dataframe.columns) - 1 if self.using_custom_data else 42,
-            'tipos_ataque': len(self.attack_types),
-            'distribución_ataques': self.attack_types,
+            'total_registros': snapshot.total_records,
+            'num_caracteristicas': len(snapshot.dataframe.columns) - 1 if snapshot.using_custom_data else 42,
+            'tipos_ataque': len(snapshot.attack_types),
+            'distribución_ataques': snapshot.attack_types,
             'desbalanceado': True,
-            'descripción': 'Dataset personalizado cargado' if self.using_custom_data else 'NSL-KDD Dataset para detección de intrusiones en redes',
-            'usando_datos_personalizados': self.using_custom_data
+            'descripción': 'Dataset personalizado cargado' if snapshot.using_custom_data else 'NSL-KDD Dataset para detección de intrusiones en redes',
+            'usando_datos_personalizados': snapshot.using_custom_data
         }
     
-    def get_visualizations(self) -> dict:
-        """Retorna datos para visualizaciones"""
+    def get_visualizations(self, sample_size: int = SCATTER_SAMPLE_SIZE, x_col: Optional[str] = None,
+                           y_col: Optional[str] = None) -> dict:
+        """Retorna datos para visualizaciones (memorizados por versión y parámetros)"""
+        snapshot = self.snapshot()
+        x_col, y_col = self._scatter_axes(snapshot, x_col, y_col)
+        key = ('visualizations', snapshot.version, sample_size, x_col, y_col)
+        return self._payload_cache.get_or_compute(
+            key, lambda: self._build_visualizations(snapshot, sample_size, x_col, y_col)
+        )
+    
+    def _build_visualizations(self, snapshot: DatasetSnapshot, sample_size: int,
+                              x_col: Optional[str], y_col: Optional[str]) -> dict:
         return {
             'distribucion_ataques': [
-                {'tipo': tipo, 'cantidad': cantidad, 'porcentaje': round(cantidad/self.total_records*100, 2)}
-                for tipo, cantidad in self.attack_types.items()
+                {'tipo': tipo, 'cantidad': cantidad, 'porcentaje': round(cantidad/snapshot.total_records*100, 2)}
+                for tipo, cantidad in snapshot.attack_types.items()
             ],
-            'estadisticas_caracteristicas': self.feature_stats,
-            'correlaciones_principales': self._get_top_correlations(),
-            'scatter_data': self._generate_scatter_data()
+            'estadisticas_caracteristicas': snapshot.feature_stats,
+            'correlaciones_principales': self._get_top_correlations(snapshot),
+            'scatter_data': self._generate_scatter_data(snapshot, sample_size, x_col, y_col),
+            'scatter_ejes': {'x': x_col, 'y': y_col}
         }
     
-    def _generate_feature_stats_from_df(self, df: pd.DataFrame, label_col: str) -> List[dict]:
-        """Genera estadísticas de características desde un DataFrame real"""
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        numeric_cols = [col for col in numeric_cols if col != label_col]
-        
-        stats = []
-        for col in numeric_cols[:10]:  # Limitar a 10 características principales
-            stats.append({
-                'nombre': col,
-                'media': float(df[col].mean()),
-                'std': float(df[col].std()),
-                'min': float(df[col].min()),
-                'max': float(df[col].max())
-            })
+    def get_label_codes(self, snapshot: Optional[DatasetSnapshot] = None) -> tuple:
+        """Etiquetas del dataset cargado como códigos enteros y nombres de clase.
         
+        Con los datos simulados se usan las filas generadas por get_dataframe().
+        El resultado se memoriza por versión.
+        """
+        snapshot = snapshot or self.snapshot()
+        return self._payload_cache.get_or_compute(('labels', snapshot.version),
+                                                  lambda: self._build_label_codes(snapshot))
+    
+    def _build_label_codes(self, snapshot: DatasetSnapshot) -> tuple:
+        labels = self.get_dataframe(snapshot)[self.get_label_column(snapshot)]
+        if isinstance(labels.dtype, pd.CategoricalDtype):
+            codes, names = labels.cat.codes.to_numpy(), list(labels.cat.categories)
+        else:
+            codes, names = pd.factorize(labels, use_na_sentinel=False)
+        names = [str(name) for name in names]
+        
+        dtype = np.int16 if len(names) < np.iinfo(np.int16).max else np.int32
+        return codes.astype(dtype), names
+    
+    def get_label_column(self, snapshot: Optional[DatasetSnapshot] = None) -> str:
+        """Columna de etiquetas del DataFrame devuelto por get_dataframe()"""
+        snapshot = snapshot or self.snapshot()
+        return snapshot.label_col if snapshot.using_custom_data and snapshot.label_col else 'attack_type'
+    
+    def get_dataframe(self, snapshot: Optional[DatasetSnapshot] = None) -> pd.DataFrame:
+        """Filas del dataset cargado.
+        
+        Sin dataset personalizado se genera (una vez por versión y con semilla fija)
+        un NSL-KDD simulado con la distribución de attack_types, para que el
+        preprocesamiento y la evaluación trabajen siempre sobre filas reales.
+        """
+        snapshot = snapshot or self.snapshot()
+        if snapshot.using_custom_data and snapshot.dataframe is not None:
+            return snapshot.dataframe
+        return self._payload_cache.get_or_compute(
+            ('dataframe', snapshot.version),
+            lambda: self._generate_simulated_dataframe(attack_types=snapshot.attack_types)
+        )
+    
+    def fingerprint(self, snapshot: Optional[DatasetSnapshot] = None) -> str:
+        """Huella estable del contenido del dataset (igual en todos los procesos)"""
+        snapshot = snapshot or self.snapshot()
+        return self._payload_cache.get_or_compute(('fingerprint', snapshot.version),
+                                                  lambda: self._build_fingerprint(snapshot))
+    
+    def _build_fingerprint(self, snapshot: DatasetSnapshot) -> str:
+        if snapshot.using_custom_data and snapshot.dataframe is not None:
+            df = snapshot.dataframe
+            description = {
+                'columnas': [[str(col), str(dtype)] for col, dtype in df.dtypes.items()],
+                'filas_en_memoria': len(df),
+                'total_registros': snapshot.total_records,
+                'distribucion': {str(k): int(v) for k, v in snapshot.attack_types.items()},
+                'estadisticas': snapshot.feature_stats
+            }
+        else:
+            description = {'simulado': True, 'distribucion': snapshot.attack_types}
+        payload = json.dumps(description, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+    
+    def _publish(self, **changes) -> DatasetSnapshot:
+        """Publica un dataset personalizado como nuevo snapshot (nueva versión) con una asignación"""
+        # Las generaciones del almacén traen su fecha de publicación; sin almacén, ahora
+        changes.setdefault('last_modified', datetime.now(timezone.utc))
+        with self._publish_lock:
+            snapshot = self._snapshot._replace(
+                version=self._snapshot.version + 1,
+                using_custom_data=True,
+                **changes
+            )
+            self._snapshot = snapshot
+            self._payload_cache.clear()
+        return snapshot
+    
+    def _detect_label_column(self, columns) -> str:
+        """Detecta la columna de etiquetas (última columna o columna 'label'/'class')"""
+        for candidate in ('label', 'class', 'attack_type'):
+            if candidate in columns:
+                return candidate
+        # Asumir que la última columna es la etiqueta
+        return columns[-1]
+    
+    def _accumulate_stats(self, df: pd.DataFrame) -> FeatureStatsAccumulator:
+        """Alimenta el acumulador con las columnas numéricas de un DataFrame, por bloques"""
+        numeric_cols = list(df.select_dtypes(include=[np.number]).columns)
+        stats = FeatureStatsAccumulator(numeric_cols)
+        for start in range(0, len(df), CSV_CHUNK_SIZE):
+            stats.update(df[numeric_cols].iloc[start:start + CSV_CHUNK_SIZE].to_numpy(dtype=np.float64))
         return stats
     
+    def _feature_columns(self, numeric_cols: List[str], label_col: str) -> List[str]:
+        """Columnas numéricas mostradas en las estadísticas (máximo 10, sin la etiqueta)"""
+        return [col for col in numeric_cols if col != label_col][:10]
+    
     def _generate_feature_stats(self) -> List[dict]:
         """Genera estadísticas de características"""
         features = [
@@ -125,24 +496,67 @@ class DatasetHandler:
         ]
         return features
     
-    def _get_top_correlations(self) -> List[dict]:
+    def _generate_simulated_dataframe(self, random_state: int = 42,
+                                      attack_types: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+        """Genera filas NSL-KDD simuladas con un perfil de tráfico por tipo de ataque"""
+        if attack_types is None:
+            attack_types = self._snapshot.attack_types
+        rng = np.random.default_rng(random_state)
+        names = list(attack_types.keys())
+        counts = np.array(list(attack_types.values()), dtype=np.int64)
+        codes = rng.permutation(np.repeat(np.arange(len(names), dtype=np.int16), counts))
+        n = len(codes)
+        
+        profiles = [SIMULATED_PROFILES.get(name, SIMULATED_DEFAULT_PROFILE) for name in names]
+        
+        def per_class(field: int) -> np.ndarray:
+            return np.array([profile[field] for profile in profiles], dtype=object)[codes]
+        
+        def categorical(field: int, column: str) -> np.ndarray:
+            values = per_class(field)
+            noise = rng.random(n) < 0.1
+            values[noise] = rng.choice(SIMULATED_CATEGORIES[column], size=int(noise.sum()))
+            return values
+        
+        def log_bytes(field: int) -> np.ndarray:
+            means = np.array([np.nan if p[field] is None else p[field] for p in profiles])[codes]
+            values = np.floor(rng.lognormal(np.nan_to_num(means), 1.5))
+            return np.where(np.isnan(means), 0.0, values)
+        
+        def rate(field: int) -> np.ndarray:
+            means = np.array([profile[field] for profile in profiles])[codes]
+            return np.round(np.clip(means + rng.normal(0, 0.05, n), 0, 1), 2)
+        
+        count_means = np.array([profile[5] for profile in profiles], dtype=np.float64)[codes]
+        count = np.minimum(rng.poisson(count_means), 511)
+        serror_rate = rate(6)
+        rerror_rate = rate(7)
+        
+        return pd.DataFrame({
+            'duration': np.where(rng.random(n) < 0.08, np.floor(rng.exponential(600, n)), 0.0),
+            'protocol_type': categorical(0, 'protocol_type'),
+            'service': categorical(1, 'service'),
+            'flag': categorical(2, 'flag'),
+            'src_bytes': log_bytes(3),
+            'dst_bytes': log_bytes(4),
+            'wrong_fragment': np.array([profile[8] for profile in profiles])[codes],
+            'hot': rng.poisson(0.2, n),
+            'num_failed_logins': (rng.random(n) < 0.001).astype(np.int64),
+            'num_compromised': rng.poisson(0.05, n),
+            'count': count,
+            'srv_count': np.minimum(rng.poisson(np.maximum(count_means * 0.3, 1)), 511),
+            'serror_rate': serror_rate,
+            'srv_serror_rate': np.clip(serror_rate + rng.normal(0, 0.02, n).round(2), 0, 1),
+            'rerror_rate': rerror_rate,
+            'srv_rerror_rate': np.clip(rerror_rate + rng.normal(0, 0.02, n).round(2), 0, 1),
+            'attack_type': pd.Categorical.from_codes(codes, categories=names)
+        })
+    
+    def _get_top_correlations(self, snapshot: DatasetSnapshot) -> List[dict]:
         """Retorna las principales correlaciones"""
-        if self.using_custom_data and self.custom_dataframe is not None:
-            numeric_df = self.custom_dataframe.select_dtypes(include=[np.number])
-            if len(numeric_df.columns) >= 2:
-                corr_matrix = numeric_df.corr()
-                correlations = []
-                
-                for i in range(len(corr_matrix.columns)):
-                    for j in range(i+1, len(corr_matrix.columns)):
-                        correlations.append({
-                            'feature1': corr_matrix.columns[i],
-                            'feature2': corr_matrix.columns[j],
-                            'correlacion': float(corr_matrix.iloc[i, j])
-                        })
-                
-                correlations.sort(key=lambda x: abs(x['correlacion']), reverse=True)
-                return correlations[:4]
+        if snapshot.using_custom_data and snapshot.stats is not None:
+            if len(snapshot.stats.columns) >= 2:
+                return snapshot.stats.top_correlations(4)
         
         return [
             {'feature1': 'src_bytes', 'feature2': 'dst_bytes', 'correlacion': 0.73},
@@ -151,41 +565,63 @@ class DatasetHandler:
             {'feature1': 'rerror_rate', 'feature2': 'srv_rerror_rate', 'correlacion': 0.88},
         ]
     
-    def _generate_scatter_data(self) -> List[dict]:
-        """Genera datos para scatter plot"""
-        if self.using_custom_data and self.custom_dataframe is not None:
-            df = self.custom_dataframe
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
+    def _scatter_axes(self, snapshot: DatasetSnapshot, x_col: Optional[str], y_col: Optional[str]) -> tuple:
+        """Valida las columnas de los ejes del scatter y aplica los valores por defecto"""
+        if snapshot.using_custom_data and snapshot.dataframe is not None:
+            numeric_cols = [
+                col for col in snapshot.dataframe.select_dtypes(include=[np.number]).columns
+                if col != snapshot.label_col
+            ]
+        else:
+            numeric_cols = list(SCATTER_SIMULATED_AXES)
+        
+        if len(numeric_cols) < 2:
+            return None, None
+        
+        x_col = x_col or numeric_cols[0]
+        y_col = y_col or next(col for col in numeric_cols if col != x_col)
+        for col in (x_col, y_col):
+            if col not in numeric_cols:
+                raise ValueError(f'La columna {col} no es una característica numérica disponible')
+        if x_col == y_col:
+            raise ValueError('Los ejes x e y deben ser columnas distintas')
+        return x_col, y_col
+    
+    def _generate_scatter_data(self, snapshot: DatasetSnapshot, sample_size: int, x_col: Optional[str],
+                               y_col: Optional[str], random_state: int = 42) -> List[dict]:
+        """Genera datos para scatter plot con un muestreo vectorizado"""
+        # Generador local: no altera el estado global de NumPy que comparten otras peticiones
+        rng = np.random.default_rng(random_state)
+        
+        if snapshot.using_custom_data and snapshot.dataframe is not None:
+            if x_col is None:
+                return []
             
-            if len(numeric_cols) >= 2:
-                # Tomar muestra aleatoria para visualización
-                sample_size = min(len(df), 1000)
-                df_sample = df.sample(n=sample_size, random_state=42)
-                
-                # Detectar columna de etiqueta
-                label_col = 'label' if 'label' in df.columns else df.columns[-1]
-                
-                scatter_data = []
-                for _, row in df_sample.iterrows():
-                    scatter_data.append({
-                        'src_bytes': float(row[numeric_cols[0]]),
-                        'dst_bytes': float(row[numeric_cols[1]]),
-                        'tipo': str(row[label_col])
-                    })
-                
-                return scatter_data
-        
-        # Datos simulados por defecto
-        np.random.seed(42)
-        data = []
-        
-        for attack_type, count in list(self.attack_types.items())[:5]:
-            sample_size = min(count, 200)
-            for _ in range(sample_size):
-                data.append({
-                    'src_bytes': float(np.random.lognormal(7, 2)),
-                    'dst_bytes': float(np.random.lognormal(6, 2)),
-                    'tipo': attack_type
-                })
-        
-        return data
+            df = snapshot.dataframe
+            rows = rng.choice(len(df), size=min(len(df), sample_size), replace=False)
+            rows.sort()
+            # Se indexan primero las filas: solo la muestra se convierte a float64
+            x = df[x_col].iloc[rows].to_numpy(dtype=np.float64)
+            y = df[y_col].iloc[rows].to_numpy(dtype=np.float64)
+            tipos = df[snapshot.label_col].iloc[rows].to_numpy().astype(str)
+            
+            # Los NaN no son serializables en JSON
+            valid = ~(np.isnan(x) | np.isnan(y))
+            x, y, tipos = x[valid], y[valid], tipos[valid]
+        else:
+            # Datos simulados: una llamada por tipo de ataque para todos sus puntos
+            attack_types = list(snapshot.attack_types.items())[:SCATTER_SIMULATED_TYPES]
+            # El resto de la división se reparte entre los primeros tipos: una muestra
+            # menor que el número de tipos sigue devolviendo puntos
+            per_type, remainder = divmod(sample_size, max(len(attack_types), 1))
+            sizes = [min(count, per_type + (i < remainder)) for i, (_, count) in enumerate(attack_types)]
+            
+            # Cada eje con la distribución de su columna, sea cual sea el orden pedido
+            x = np.concatenate([rng.lognormal(*SCATTER_SIMULATED_AXES[x_col], size) for size in sizes])
+            y = np.concatenate([rng.lognormal(*SCATTER_SIMULATED_AXES[y_col], size) for size in sizes])
+            tipos = np.repeat([attack_type for attack_type, _ in attack_types], sizes)
+        
+        return [
+            {'src_bytes': x_value, 'dst_bytes': y_value, 'tipo': tipo}
+            for x_value, y_value, tipo in zip(x.tolist(), y.tolist(), tipos.tolist())
+        ]
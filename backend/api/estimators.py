@@ -0,0 +1,49 @@
+import numpy as np
+from typing import List
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+# Modelos que se pueden entrenar
+ESTIMATOR_KEYS = ('regresion_logistica', 'random_forest', 'gradient_boosting')
+
+# Nombres alternativos aceptados por el API
+MODEL_ALIASES = {
+    'logistic_regression': 'regresion_logistica',
+    'randomforest': 'random_forest',
+    'gradientboosting': 'gradient_boosting'
+}
+
+# Clase que se considera tráfico legítimo; el resto son ataques (positivos)
+NORMAL_CLASS = 'normal'
+
+
+def build_estimator(model_key: str, random_state: int = 42):
+    """Crea el clasificador sin entrenar asociado a una clave de modelo"""
+    if model_key == 'regresion_logistica':
+        return LogisticRegression(max_iter=200, random_state=random_state)
+    if model_key == 'random_forest':
+        # Un solo hilo por modelo: el paralelismo se reparte entre pliegues/procesos
+        return RandomForestClassifier(n_estimators=50, min_samples_leaf=2, n_jobs=1,
+                                      random_state=random_state)
+    if model_key == 'gradient_boosting':
+        return HistGradientBoostingClassifier(max_iter=100, random_state=random_state)
+    raise ValueError(f'Modelo desconocido: {model_key}')
+
+
+def resolve_model_key(name: str) -> str:
+    """Normaliza el nombre de modelo recibido a una de ESTIMATOR_KEYS"""
+    key = MODEL_ALIASES.get(name, name)
+    if key not in ESTIMATOR_KEYS:
+        raise ValueError(f'Modelo desconocido: {name}. Disponibles: {", ".join(ESTIMATOR_KEYS)}')
+    return key
+
+
+def negative_class_code(class_names: List[str]) -> int:
+    """Código de la clase normal (o de la primera clase si no hay una llamada 'normal')"""
+    names = [name.lower() for name in class_names]
+    return names.index(NORMAL_CLASS) if NORMAL_CLASS in names else 0
+
+
+def binary_targets(codes: np.ndarray, negative_code: int) -> np.ndarray:
+    """Etiquetas binarias normal (0) / ataque (1) a partir de los códigos de clase"""
+    return (np.asarray(codes) != negative_code).astype(np.uint8)
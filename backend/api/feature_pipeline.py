@@ -0,0 +1,227 @@
+import hashlib
+import json
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+from .storage import PathLike, atomic_write_json, read_json
+from .streaming_stats import ReservoirSample
+
+# Pasos del pipeline en orden de aplicación (claves de los tiempos medidos)
+PIPELINE_STEPS = ('imputacion', 'escalado_robusto', 'one_hot', 'minmax')
+
+# Filas muestreadas para estimar medianas y cuartiles; coincide con MAX_ROWS_IN_MEMORY
+# del DatasetHandler, así que sobre los datos en memoria los cuantiles son exactos
+QUANTILE_SAMPLE_SIZE = 200_000
+
+# Categorías más frecuentes que se codifican por columna; el resto queda a cero
+MAX_ONE_HOT_CATEGORIES = 100
+
+# Versión del formato del estado serializado
+STATE_FORMAT_VERSION = 1
+
+
+class FeaturePipeline:
+    """Pipeline ajustado: imputación por mediana, RobustScaler, one-hot y MinMax.
+
+    Los parámetros (medianas, rango intercuartílico, vocabularios y rangos finales)
+    se aprenden en una sola pasada por bloques con fit() y se serializan a JSON,
+    de modo que otro proceso puede transformar datos nuevos sin reajustar.
+    """
+
+    def __init__(self, numeric_columns: List[str], categorical_columns: List[str],
+                 medians: np.ndarray, scales: np.ndarray, vocabularies: Dict[str, List[str]],
+                 minimum: np.ndarray, data_range: np.ndarray, missing_counts: np.ndarray,
+                 rows: int, fingerprint: Optional[str] = None, fitted_at: Optional[str] = None):
+        self.numeric_columns = list(numeric_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.medians = np.asarray(medians, dtype=np.float64)
+        self.scales = np.asarray(scales, dtype=np.float64)
+        self.vocabularies = {col: list(vocabularies[col]) for col in self.categorical_columns}
+        self.minimum = np.asarray(minimum, dtype=np.float32)
+        self.data_range = np.asarray(data_range, dtype=np.float32)
+        self.missing_counts = np.asarray(missing_counts, dtype=np.int64)
+        self.rows = int(rows)
+        self.fingerprint = fingerprint
+        self.fitted_at = fitted_at or datetime.now(timezone.utc).isoformat()
+        self._digest = None
+
+    @property
+    def output_columns(self) -> List[str]:
+        return self.numeric_columns + [
+            f'{col}_{category}' for col in self.categorical_columns for category in self.vocabularies[col]
+        ]
+
+    @property
+    def num_output_features(self) -> int:
+        return len(self.numeric_columns) + sum(len(v) for v in self.vocabularies.values())
+
+    @classmethod
+    def fit(cls, chunks: Iterable[pd.DataFrame], numeric_columns: List[str],
+            categorical_columns: List[str], fingerprint: Optional[str] = None,
+            sample_size: int = QUANTILE_SAMPLE_SIZE, max_categories: int = MAX_ONE_HOT_CATEGORIES,
+            random_state: int = 42) -> 'FeaturePipeline':
+        """Ajusta todos los pasos en una sola pasada sobre los bloques de filas"""
+        numeric_columns = list(numeric_columns)
+        categorical_columns = list(categorical_columns)
+        size = len(numeric_columns)
+
+        rows = 0
+        missing = np.zeros(size, dtype=np.int64)
+        minimum = np.full(size, np.nan)
+        maximum = np.full(size, np.nan)
+        sample = ReservoirSample(sample_size, random_state)
+        category_counts = {col: pd.Series(dtype=np.int64) for col in categorical_columns}
+
+        for chunk in chunks:
+            rows += len(chunk)
+            values = chunk[numeric_columns].to_numpy(dtype=np.float64)
+            missing += np.isnan(values).sum(axis=0)
+            # fmin/fmax ignoran los NaN (solo dan NaN si la columna no tiene valores)
+            minimum = np.fmin(minimum, np.fmin.reduce(values, axis=0, initial=np.nan))
+            maximum = np.fmax(maximum, np.fmax.reduce(values, axis=0, initial=np.nan))
+            sample.update(values)
+
+            for col in categorical_columns:
+                counts = chunk[col].dropna().astype(str).value_counts()
+                category_counts[col] = category_counts[col].add(counts, fill_value=0)
+
+        # Mediana y cuartiles sobre la muestra; columnas sin valores quedan en 0 y escala 1
+        sample_values = sample.values if sample.values is not None else np.empty((0, size))
+        if len(sample_values):
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                q1, medians, q3 = np.nanquantile(sample_values, [0.25, 0.5, 0.75], axis=0)
+        else:
+            q1, medians, q3 = np.full((3, size), np.nan)
+        medians = np.nan_to_num(medians, nan=0.0)
+        scales = q3 - q1
+        scales = np.where(np.isfinite(scales) & (scales > 0), scales, 1.0)
+
+        # Vocabularios: las categorías más frecuentes (empates por nombre)
+        vocabularies = {}
+        for col in categorical_columns:
+            counts = category_counts[col]
+            ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:max_categories]
+            vocabularies[col] = [category for category, _ in ranked]
+
+        # Rango final de cada salida, derivado de los extremos sin necesidad de otra pasada
+        scaled_min = np.nan_to_num((minimum - medians) / scales, nan=0.0)
+        scaled_max = np.nan_to_num((maximum - medians) / scales, nan=0.0)
+        # La imputación introduce el valor de la mediana, que tras escalar es 0
+        imputed = missing > 0
+        scaled_min = np.where(imputed, np.minimum(scaled_min, 0.0), scaled_min)
+        scaled_max = np.where(imputed, np.maximum(scaled_max, 0.0), scaled_max)
+
+        one_hot_min = [
+            0.0 if category_counts[col][category] < rows else 1.0
+            for col in categorical_columns for category in vocabularies[col]
+        ]
+        out_min = np.concatenate([scaled_min, one_hot_min])
+        out_max = np.concatenate([scaled_max, np.ones(len(one_hot_min))])
+        data_range = out_max - out_min
+        data_range = np.where(data_range > 0, data_range, 1.0)
+
+        return cls(numeric_columns, categorical_columns, medians, scales, vocabularies,
+                   out_min, data_range, missing, rows, fingerprint)
+
+    def transform(self, dataframe: pd.DataFrame, timings: Optional[Dict[str, float]] = None,
+                  out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Aplica los cuatro pasos a un bloque y devuelve una matriz float32.
+
+        Si se pasa timings, se le suman los segundos empleados en cada paso.
+        """
+        clock = time.perf_counter()
+
+        def lap(step: str):
+            nonlocal clock
+            now = time.perf_counter()
+            if timings is not None:
+                timings[step] = timings.get(step, 0.0) + now - clock
+            clock = now
+
+        n = len(dataframe)
+        num_numeric = len(self.numeric_columns)
+
+        # 1. Imputación por mediana
+        values = dataframe[self.numeric_columns].to_numpy(dtype=np.float64, copy=True)
+        missing = np.isnan(values)
+        if missing.any():
+            np.copyto(values, np.broadcast_to(self.medians, values.shape), where=missing)
+        lap('imputacion')
+
+        # 2. Escalado robusto (mediana / rango intercuartílico)
+        values -= self.medians
+        values /= self.scales
+        lap('escalado_robusto')
+
+        # 3. One-hot sobre el vocabulario ajustado (categorías no vistas quedan a cero)
+        if out is None:
+            out = np.zeros((n, self.num_output_features), dtype=np.float32)
+        else:
+            out[:, num_numeric:] = 0
+        out[:, :num_numeric] = values
+
+        offset = num_numeric
+        row_index = np.arange(n)
+        for col in self.categorical_columns:
+            vocabulary = self.vocabularies[col]
+            column = dataframe[col]
+            codes = pd.Categorical(column.astype(str), categories=vocabulary).codes
+            present = (codes >= 0) & column.notna().to_numpy()
+            out[row_index[present], offset + codes[present]] = 1
+            offset += len(vocabulary)
+        lap('one_hot')
+
+        # 4. MinMax a [0, 1] con los rangos ajustados
+        out -= self.minimum
+        out /= self.data_range
+        lap('minmax')
+        return out
+
+    def digest(self) -> str:
+        """Huella de los parámetros ajustados (no depende de cuándo se ajustó)"""
+        if self._digest is None:
+            state = self.to_dict()
+            state.pop('ajustado_en')
+            payload = json.dumps(state, sort_keys=True).encode('utf-8')
+            self._digest = hashlib.sha256(payload).hexdigest()
+        return self._digest
+
+    def to_dict(self) -> dict:
+        return {
+            'formato': STATE_FORMAT_VERSION,
+            'huella_dataset': self.fingerprint,
+            'ajustado_en': self.fitted_at,
+            'filas': self.rows,
+            'columnas_numericas': self.numeric_columns,
+            'columnas_categoricas': self.categorical_columns,
+            'medianas': self.medians.tolist(),
+            'escalas': self.scales.tolist(),
+            'vocabularios': self.vocabularies,
+            'minimos': self.minimum.tolist(),
+            'rangos': self.data_range.tolist(),
+            'faltantes': self.missing_counts.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'FeaturePipeline':
+        if state.get('formato') != STATE_FORMAT_VERSION:
+            raise ValueError('Formato de estado del pipeline no soportado')
+        return cls(
+            state['columnas_numericas'], state['columnas_categoricas'], state['medianas'],
+            state['escalas'], state['vocabularios'], state['minimos'], state['rangos'],
+            state['faltantes'], state['filas'], state['huella_dataset'], state['ajustado_en']
+        )
+
+    def save(self, path: PathLike):
+        """Guarda el estado ajustado de forma atómica"""
+        atomic_write_json(path, self.to_dict())
+
+    @classmethod
+    def load(cls, path: PathLike) -> Optional['FeaturePipeline']:
+        """Carga un estado guardado o devuelve None si no existe"""
+        state = read_json(path)
+        return cls.from_dict(state) if state is not None else None
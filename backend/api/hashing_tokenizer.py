@@ -0,0 +1,90 @@
+import re
+import zlib
+import numpy as np
+import scipy.sparse as sp
+from typing import Iterable, List, Tuple
+
+# Tokens de dos o más caracteres alfanuméricos (mismo patrón que los vectorizadores de sklearn)
+TOKEN_RE = re.compile(r'(?u)\b\w\w+\b')
+
+# Columnas del espacio de tokens hasheado (independiente del tamaño del vocabulario)
+HASH_FEATURES = 2 ** 18
+
+# Índices de tokens pendientes antes de volcarlos a los conteos con un bincount
+ACCUMULATE_BUFFER_SIZE = 1 << 20
+
+
+class HashingTokenizer:
+    """Tokenizador que lleva cada token (o n-grama) a una columna fija por su hash.
+
+    Se usa crc32 y no hash(): el resultado no depende de PYTHONHASHSEED y es el
+    mismo en todos los procesos. No guarda vocabulario, así que la memoria solo
+    depende de n_features.
+    """
+
+    def __init__(self, n_features: int = HASH_FEATURES, ngram_range: Tuple[int, int] = (1, 1)):
+        low, high = ngram_range
+        if n_features < 1:
+            raise ValueError('n_features debe ser positivo')
+        if not 1 <= low <= high:
+            raise ValueError('ngram_range debe cumplir 1 <= mínimo <= máximo')
+        self.n_features = n_features
+        self.ngram_range = (low, high)
+
+    def tokens(self, text: str) -> List[str]:
+        """Tokens en minúsculas del mensaje y sus n-gramas unidos por espacios"""
+        words = TOKEN_RE.findall(text.lower())
+        low, high = self.ngram_range
+        if high == 1:
+            return words
+        tokens = words if low == 1 else []
+        for n in range(max(low, 2), high + 1):
+            tokens.extend(' '.join(words[i:i + n]) for i in range(len(words) - n + 1))
+        return tokens
+
+    def buckets(self, text: str) -> np.ndarray:
+        """Columna de cada token del mensaje (con repeticiones)"""
+        tokens = self.tokens(text)
+        hashes = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens),
+                             dtype=np.uint32, count=len(tokens))
+        return (hashes % self.n_features).astype(np.int32)
+
+    def transform(self, texts: Iterable[str]) -> sp.csr_matrix:
+        """Matriz dispersa (mensajes x columnas) con los conteos de cada token"""
+        rows = [self.buckets(text) for text in texts]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        indices = np.concatenate(rows) if rows else np.empty(0, dtype=np.int32)
+        matrix = sp.csr_matrix((np.ones(len(indices)), indices, indptr),
+                               shape=(len(rows), self.n_features))
+        matrix.sum_duplicates()
+        return matrix
+
+
+def accumulate_counts(tokenizer: HashingTokenizer, texts: Iterable[str], rows: Iterable[int],
+                      counts: np.ndarray) -> int:
+    """Suma a counts[row] los conteos de tokens de cada mensaje, leyendo uno a uno.
+
+    Los índices se acumulan en un buffer acotado y se vuelcan con un np.bincount
+    por fila, así que la memoria no crece con el corpus. Devuelve los mensajes leídos.
+    """
+    pending = [[] for _ in range(counts.shape[0])]
+    pending_size = 0
+    messages = 0
+
+    def flush():
+        for row, chunks in enumerate(pending):
+            if chunks:
+                counts[row] += np.bincount(np.concatenate(chunks), minlength=counts.shape[1])
+                chunks.clear()
+
+    for text, row in zip(texts, rows):
+        buckets = tokenizer.buckets(text)
+        pending[row].append(buckets)
+        pending_size += len(buckets)
+        messages += 1
+        if pending_size >= ACCUMULATE_BUFFER_SIZE:
+            flush()
+            pending_size = 0
+    flush()
+    return messages
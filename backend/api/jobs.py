@@ -0,0 +1,167 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# Trabajos que se ejecutan a la vez; el resto espera en cola
+MAX_CONCURRENT_JOBS = 2
+
+# Trabajos pendientes (en cola o ejecutándose) admitidos antes de rechazar nuevos
+MAX_PENDING_JOBS = 16
+
+# Trabajos terminados que se conservan para consultar su estado
+JOB_HISTORY_SIZE = 100
+
+# Estados de un trabajo
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = 'en_cola', 'ejecutando', 'completado', 'fallido', 'cancelado'
+# Cancelado pero con trabajo aún corriendo en otro proceso: sigue ocupando su plaza hasta que acabe
+CANCELLING = 'cancelando'
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Se lanza dentro de un trabajo cuando se solicitó su cancelación"""
+
+
+class JobQueueFull(Exception):
+    """No se admiten más trabajos hasta que terminen los pendientes"""
+
+
+class Job:
+    """Trabajo en segundo plano con progreso, tiempos y cancelación cooperativa"""
+
+    def __init__(self, kind: str, description: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.description = description
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = 'En cola'
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def mark_cancelling(self, message: str):
+        """Cancelación aceptada, pero el trabajo no se puede interrumpir y se espera a que termine"""
+        self.status = CANCELLING
+        self.message = message
+
+    def report(self, progress: float, message: Optional[str] = None):
+        """Actualiza el progreso (0-1); es también el punto donde se atiende la cancelación"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.progress = min(max(progress, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def elapsed(self) -> float:
+        """Segundos de ejecución (hasta ahora o hasta que terminó)"""
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.monotonic()) - self._started
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'tipo': self.kind,
+            'descripcion': self.description,
+            'estado': self.status,
+            'progreso': round(self.progress, 3),
+            'mensaje': self.message,
+            'creado': self.created_at.isoformat(),
+            'tiempo_transcurrido_s': round(self.elapsed(), 3),
+            'cancelacion_solicitada': self.cancel_requested,
+            'resultado': self.result,
+            'error': self.error
+        }
+
+
+class JobManager:
+    """Cola local de trabajos sobre un pool de hilos acotado"""
+
+    def __init__(self, max_workers: int = MAX_CONCURRENT_JOBS, max_pending: int = MAX_PENDING_JOBS,
+                 history_size: int = JOB_HISTORY_SIZE):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, description: str, func: Callable[[Job], Any]) -> Job:
+        """Encola func(job); su valor de retorno queda como resultado del trabajo"""
+        job = Job(kind, description)
+        with self._lock:
+            if self._pending_count() >= self.max_pending:
+                raise JobQueueFull('Demasiados trabajos pendientes, inténtelo más tarde')
+            self._jobs[job.id] = job
+            self._trim_history()
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Solicita la cancelación; un trabajo en cola ya no llega a ejecutarse"""
+        job = self.get(job_id)
+        if job is not None and job.status not in FINISHED_STATES:
+            job._cancel.set()
+            if job.status == QUEUED:
+                job.message = 'Cancelación solicitada'
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict.fromkeys((QUEUED, RUNNING, CANCELLING) + FINISHED_STATES, 0)
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return {**counts, 'concurrencia_maxima': self.max_workers}
+
+    def _run(self, job: Job, func: Callable[[Job], Any]):
+        job._started = time.monotonic()
+        try:
+            if job.cancel_requested:
+                raise JobCancelled()
+            job.status = RUNNING
+            job.message = 'Ejecutando'
+            job.result = func(job)
+            job.progress = 1.0
+            job.status = COMPLETED
+            job.message = 'Completado'
+        except JobCancelled:
+            job.status = CANCELLED
+            job.message = 'Cancelado'
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            job.message = 'Error'
+        finally:
+            job._finished = time.monotonic()
+
+    def _pending_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status not in FINISHED_STATES)
+
+    def _trim_history(self):
+        """Descarta los trabajos terminados más antiguos por encima de history_size"""
+        excess = len(self._jobs) - self.history_size
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]:
+            if excess <= 0:
+                break
+            del self._jobs[job_id]
+            excess -= 1
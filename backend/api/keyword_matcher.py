@@ -0,0 +1,169 @@
+import bisect
+import numpy as np
+from typing import Dict, List, Tuple
+
+# Bytes del prefijo con el que count_batch localiza en NumPy las palabras de esa longitud o más
+ANCHOR_BYTES = 4
+
+# Caracteres del lote a partir de los que compensa la pasada NumPy (~0,5 ms fijos) frente a
+# un str.find por palabra
+ANCHOR_MIN_LENGTH = 30_000
+
+# Hash multiplicativo (Knuth) de una ventana de 4 bytes a 16 bits
+_HASH_MULTIPLIER = np.uint32(2654435761)
+_HASH_SHIFT = np.uint32(16)
+
+
+class KeywordMatcher:
+    """Buscador compilado de palabras clave para varias listas a la vez.
+
+    Cada palabra distinta se busca una vez con la búsqueda de subcadenas de
+    CPython (en C) y se salta si falta alguna palabra más corta que contiene.
+    Una alternancia regex en una sola pasada resultó 2-4 veces más lenta: cada
+    posición y cada acierto vuelven a pasar por el motor de expresiones.
+    En los lotes grandes, las palabras de ANCHOR_BYTES bytes o más se localizan
+    todas en una sola pasada NumPy por su prefijo (_find_anchored).
+    """
+
+    def __init__(self, keyword_groups: Dict[str, List[str]]):
+        self.groups = list(keyword_groups.keys())
+
+        # Cada palabra distinta se busca una sola vez aunque aparezca en varias listas
+        # o repetida dentro de una lista; el orden por longitud permite la poda
+        self.keywords = sorted(
+            {keyword for keywords in keyword_groups.values() for keyword in keywords},
+            key=lambda keyword: (len(keyword), keyword)
+        )
+        position = {keyword: i for i, keyword in enumerate(self.keywords)}
+
+        # Cuántas veces suma cada palabra a cada grupo (las listas pueden tener duplicados)
+        self.weights = np.zeros((len(self.groups), len(self.keywords)), dtype=np.int64)
+        for g, keywords in enumerate(keyword_groups.values()):
+            for keyword in keywords:
+                self.weights[g, position[keyword]] += 1
+
+        # Palabras más cortas contenidas en cada palabra: si falta una, falta la mayor
+        self._contained = [
+            tuple(j for j in range(i) if self.keywords[j] in keyword)
+            for i, keyword in enumerate(self.keywords)
+        ]
+        self._entries = [
+            (keyword, self._contained[i] or None, tuple(int(w) for w in self.weights[:, i]))
+            for i, keyword in enumerate(self.keywords)
+        ]
+        self._zero = (0,) * len(self.groups)
+
+        # Palabras de al menos ANCHOR_BYTES bytes en UTF-8: en los lotes se buscan todas a
+        # la vez por su prefijo (entero de 4 bytes) en una tabla de hashes
+        encoded = [keyword.encode('utf-8', 'surrogatepass') for keyword in self.keywords]
+        self._anchored = [
+            (i, np.frombuffer(data, dtype=np.uint8), int.from_bytes(data[:ANCHOR_BYTES], 'little'))
+            for i, data in enumerate(encoded) if len(data) >= ANCHOR_BYTES
+        ]
+        prefixes = np.array([prefix for _, _, prefix in self._anchored], dtype=np.uint32)
+        self._prefix_table = np.zeros(1 << 16, dtype=bool)
+        self._prefix_table[_window_hash(prefixes)] = True
+
+    def count(self, text: str) -> Tuple[int, ...]:
+        """Devuelve, por grupo, cuántas palabras de la lista aparecen en el texto"""
+        found = [False] * len(self.keywords)
+        hits = []
+
+        for i, (keyword, contained, weights) in enumerate(self._entries):
+            if contained is not None and not all(found[j] for j in contained):
+                continue
+            if keyword in text:
+                found[i] = True
+                hits.append(weights)
+
+        if not hits:
+            return self._zero
+        return tuple(map(sum, zip(*hits)))
+
+    def count_batch(self, joined: str, starts: np.ndarray) -> np.ndarray:
+        """Cuenta por grupo y mensaje sobre un lote concatenado con separador '\\x00'"""
+        n = len(starts)
+        hits = np.zeros((len(self.keywords), n), dtype=bool)
+        if n == 0:
+            return self.weights @ hits
+
+        anchored = set()
+        if self._anchored and len(joined) >= ANCHOR_MIN_LENGTH:
+            self._find_anchored(joined, starts, hits)
+            anchored = {i for i, _, _ in self._anchored}
+
+        # Inicio de cada mensaje y del siguiente (el último termina en un separador virtual)
+        begins = starts.tolist()
+        next_starts = begins[1:] + [len(joined) + 1]
+
+        for i, keyword in enumerate(self.keywords):
+            if i in anchored:
+                continue
+            if not keyword:
+                hits[i] = True
+                continue
+            found = []
+            if self._contained[i]:
+                # Solo puede aparecer en los mensajes que tienen todas las palabras que contiene
+                candidates = np.flatnonzero(hits[list(self._contained[i])].all(axis=0)).tolist()
+                for segment in candidates:
+                    if joined.find(keyword, begins[segment], next_starts[segment] - 1) != -1:
+                        found.append(segment)
+            else:
+                # str.find recorre el lote en C; tras un acierto se salta al siguiente mensaje
+                position = joined.find(keyword)
+                while position != -1:
+                    segment = bisect.bisect_right(begins, position) - 1
+                    if position + len(keyword) < next_starts[segment]:
+                        found.append(segment)
+                    position = joined.find(keyword, next_starts[segment])
+            hits[i, found] = True
+
+        return self.weights @ hits
+
+    def _find_anchored(self, joined: str, starts: np.ndarray, hits: np.ndarray):
+        """Marca en hits los mensajes con cada palabra larga en una pasada NumPy por el lote.
+
+        Cada posición del texto en UTF-8 se lee como ventana de 4 bytes (vistas sin copia
+        con los cuatro desfases posibles) y la tabla de hashes descarta casi todas; las que
+        quedan se comparan con el prefijo de cada palabra y después con el resto de ella.
+        """
+        data = joined.encode('utf-8', 'surrogatepass')
+        codes = np.frombuffer(data, dtype=np.uint8)
+
+        positions = []
+        windows = []
+        for offset in range(ANCHOR_BYTES):
+            count = (len(data) - offset) // ANCHOR_BYTES
+            if count <= 0:
+                continue
+            window = np.frombuffer(data, dtype='<u4', offset=offset, count=count)
+            maybe = np.flatnonzero(self._prefix_table[_window_hash(window)])
+            positions.append(maybe * ANCHOR_BYTES + offset)
+            windows.append(window[maybe])
+        if not positions:
+            return
+        positions = np.concatenate(positions)
+        windows = np.concatenate(windows)
+
+        # De bytes a caracteres: los bytes de continuación (10xxxxxx) no empiezan carácter
+        if len(data) == len(joined):
+            char_positions = positions
+        else:
+            continuation = np.flatnonzero((codes & 0xC0) == 0x80)
+            char_positions = positions - np.searchsorted(continuation, positions)
+        ends = np.append(starts[1:] - 1, len(joined))
+
+        for i, keyword_codes, prefix in self._anchored:
+            selected = np.flatnonzero(windows == prefix)
+            selected = selected[positions[selected] + len(keyword_codes) <= len(codes)]
+            for j in range(ANCHOR_BYTES, len(keyword_codes)):
+                selected = selected[codes[positions[selected] + j] == keyword_codes[j]]
+            begin = char_positions[selected]
+            segments = np.searchsorted(starts, begin, side='right') - 1
+            # La palabra debe terminar dentro del mismo mensaje
+            hits[i, segments[begin + len(self.keywords[i]) <= ends[segments]]] = True
+
+
+def _window_hash(windows: np.ndarray) -> np.ndarray:
+    return (windows * _HASH_MULTIPLIER) >> _HASH_SHIFT
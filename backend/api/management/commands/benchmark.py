@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+from benchmarks import run
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta la suite de benchmarks (ver benchmarks/run.py) y opcionalmente la compara con una línea base'
+
+    def add_arguments(self, parser):
+        run.add_arguments(parser)
+
+    def handle(self, *args, **options):
+        if run.execute(options, out=self.stdout) != 0:
+            raise CommandError('Se detectaron regresiones respecto a la línea base')
@@ -0,0 +1,184 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# Límites superiores (segundos) de los buckets de latencia: 50 µs a ~100 s, factor √2
+LATENCY_BUCKETS = tuple(0.00005 * 2 ** (i / 2) for i in range(43))
+
+# Límites de los buckets de tamaño de lote: 1 a 1024 elementos, factor 2
+BATCH_SIZE_BUCKETS = tuple(float(2 ** i) for i in range(11))
+
+# Percentiles exportados de cada histograma
+EXPORTED_QUANTILES = (0.5, 0.95, 0.99)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Histograma de buckets fijos: registrar es un bisect y dos sumas bajo un lock"""
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        # Un bucket extra para los valores por encima del último límite (+Inf)
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+    def quantile(self, q: float, counts: List[int] = None) -> float:
+        """Percentil estimado interpolando linealmente dentro del bucket que lo contiene"""
+        if counts is None:
+            counts = self.snapshot()[0]
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        rank = q * total
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.bounds[-1]
+
+
+class MetricsRegistry:
+    """Registro en proceso de contadores e histogramas con salida en formato Prometheus"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._bounds: Dict[str, Tuple[float, ...]] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str, buckets: Tuple[float, ...] = None):
+        """Texto de ayuda (# HELP) de una métrica y, si no mide latencia, sus buckets"""
+        self._help[name] = help_text
+        if buckets is not None:
+            self._bounds[name] = buckets
+
+    def increment(self, name: str, amount: float = 1.0, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels: str):
+        self._histogram(name, tuple(sorted(labels.items()))).observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """Registra en el histograma name la duración del bloque (aunque lance una excepción)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def stage_hook(self, name: str, **labels: str) -> Callable[[str, float], None]:
+        """Callback (etapa, segundos) para los hooks de tiempo de los handlers"""
+        def hook(stage: str, seconds: float):
+            self.observe(name, seconds, etapa=stage, **labels)
+        return hook
+
+    def quantiles(self, name: str, **labels: str) -> Dict[str, float]:
+        """Percentiles exportados de una serie (útil para reportes y pruebas)"""
+        histogram = self._histogram(name, tuple(sorted(labels.items())))
+        counts = histogram.snapshot()[0]
+        return {f'p{int(q * 100)}': histogram.quantile(q, counts) for q in EXPORTED_QUANTILES}
+
+    def render_prometheus(self) -> str:
+        """Exposición en formato de texto de Prometheus (versión 0.0.4)"""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+
+        lines = []
+        for name in sorted(counters):
+            self._header(lines, name, 'counter')
+            for labels, value in sorted(counters[name].items()):
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+        for name in sorted(histograms):
+            self._header(lines, name, 'histogram')
+            quantile_lines = []
+            for labels, histogram in sorted(histograms[name].items()):
+                counts, total, count = histogram.snapshot()
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bounds, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", repr(bound)),))} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {count}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+                lines.append(f'{name}_count{_format_labels(labels)} {count}')
+                for q in EXPORTED_QUANTILES:
+                    quantile_labels = labels + (('quantile', str(q)),)
+                    quantile_lines.append(f'{name}_quantile{_format_labels(quantile_labels)} '
+                                          f'{_format_value(histogram.quantile(q, counts))}')
+            # Percentiles estimados desde los buckets, como gauge aparte
+            lines.append(f'# TYPE {name}_quantile gauge')
+            lines.extend(quantile_lines)
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _histogram(self, name: str, key: Labels) -> Histogram:
+        series = self._histograms.get(name)
+        histogram = series.get(key) if series is not None else None
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, {}).setdefault(
+                    key, Histogram(self._bounds.get(name, LATENCY_BUCKETS)))
+        return histogram
+
+    def _header(self, lines: List[str], name: str, metric_type: str):
+        if name in self._help:
+            lines.append(f'# HELP {name} {self._help[name]}')
+        lines.append(f'# TYPE {name} {metric_type}')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+
+# Registro compartido por el middleware, las vistas y los handlers del proceso
+registry = MetricsRegistry()
+registry.describe('http_requests_total', 'Peticiones atendidas por ruta, método y código de estado')
+registry.describe('http_request_errors_total', 'Peticiones que terminaron con un error de servidor (5xx)')
+registry.describe('http_request_duration_seconds', 'Latencia de las peticiones por ruta y método')
+registry.describe('handler_duration_seconds', 'Tiempo de las operaciones internas de los handlers')
+registry.describe('offload_queue_seconds', 'Espera en cola de las tareas enviadas a los pools de las vistas async')
+registry.describe('offload_rejected_total', 'Tareas rechazadas porque el pool tenía la cola llena')
+registry.describe('micro_batch_size', 'Predicciones individuales agrupadas en cada pasada del micro-batcher',
+                  buckets=BATCH_SIZE_BUCKETS)
+registry.describe('micro_batch_wait_seconds', 'Espera de cada predicción desde que llega hasta que se puntúa su lote')
+registry.describe('micro_batch_rejected_total', 'Predicciones rechazadas porque el micro-batcher tenía la cola llena')
@@ -0,0 +1,111 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, NamedTuple
+from .metrics import registry
+from .offload import ExecutorSaturated
+
+# Espera máxima (segundos) desde que llega la primera predicción hasta que se puntúa su lote
+MICRO_BATCH_WINDOW = 0.002
+
+# Predicciones por lote; al llegar a este número se puntúa sin esperar al final de la ventana
+MICRO_BATCH_MAX_SIZE = 256
+
+# Predicciones admitidas en cola; por encima se rechaza con 503 en lugar de acumular latencia
+MAX_PENDING_PREDICTIONS = 4096
+
+
+class _Pending(NamedTuple):
+    subject: str
+    body: str
+    future: Future
+    submitted: float
+
+
+class MicroBatcher:
+    """Agrupa predicciones individuales concurrentes en una sola pasada vectorizada.
+
+    Cada petición deja su correo en una cola y espera un Future. Un hilo propio
+    toma el primero, junta los que lleguen durante la ventana (o hasta llenar el
+    lote) y los puntúa con batch_func de una vez; después entrega a cada petición
+    su resultado. La espera añadida nunca supera la ventana: si el hilo estaba
+    ocupado y el primero ya la agotó, el lote sale con lo que haya en cola.
+    """
+
+    def __init__(self, name: str, batch_func: Callable[[List[str], List[str]], List[dict]],
+                 window: float = MICRO_BATCH_WINDOW, max_size: int = MICRO_BATCH_MAX_SIZE,
+                 max_pending: int = MAX_PENDING_PREDICTIONS):
+        self.name = name
+        self.window = window
+        self.max_size = max_size
+        self.max_pending = max_pending
+        self._batch_func = batch_func
+        self._queue = queue.SimpleQueue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, subject: str, body: str) -> Future:
+        """Encola un correo y devuelve el Future con su predicción"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                registry.increment('micro_batch_rejected_total', lote=self.name)
+                raise ExecutorSaturated(f'Servidor ocupado ({self.name}), inténtelo más tarde')
+            self._pending += 1
+            if self._worker is None:
+                # El hilo se arranca con la primera predicción, no al importar el módulo
+                self._worker = threading.Thread(target=self._run, name=f'micro-batch-{self.name}', daemon=True)
+                self._worker.start()
+        future = Future()
+        self._queue.put(_Pending(subject, body, future, time.perf_counter()))
+        return future
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def _run(self):
+        while True:
+            self._process(self._collect())
+
+    def _collect(self) -> List[_Pending]:
+        """Primer correo en cola más los que lleguen antes de cerrar su ventana"""
+        batch = [self._queue.get()]
+        deadline = batch[0].submitted + self.window
+        while len(batch) < self.max_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _process(self, batch: List[_Pending]):
+        started = time.perf_counter()
+        with self._lock:
+            self._pending -= len(batch)
+        # Los Future cancelados (cliente desconectado) no se puntúan
+        batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        registry.observe('micro_batch_size', len(batch), lote=self.name)
+        for item in batch:
+            registry.observe('micro_batch_wait_seconds', started - item.submitted, lote=self.name)
+
+        try:
+            results = self._batch_func([item.subject for item in batch], [item.body for item in batch])
+        except Exception:
+            # Un correo problemático no debe tumbar al resto: se puntúan uno a uno
+            # y solo falla la petición que lo envió
+            for item in batch:
+                self._process_one(item)
+            return
+        for item, result in zip(batch, results):
+            item.future.set_result(result)
+
+    def _process_one(self, item: _Pending):
+        try:
+            item.future.set_result(self._batch_func([item.subject], [item.body])[0])
+        except Exception as e:
+            item.future.set_exception(e)
@@ -0,0 +1,54 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from .metrics import registry
+
+# Etiqueta de las peticiones que no corresponden a ninguna ruta (404)
+UNMATCHED_ROUTE = 'sin_ruta'
+
+
+class RequestMetricsMiddleware:
+    """Mide latencia, número de peticiones y errores por ruta.
+
+    La ruta es el patrón de la URL (p. ej. api/model/train/<str:job_id>/), no la
+    ruta concreta, para que los ids no creen una serie por petición. Funciona en
+    modo síncrono (WSGI) y asíncrono (ASGI) sin que Django tenga que adaptarlo.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        except Exception:
+            self._record(request, 500, time.perf_counter() - start)
+            raise
+        self._record(request, response.status_code, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        except Exception:
+            self._record(request, 500, time.perf_counter() - start)
+            raise
+        self._record(request, response.status_code, time.perf_counter() - start)
+        return response
+
+    def _record(self, request, status_code: int, seconds: float):
+        match = request.resolver_match
+        route = match.route if match is not None else UNMATCHED_ROUTE
+        method = request.method
+        registry.observe('http_request_duration_seconds', seconds, ruta=route, metodo=method)
+        registry.increment('http_requests_total', ruta=route, metodo=method, estado=str(status_code))
+        if status_code >= 500:
+            registry.increment('http_request_errors_total', ruta=route, metodo=method)
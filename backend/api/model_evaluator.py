@@ -1,77 +1,162 @@
+import threading
+import zlib
 import numpy as np
-from typing import Dict, List
+from statistics import NormalDist
+from typing import Dict, Optional, Tuple
+from .cache import LRUCache
+from .classification_metrics import CURVE_POINTS, binary_classification_report
+from .cross_validation import CV_FOLDS, cross_validate
+from .dataset_handler import DatasetSnapshot
+from .estimators import ESTIMATOR_KEYS, negative_class_code
+from .jobs import FAILED, FINISHED_STATES, Job, JobManager, JobQueueFull
+from .preprocessing import DataPreprocessor
+
+# Conjunto de prueba simulado mientras un modelo no registre predicciones reales
+SIMULATED_TEST_SIZE = 17000
+SIMULATED_POSITIVE_RATE = 0.47
+
+# Reportes calculados que se conservan (por modelo y número de puntos de las curvas)
+REPORT_CACHE_SIZE = 32
+
+# Validaciones cruzadas que se conservan (por dataset, pipeline, modelo y semilla)
+CV_CACHE_SIZE = 16
+
 
 class ModelEvaluator:
     """Evaluador de modelos de ML"""
     
-    def __init__(self):
-        # Métricas simuladas de diferentes modelos
+    def __init__(self, preprocessor: Optional[DataPreprocessor] = None,
+                 job_manager: Optional[JobManager] = None):
+        # Preprocesador del dataset cargado (fuente de la validación cruzada)
+        self.preprocessor = preprocessor
+        # Cola donde corre la validación cruzada; sin ella se calcula en la llamada
+        self.job_manager = job_manager
+        
+        # Modelos conocidos; auc_simulado define sus scores de ejemplo
         self.models_data = {
-            'regresion_logistica': {
-                'nombre': 'Regresión Logística',
-                'precision': 0.92,
-                'recall': 0.89,
-                'f1_score': 0.90,
-                'accuracy': 0.91,
-                'matriz_confusion': [[8500, 450], [550, 7500]],
-                'curva_roc': self._generate_roc_curve(0.92)
-            },
-            'random_forest': {
-                'nombre': 'Random Forest',
-                'precision': 0.95,
-                'recall': 0.93,
-                'f1_score': 0.94,
-                'accuracy': 0.94,
-                'matriz_confusion': [[8700, 250], [350, 7700]],
-                'curva_roc': self._generate_roc_curve(0.96)
-            },
-            'gradient_boosting': {
-                'nombre': 'Gradient Boosting',
-                'precision': 0.94,
-                'recall': 0.91,
-                'f1_score': 0.92,
-                'accuracy': 0.93,
-                'matriz_confusion': [[8650, 300], [450, 7600]],
-                'curva_roc': self._generate_roc_curve(0.95)
-            }
+            'regresion_logistica': {'nombre': 'Regresión Logística', 'auc_simulado': 0.92},
+            'random_forest': {'nombre': 'Random Forest', 'auc_simulado': 0.96},
+            'gradient_boosting': {'nombre': 'Gradient Boosting', 'auc_simulado': 0.95}
         }
+        
+        # Scores (probabilidad de ataque) y etiquetas reales registrados por modelo
+        self.predictions: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._reports = LRUCache(REPORT_CACHE_SIZE)
+        # Cambia con cada registro: un cálculo en curso no puede guardar un reporte obsoleto
+        self._generation = 0
+        self._cv_cache = LRUCache(CV_CACHE_SIZE)
+        # Trabajo de validación cruzada en curso (o fallido) por clave
+        self._cv_jobs: Dict[tuple, Job] = {}
+        self._cv_lock = threading.Lock()
     
-    def get_metrics(self, model_name: str) -> dict:
+    def register_predictions(self, model_key: str, scores: np.ndarray, labels: np.ndarray,
+                             name: Optional[str] = None):
+        """Registra las predicciones de un modelo sobre su conjunto de prueba (1 = ataque)"""
+        scores = np.asarray(scores, dtype=np.float64)
+        labels = np.asarray(labels).astype(bool)
+        if scores.shape != labels.shape or scores.ndim != 1:
+            raise ValueError('scores y labels deben ser vectores de la misma longitud')
+        
+        entry = dict(self.models_data.get(model_key, {'nombre': model_key}))
+        if name:
+            entry['nombre'] = name
+        self.models_data[model_key] = entry
+        self.predictions[model_key] = (scores, labels)
+        self._generation += 1
+        self._reports.clear()
+    
+    def get_metrics(self, model_name: str, max_points: int = CURVE_POINTS) -> dict:
         """Obtiene métricas de un modelo específico"""
-        model_data = self.models_data.get(model_name, self.models_data['regresion_logistica'])
+        model_key = model_name if model_name in self.models_data else 'regresion_logistica'
+        model_data = self.models_data[model_key]
+        report = self._get_report(model_key, max_points)
         
         return {
             'modelo': model_data['nombre'],
             'metricas': {
-                'precision': model_data['precision'],
-                'recall': model_data['recall'],
-                'f1_score': model_data['f1_score'],
-                'exactitud': model_data['accuracy']
+                'precision': report['precision'],
+                'recall': report['recall'],
+                'f1_score': report['f1_score'],
+                'exactitud': report['accuracy']
             },
             'matriz_confusion': {
-                'valores': model_data['matriz_confusion'],
+                'valores': report['matriz_confusion'],
                 'etiquetas': ['Normal', 'Ataque']
             },
-            'curva_roc': model_data['curva_roc'],
-            'cross_validation': {
-                'media': model_data['accuracy'],
-                'std': 0.02,
-                'scores': [model_data['accuracy'] + np.random.uniform(-0.02, 0.02) for _ in range(5)]
-            }
+            'curva_roc': report['curva_roc'],
+            'curva_pr': report['curva_pr'],
+            'muestras_evaluadas': report['muestras'],
+            'predicciones_reales': model_key in self.predictions,
+            'cross_validation': (self.cross_validation_status(model_key)
+                                 if self.preprocessor and model_key in ESTIMATOR_KEYS else None)
         }
     
+    def cross_validation_status(self, model_key: str, folds: int = CV_FOLDS, random_state: int = 42) -> dict:
+        """Validación cruzada memorizada o, si aún no existe, el trabajo que la calcula.
+        
+        Ajustar el pipeline y entrenar k modelos tarda de segundos a minutos, así que
+        nunca se hace dentro de la petición: la primera consulta encola el trabajo y
+        devuelve su id; las siguientes reciben el resultado cuando esté en caché.
+        """
+        if self.job_manager is None:
+            return self.cross_validate(model_key, folds, random_state)
+        snapshot = self.preprocessor.dataset_handler.snapshot()
+        key = self._cv_key(model_key, folds, random_state, snapshot)
+        with self._cv_lock:
+            result = self._cv_cache.get(key)
+            if result is not None:
+                self._cv_jobs.pop(key, None)
+                return result
+            job = self._cv_jobs.get(key)
+            if job is not None and job.status == FAILED:
+                # Se informa del fallo una vez; la siguiente consulta lo reintenta
+                del self._cv_jobs[key]
+                return {'estado': 'fallido', 'trabajo_id': job.id, 'error': job.error}
+            if job is None or job.status in FINISHED_STATES:
+                # Los trabajos terminados de datasets anteriores ya no se consultan
+                for stale in [k for k, j in self._cv_jobs.items() if j.status in FINISHED_STATES]:
+                    del self._cv_jobs[stale]
+                try:
+                    job = self.job_manager.submit(
+                        'validacion_cruzada', f'Validación cruzada de {model_key}',
+                        lambda job: self.cross_validate(model_key, folds, random_state, snapshot)
+                    )
+                except JobQueueFull as e:
+                    return {'estado': 'no_disponible', 'error': str(e)}
+                self._cv_jobs[key] = job
+        return {'estado': 'pendiente', 'trabajo_id': job.id, 'estado_url': f'/api/model/train/{job.id}/'}
+    
+    def cross_validate(self, model_key: str, folds: int = CV_FOLDS, random_state: int = 42,
+                       snapshot: Optional[DatasetSnapshot] = None) -> dict:
+        """Validación cruzada k-fold del modelo sobre el dataset cargado (memorizada)"""
+        snapshot = snapshot or self.preprocessor.dataset_handler.snapshot()
+        key = self._cv_key(model_key, folds, random_state, snapshot)
+        
+        def compute():
+            matrix = self.preprocessor.get_feature_matrix(snapshot)
+            paths = (matrix.path, matrix.labels_path) if matrix.path is not None else None
+            return cross_validate(matrix.features, matrix.labels, negative_class_code(matrix.class_names),
+                                  model_key, folds, random_state, paths)
+        return self._cv_cache.get_or_compute(key, compute)
+    
+    def _cv_key(self, model_key: str, folds: int, random_state: int, snapshot: DatasetSnapshot) -> tuple:
+        # La huella del dataset determina el pipeline ajustado, así que basta como clave
+        return (self.preprocessor.dataset_handler.fingerprint(snapshot), model_key, folds, random_state)
+    
     def compare_models(self) -> dict:
         """Compara todos los modelos"""
         comparison = []
         
-        for model_key, model_data in self.models_data.items():
+        for model_key, model_data in list(self.models_data.items()):
+            report = self._get_report(model_key, CURVE_POINTS)
             comparison.append({
                 'modelo': model_data['nombre'],
                 'clave': model_key,
-                'precision': model_data['precision'],
-                'recall': model_data['recall'],
-                'f1_score': model_data['f1_score'],
-                'exactitud': model_data['accuracy']
+                'precision': report['precision'],
+                'recall': report['recall'],
+                'f1_score': report['f1_score'],
+                'exactitud': report['accuracy'],
+                'auc': report['curva_roc']['auc']
             })
         
         # Ordenar por F1-score
@@ -83,23 +168,27 @@ class ModelEvaluator:
             'criterio': 'F1-Score'
         }
     
-    def _generate_roc_curve(self, auc_target: float) -> Dict[str, List[float]]:
-        """Genera una curva ROC simulada"""
-        # Generar puntos de la curva ROC
-        n_points = 50
-        fpr = np.linspace(0, 1, n_points)
-        
-        # Generar TPR que resulte en el AUC deseado
-        tpr = np.power(fpr, 0.5) * (auc_target / 0.85)
-        tpr = np.clip(tpr, 0, 1)
-        
-        # Asegurar que empiece en (0,0) y termine en (1,1)
-        tpr[0] = 0
-        tpr[-1] = 1
+    def get_predictions(self, model_key: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Predicciones registradas del modelo o, si no hay, su conjunto simulado"""
+        if model_key in self.predictions:
+            return self.predictions[model_key]
+        return self._simulate_predictions(model_key, self.models_data[model_key]['auc_simulado'])
+    
+    def _get_report(self, model_key: str, max_points: int) -> dict:
+        """Reporte de métricas memorizado hasta que se registren nuevas predicciones"""
+        def compute():
+            scores, labels = self.get_predictions(model_key)
+            return binary_classification_report(scores, labels, max_points=max_points)
+        return self._reports.get_or_compute((self._generation, model_key, max_points), compute)
+    
+    def _simulate_predictions(self, model_key: str, auc_target: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores binormales deterministas cuyo AUC esperado es auc_target"""
+        rng = np.random.default_rng(zlib.crc32(model_key.encode('utf-8')))
+        positives = int(SIMULATED_TEST_SIZE * SIMULATED_POSITIVE_RATE)
+        labels = rng.permutation(SIMULATED_TEST_SIZE) < positives
         
-        return {
-            'fpr': fpr.tolist(),
-            'tpr': tpr.tolist(),
-            'auc': round(auc_target, 3),
-            'umbral_optimo': 0.5
-        }
+        # Con dos normales de varianza 1 separadas d: AUC = Phi(d / sqrt(2))
+        separation = np.sqrt(2) * NormalDist().inv_cdf(auc_target)
+        latent = rng.normal(0.0, 1.0, SIMULATED_TEST_SIZE) + separation * labels
+        scores = 1.0 / (1.0 + np.exp(-1.5 * (latent - separation / 2)))
+        return scores, labels
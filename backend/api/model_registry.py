@@ -0,0 +1,204 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import joblib
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+from sklearn.linear_model import LogisticRegression
+from .feature_pipeline import FeaturePipeline
+from .storage import ARTIFACT_FILE_MODE, PathLike, atomic_write_json, read_json
+
+# Identificador de una versión: <clave del modelo>-v<número>
+MODEL_ID_RE = re.compile(r'^(?P<key>[a-z_]+)-v(?P<version>\d+)$')
+
+# Formatos de pesos: arrays .npy (modelos lineales) o volcado de joblib (el resto)
+FORMAT_NPY = 'npy'
+FORMAT_JOBLIB = 'joblib'
+
+# Intentos para reservar un número de versión cuando otro proceso publica a la vez
+MAX_VERSION_RETRIES = 20
+
+# Permisos del directorio de una versión (mkdtemp lo crea con 0700)
+MODEL_DIR_MODE = 0o755
+
+# Marca de active.json antes de haberlo leído por primera vez
+_UNLOADED = object()
+
+
+class LoadedModel(NamedTuple):
+    """Modelo cargado del registro junto con el pipeline con el que se entrenó"""
+    meta: dict
+    estimator: object
+    pipeline: FeaturePipeline
+
+    def predict_proba(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """Probabilidad de ataque de cada fila, dada en las columnas originales del dataset.
+
+        Las columnas que falten se tratan como valores faltantes (mediana / sin categoría).
+        """
+        numeric = self.pipeline.numeric_columns
+        frame = dataframe.reindex(columns=numeric + self.pipeline.categorical_columns)
+        frame[numeric] = frame[numeric].apply(pd.to_numeric, errors='coerce')
+        return self.estimator.predict_proba(self.pipeline.transform(frame))[:, 1]
+
+
+class ModelRegistry:
+    """Registro de modelos en disco con versiones inmutables y un modelo activo.
+
+    Cada versión es un directorio con meta.json, el estado del pipeline y los pesos.
+    Los pesos se abren mapeados en memoria, así que los workers que cargan la misma
+    versión comparten las páginas físicas. El modelo activo se publica en
+    active.json y se intercambia con una sola asignación de referencia: las
+    predicciones en curso terminan con el modelo anterior sin esperar a nadie.
+    """
+
+    def __init__(self, root: PathLike):
+        self.root = Path(root)
+        self._active: Optional[LoadedModel] = None
+        # _UNLOADED hasta la primera lectura de active.json en este proceso
+        self._active_stamp = _UNLOADED
+        self._load_lock = threading.Lock()
+
+    def save(self, model_key: str, estimator, pipeline: FeaturePipeline, metadata: dict) -> dict:
+        """Publica una nueva versión del modelo y devuelve sus metadatos"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=self.root, prefix='.staging-'))
+        try:
+            weights_format = self._write_weights(staging, estimator)
+            pipeline.save(staging / 'pipeline.json')
+
+            # Reservar versión: rename de un directorio es atómico y falla si ya existe
+            for _ in range(MAX_VERSION_RETRIES):
+                version = self._next_version(model_key)
+                model_id = f'{model_key}-v{version:04d}'
+                meta = {
+                    **metadata,
+                    'id': model_id,
+                    'clave': model_key,
+                    'version': version,
+                    'formato': weights_format,
+                    'creado': datetime.now(timezone.utc).isoformat()
+                }
+                atomic_write_json(staging / 'meta.json', meta)
+                os.chmod(staging, MODEL_DIR_MODE)
+                try:
+                    os.rename(staging, self.root / model_id)
+                    return meta
+                except OSError:
+                    continue
+            raise RuntimeError('No se pudo reservar un número de versión para el modelo')
+        finally:
+            if staging.exists():
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def list_models(self) -> List[dict]:
+        """Metadatos de todas las versiones, de la más reciente a la más antigua"""
+        if not self.root.exists():
+            return []
+        models = []
+        for entry in self.root.iterdir():
+            if entry.is_dir() and MODEL_ID_RE.match(entry.name):
+                meta = read_json(entry / 'meta.json')
+                if meta is not None:
+                    models.append(meta)
+        models.sort(key=lambda meta: meta['creado'], reverse=True)
+        return models
+
+    def load(self, model_id: str) -> LoadedModel:
+        """Abre una versión: pesos mapeados en memoria y pipeline de preprocesamiento"""
+        if not MODEL_ID_RE.match(model_id or ''):
+            raise KeyError(model_id)
+        path = self.root / model_id
+        meta = read_json(path / 'meta.json')
+        if meta is None:
+            raise KeyError(model_id)
+
+        if meta['formato'] == FORMAT_NPY:
+            estimator = self._load_linear(path)
+        else:
+            estimator = joblib.load(path / 'model.joblib', mmap_mode='r')
+        return LoadedModel(meta, estimator, FeaturePipeline.load(path / 'pipeline.json'))
+
+    def activate(self, model_id: str) -> LoadedModel:
+        """Carga la versión y la publica como modelo activo para todos los workers"""
+        loaded = self.load(model_id)
+        atomic_write_json(self._active_path(), {'id': model_id})
+        with self._load_lock:
+            self._active = loaded
+            self._active_stamp = self._pointer_stamp()
+        return loaded
+
+    def get_active(self) -> Optional[LoadedModel]:
+        """Modelo activo; si otro worker cambió active.json se carga la nueva versión.
+
+        La lectura habitual es una comprobación de os.stat y una referencia. Si el
+        puntero cambió, un solo hilo carga la nueva versión mientras el resto sigue
+        prediciendo con el modelo anterior en vez de esperarle. Solo la primera
+        lectura del proceso (sin modelo previo que servir) espera a la carga.
+        """
+        stamp = self._pointer_stamp()
+        if stamp == self._active_stamp:
+            return self._active
+        if not self._load_lock.acquire(blocking=self._active_stamp is _UNLOADED):
+            return self._active
+
+        try:
+            if stamp != self._active_stamp:
+                self._active_stamp = stamp
+                pointer = read_json(self._active_path())
+                try:
+                    self._active = self.load(pointer['id']) if pointer is not None else None
+                except KeyError:
+                    self._active = None
+                except Exception:
+                    # Versión ilegible: se sigue sirviendo la anterior hasta la próxima activación
+                    pass
+            return self._active
+        finally:
+            self._load_lock.release()
+
+    def _write_weights(self, directory: Path, estimator) -> str:
+        """Modelos lineales como arrays .npy (mapeables); el resto con joblib"""
+        if isinstance(estimator, LogisticRegression):
+            for name in ('coef_', 'intercept_', 'classes_'):
+                path = directory / f'{name.rstrip("_")}.npy'
+                np.save(path, getattr(estimator, name))
+                os.chmod(path, ARTIFACT_FILE_MODE)
+            return FORMAT_NPY
+
+        path = directory / 'model.joblib'
+        joblib.dump(estimator, path)
+        os.chmod(path, ARTIFACT_FILE_MODE)
+        return FORMAT_JOBLIB
+
+    def _load_linear(self, directory: Path) -> LogisticRegression:
+        """Reconstruye una regresión logística sobre arrays mapeados (sin copiar los pesos)"""
+        estimator = LogisticRegression()
+        estimator.coef_ = np.load(directory / 'coef.npy', mmap_mode='r')
+        estimator.intercept_ = np.load(directory / 'intercept.npy', mmap_mode='r')
+        estimator.classes_ = np.load(directory / 'classes.npy')
+        estimator.n_features_in_ = estimator.coef_.shape[1]
+        return estimator
+
+    def _next_version(self, model_key: str) -> int:
+        versions = [0]
+        for entry in self.root.iterdir():
+            match = MODEL_ID_RE.match(entry.name)
+            if match and match.group('key') == model_key:
+                versions.append(int(match.group('version')))
+        return max(versions) + 1
+
+    def _active_path(self) -> Path:
+        return self.root / 'active.json'
+
+    def _pointer_stamp(self):
+        try:
+            stat = os.stat(self._active_path())
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino)
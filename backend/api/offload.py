@@ -0,0 +1,69 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+from .metrics import registry
+
+# Hilos del pool de predicción (uno por núcleo): trabajo corto que no debe esperar a las cargas
+PREDICT_WORKERS = os.cpu_count() or 1
+
+# Hilos del pool de trabajo pesado (cargas de CSV, entrenamiento, métricas); acotado aparte
+BULK_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+
+# Tareas admitidas por pool (en ejecución + en cola); por encima se rechaza con 503
+MAX_PENDING_PREDICT = 1024
+MAX_PENDING_BULK = 16
+
+
+class ExecutorSaturated(Exception):
+    """El pool ya tiene el máximo de tareas pendientes"""
+
+
+class BoundedExecutor:
+    """Pool de hilos con cola acotada al que las vistas async mandan el trabajo de CPU.
+
+    El event loop solo espera el resultado, así que puede seguir atendiendo otras
+    conexiones (y subidas lentas) mientras el cálculo corre en un hilo. La cola
+    tiene límite: con el pool saturado se rechaza en lugar de acumular latencia.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'offload-{name}')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Ejecuta func(*args) en el pool y espera su resultado sin bloquear el event loop"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                registry.increment('offload_rejected_total', pool=self.name)
+                raise ExecutorSaturated(f'Servidor ocupado ({self.name}), inténtelo más tarde')
+            self._pending += 1
+
+        submitted = time.perf_counter()
+
+        def task():
+            registry.observe('offload_queue_seconds', time.perf_counter() - submitted, pool=self.name)
+            return func(*args)
+
+        future = self._executor.submit(task)
+        # Se libera al terminar la tarea, no al dejar de esperarla (p. ej. si el cliente se desconecta)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def _release(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+
+
+# Pools compartidos por las vistas async del proceso
+predict_executor = BoundedExecutor('prediccion', PREDICT_WORKERS, MAX_PENDING_PREDICT)
+bulk_executor = BoundedExecutor('carga', BULK_WORKERS, MAX_PENDING_BULK)
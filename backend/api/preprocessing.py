@@ -1,122 +1,316 @@
+import threading
+import time
 import numpy as np
-from typing import Dict
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from .cache import LRUCache
+from .dataset_handler import CSV_CHUNK_SIZE, DatasetHandler, DatasetSnapshot
+from .feature_pipeline import PIPELINE_STEPS, FeaturePipeline
+from .storage import PathLike, atomic_memmap, atomic_save_npy
+
+# Particiones calculadas que se conservan (por versión del dataset, ratios y semilla)
+SPLIT_CACHE_SIZE = 16
+
+
+class SplitIndices(NamedTuple):
+    """Índices de fila (ordenados) de cada partición"""
+    train: np.ndarray
+    validation: np.ndarray
+    test: np.ndarray
+
+
+class FeatureMatrix(NamedTuple):
+    """Matriz de características transformada (float32, normalmente mapeada desde disco)"""
+    features: np.ndarray
+    labels: np.ndarray
+    class_names: List[str]
+    columns: List[str]
+    path: Optional[Path]
+    labels_path: Optional[Path]
+
 
 class DataPreprocessor:
     """Preprocesador de datos"""
     
-    def __init__(self):
-        self.total_samples = 125973
+    def __init__(self, dataset_handler: Optional[DatasetHandler] = None,
+                 artifacts_dir: Optional[PathLike] = None):
+        self.dataset_handler = dataset_handler or DatasetHandler()
+        self._split_cache = LRUCache(SPLIT_CACHE_SIZE)
+        
+        # Estado ajustado del pipeline; si hay directorio de artefactos se comparte en disco
+        self.artifacts_dir = Path(artifacts_dir) if artifacts_dir is not None else None
+        self._pipeline: Optional[FeaturePipeline] = None
+        self._pipeline_lock = threading.Lock()
+        self._features_lock = threading.Lock()
+        self._features: Optional[np.ndarray] = None
+        self._features_key = None
+        
+        # Callback opcional (nombre, segundos) con el tiempo de ajuste y de cada paso del pipeline
+        self.timing_hook: Optional[Callable[[str, float], None]] = None
     
     def split_dataset(self, train_ratio: float, val_ratio: float, 
-                     test_ratio: float, stratified: bool, random_state: int) -> dict:
+                     test_ratio: float, stratified: bool, random_state: int,
+                     include_indices: bool = False) -> dict:
         """Divide el dataset en train/val/test"""
         
         # Validar ratios
+        if not all(ratio > 0 for ratio in (train_ratio, val_ratio, test_ratio)):
+            raise ValueError('Los ratios deben ser mayores que 0')
         if abs(train_ratio + val_ratio + test_ratio - 1.0) > 0.01:
             raise ValueError('Los ratios deben sumar 1.0')
         
-        # Calcular tamaños
-        train_size = int(self.total_samples * train_ratio)
-        val_size = int(self.total_samples * val_ratio)
-        test_size = self.total_samples - train_size - val_size
+        # Un único snapshot: etiquetas y particiones salen siempre de la misma carga
+        snapshot = self.dataset_handler.snapshot()
+        codes, class_names = self.dataset_handler.get_label_codes(snapshot)
+        split = self.get_split_indices(train_ratio, val_ratio, stratified, random_state, snapshot)
         
-        # Generar distribución simulada
-        np.random.seed(random_state)
-        
-        if stratified:
-            # Distribución estratificada mantiene proporciones
-            distribution = {
-                'train': self._generate_stratified_distribution(train_size),
-                'validation': self._generate_stratified_distribution(val_size),
-                'test': self._generate_stratified_distribution(test_size)
-            }
-        else:
-            # Distribución aleatoria
-            distribution = {
-                'train': self._generate_random_distribution(train_size),
-                'validation': self._generate_random_distribution(val_size),
-                'test': self._generate_random_distribution(test_size)
-            }
+        distribution = {
+            name: self._class_distribution(codes[indices], class_names)
+            for name, indices in zip(('train', 'validation', 'test'), split)
+        }
         
-        return {
-            'tamaño_entrenamiento': train_size,
-            'tamaño_validacion': val_size,
-            'tamaño_prueba': test_size,
+        result = {
+            'tamaño_entrenamiento': len(split.train),
+            'tamaño_validacion': len(split.validation),
+            'tamaño_prueba': len(split.test),
             'estratificado': stratified,
             'semilla_aleatoria': random_state,
             'distribucion': distribution
         }
+        if include_indices:
+            result['indices'] = {
+                name: indices.tolist() for name, indices in zip(('train', 'validation', 'test'), split)
+            }
+        return result
+    
+    def get_split_indices(self, train_ratio: float, val_ratio: float, stratified: bool,
+                          random_state: int, snapshot: Optional[DatasetSnapshot] = None) -> SplitIndices:
+        """Índices de cada partición del dataset cargado, memorizados por versión"""
+        snapshot = snapshot or self.dataset_handler.snapshot()
+        key = (snapshot.version, round(train_ratio, 6), round(val_ratio, 6),
+               bool(stratified), random_state)
+        return self._split_cache.get_or_compute(
+            key, lambda: self._compute_split(train_ratio, val_ratio, stratified, random_state, snapshot)
+        )
     
-    def transform_data(self) -> dict:
-        """Simula el proceso de transformación de datos"""
+    def _compute_split(self, train_ratio: float, val_ratio: float, stratified: bool,
+                       random_state: int, snapshot: Optional[DatasetSnapshot] = None) -> SplitIndices:
+        """Particiona con una permutación y, si es estratificado, una ordenación por clase"""
+        codes, _ = self.dataset_handler.get_label_codes(snapshot)
+        n = len(codes)
+        rng = np.random.default_rng(random_state)
+        index_dtype = np.int32 if n < np.iinfo(np.int32).max else np.int64
         
+        order = rng.permutation(n).astype(index_dtype)
+        
+        if stratified:
+            # Agrupar por clase conservando el orden aleatorio dentro de cada clase
+            order = order[np.argsort(codes[order], kind='stable')]
+            class_counts = np.bincount(codes, minlength=codes.max() + 1 if n else 0)
+            class_starts = np.cumsum(class_counts) - class_counts
+            
+            # Posición de cada fila dentro de su clase y cortes por clase
+            rank = np.arange(n) - np.repeat(class_starts, class_counts)
+            train_cut = np.repeat(np.floor(class_counts * train_ratio).astype(np.int64), class_counts)
+            val_cut = train_cut + np.repeat(np.floor(class_counts * val_ratio).astype(np.int64), class_counts)
+            
+            train = order[rank < train_cut]
+            validation = order[(rank >= train_cut) & (rank < val_cut)]
+            test = order[rank >= val_cut]
+        else:
+            train_size = int(n * train_ratio)
+            val_size = int(n * val_ratio)
+            train = order[:train_size]
+            validation = order[train_size:train_size + val_size]
+            test = order[train_size + val_size:]
+        
+        # Índices ordenados: accesos secuenciales al reutilizarlos sobre el DataFrame
+        return SplitIndices(np.sort(train), np.sort(validation), np.sort(test))
+    
+    def _class_distribution(self, codes: np.ndarray, class_names: List[str]) -> Dict[str, int]:
+        """Cuenta filas por clase en una partición"""
+        counts = np.bincount(codes, minlength=len(class_names))
+        return {name: int(count) for name, count in zip(class_names, counts)}
+    
+    def transform_data(self, refit: bool = False) -> dict:
+        """Ajusta (o reutiliza) el pipeline y lo aplica al dataset cargado por bloques"""
+        start = time.perf_counter()
+        snapshot = self.dataset_handler.snapshot()
+        dataframe = self.dataset_handler.get_dataframe(snapshot)
+        pipeline, reused = self.get_pipeline(refit, snapshot)
+        fit_seconds = time.perf_counter() - start
+        
+        timings = dict.fromkeys(PIPELINE_STEPS, 0.0)
+        with self._features_lock:
+            features = self._write_features(pipeline, timings, snapshot)
+        total_seconds = time.perf_counter() - start
+        if self.timing_hook is not None:
+            self.timing_hook('ajuste', fit_seconds)
+            for key, seconds in timings.items():
+                self.timing_hook(key, seconds)
+        
+        one_hot_features = pipeline.num_output_features - len(pipeline.numeric_columns)
         steps = [
             {
                 'paso': 1,
                 'nombre': 'Imputación de Valores Faltantes',
                 'descripcion': 'Reemplazar valores faltantes con la mediana',
-                'caracteristicas_afectadas': 3,
-                'completado': True
+                'caracteristicas_afectadas': int(np.count_nonzero(pipeline.missing_counts)),
+                'valores_imputados': int(pipeline.missing_counts.sum())
             },
             {
                 'paso': 2,
                 'nombre': 'Escalado Robusto',
                 'descripcion': 'Escalar características usando RobustScaler',
-                'caracteristicas_procesadas': 38,
-                'completado': True
+                'caracteristicas_procesadas': len(pipeline.numeric_columns)
             },
             {
                 'paso': 3,
                 'nombre': 'Codificación One-Hot',
                 'descripcion': 'Codificar variables categóricas',
-                'categorias_originales': 4,
-                'caracteristicas_generadas': 12,
-                'completado': True
+                'categorias_originales': len(pipeline.categorical_columns),
+                'caracteristicas_generadas': one_hot_features
             },
             {
                 'paso': 4,
                 'nombre': 'Normalización Final',
                 'descripcion': 'Normalizar todas las características a rango [0,1]',
-                'metodo': 'MinMaxScaler',
-                'completado': True
+                'metodo': 'MinMaxScaler'
             }
         ]
+        for step, key in zip(steps, PIPELINE_STEPS):
+            step['tiempo_ms'] = round(timings[key] * 1000, 2)
+            step['completado'] = True
         
         return {
             'pipeline_completo': True,
             'total_pasos': len(steps),
             'pasos': steps,
-            'caracteristicas_originales': 42,
-            'caracteristicas_finales': 50,
-            'tiempo_procesamiento_ms': 1247
+            'caracteristicas_originales': len(pipeline.numeric_columns) + len(pipeline.categorical_columns),
+            'caracteristicas_finales': pipeline.num_output_features,
+            'filas_transformadas': len(dataframe),
+            'matriz_caracteristicas': {
+                'forma': list(features.shape),
+                'dtype': str(features.dtype),
+                'tamaño_mb': round(features.nbytes / 1024 ** 2, 2),
+                'en_disco': isinstance(features, np.memmap)
+            },
+            'pipeline_reutilizado': reused,
+            'tiempo_ajuste_ms': 0.0 if reused else round(fit_seconds * 1000, 2),
+            'tiempo_procesamiento_ms': round(total_seconds * 1000, 2)
         }
     
-    def _generate_stratified_distribution(self, size: int) -> Dict[str, int]:
-        """Genera distribución estratificada"""
-        # Proporciones originales del dataset
-        proportions = {
-            'normal': 0.5345,
-            'neptune': 0.3272,
-            'portsweep': 0.0827,
-            'ipsweep': 0.0286,
-            'satan': 0.0288,
-            'otros': 0.0182
-        }
+    def get_feature_matrix(self, snapshot: Optional[DatasetSnapshot] = None) -> FeatureMatrix:
+        """Matriz transformada del dataset actual; se reutiliza desde disco sin copia si existe"""
+        snapshot = snapshot or self.dataset_handler.snapshot()
+        pipeline, _ = self.get_pipeline(snapshot=snapshot)
+        with self._features_lock:
+            key = (snapshot.version, pipeline.digest())
+            if self._features is None or self._features_key != key:
+                path = self._features_path(pipeline)
+                features = None
+                if path is not None and path.exists():
+                    features = np.load(path, mmap_mode='r')
+                    if features.shape != (pipeline.rows, pipeline.num_output_features):
+                        features = None
+                if features is None:
+                    features = self._write_features(pipeline, snapshot=snapshot)
+                self._features, self._features_key = features, key
+            features = self._features
+        
+        codes, class_names = self.dataset_handler.get_label_codes(snapshot)
+        labels_path = self._labels_path(pipeline)
+        if labels_path is not None and not labels_path.exists():
+            atomic_save_npy(labels_path, codes)
+        return FeatureMatrix(features, codes, class_names, pipeline.output_columns,
+                             self._features_path(pipeline), labels_path)
+    
+    def _write_features(self, pipeline: FeaturePipeline, timings: Optional[Dict[str, float]] = None,
+                        snapshot: Optional[DatasetSnapshot] = None) -> np.ndarray:
+        """Transforma el dataset por bloques de filas escribiendo directamente en un .npy.
+        
+        En memoria solo conviven el DataFrame de origen y un bloque transformado; con
+        directorio de artefactos la matriz completa vive en disco y se devuelve mapeada.
+        """
+        snapshot = snapshot or self.dataset_handler.snapshot()
+        dataframe = self.dataset_handler.get_dataframe(snapshot)
+        shape = (len(dataframe), pipeline.num_output_features)
+        path = self._features_path(pipeline)
         
-        distribution = {}
-        remaining = size
+        def fill(out: np.ndarray):
+            for start in range(0, len(dataframe), CSV_CHUNK_SIZE):
+                stop = start + CSV_CHUNK_SIZE
+                pipeline.transform(dataframe.iloc[start:stop], timings, out=out[start:stop])
         
-        for attack_type, prop in list(proportions.items())[:-1]:
-            count = int(size * prop)
-            distribution[attack_type] = count
-            remaining -= count
+        if path is None:
+            features = np.empty(shape, dtype=np.float32)
+            fill(features)
+        else:
+            with atomic_memmap(path, shape, np.float32) as out:
+                fill(out)
+            features = np.load(path, mmap_mode='r')
+        
+        self._features = features
+        self._features_key = (snapshot.version, pipeline.digest())
+        return features
+    
+    def get_pipeline(self, refit: bool = False,
+                     snapshot: Optional[DatasetSnapshot] = None) -> Tuple[FeaturePipeline, bool]:
+        """Pipeline ajustado al dataset actual y si se reutilizó un ajuste previo.
         
-        distribution['otros'] = remaining
-        return distribution
+        Se busca primero en memoria y después en disco (ajustado por otro proceso
+        sobre el mismo dataset); solo si no existe se ajusta y se guarda.
+        """
+        snapshot = snapshot or self.dataset_handler.snapshot()
+        fingerprint = self.dataset_handler.fingerprint(snapshot)
+        with self._pipeline_lock:
+            if not refit:
+                if self._pipeline is not None and self._pipeline.fingerprint == fingerprint:
+                    return self._pipeline, True
+                stored = self._load_pipeline(fingerprint)
+                if stored is not None:
+                    self._pipeline = stored
+                    return stored, True
+            
+            self._pipeline = self._fit_pipeline(fingerprint, snapshot)
+            path = self._pipeline_path(fingerprint)
+            if path is not None:
+                self._pipeline.save(path)
+            return self._pipeline, False
     
-    def _generate_random_distribution(self, size: int) -> Dict[str, int]:
-        """Genera distribución aleatoria"""
-        attack_types = ['normal', 'neptune', 'portsweep', 'ipsweep', 'satan', 'otros']
-        counts = np.random.multinomial(size, [1/6]*6)
+    def _fit_pipeline(self, fingerprint: str, snapshot: DatasetSnapshot) -> FeaturePipeline:
+        """Ajusta el pipeline en una pasada por bloques sobre las columnas de características"""
+        dataframe = self.dataset_handler.get_dataframe(snapshot)
+        label_col = self.dataset_handler.get_label_column(snapshot)
+        features = dataframe.drop(columns=[label_col])
+        numeric_columns = list(features.select_dtypes(include=[np.number]).columns)
+        categorical_columns = [col for col in features.columns if col not in numeric_columns]
         
-        return {attack_type: int(count) for attack_type, count in zip(attack_types, counts)}
+        chunks = (dataframe.iloc[start:start + CSV_CHUNK_SIZE]
+                  for start in range(0, len(dataframe), CSV_CHUNK_SIZE))
+        return FeaturePipeline.fit(chunks, numeric_columns, categorical_columns, fingerprint)
+    
+    def _load_pipeline(self, fingerprint: str) -> Optional[FeaturePipeline]:
+        path = self._pipeline_path(fingerprint)
+        if path is None:
+            return None
+        pipeline = FeaturePipeline.load(path)
+        if pipeline is None or pipeline.fingerprint != fingerprint:
+            return None
+        return pipeline
+    
+    def _pipeline_path(self, fingerprint: str) -> Optional[Path]:
+        if self.artifacts_dir is None:
+            return None
+        return self.artifacts_dir / 'preprocessing' / f'pipeline-{fingerprint[:16]}.json'
+    
+    def _features_path(self, pipeline: FeaturePipeline) -> Optional[Path]:
+        if self.artifacts_dir is None:
+            return None
+        name = f'features-{pipeline.fingerprint[:16]}-{pipeline.digest()[:16]}.npy'
+        return self.artifacts_dir / 'datasets' / name
+    
+    def _labels_path(self, pipeline: FeaturePipeline) -> Optional[Path]:
+        if self.artifacts_dir is None:
+            return None
+        return self.artifacts_dir / 'datasets' / f'labels-{pipeline.fingerprint[:16]}.npy'
@@ -1,11 +1,74 @@
 import re
+import hashlib
 import html
 import math
+import threading
+import time
+import numpy as np
 import pandas as pd
-from collections import Counter
+from typing import Callable, Iterable, List, NamedTuple, Optional
+from .cache import LRUCache
+from .keyword_matcher import KeywordMatcher
+from .spam_model import FrozenNaiveBayes, HashedNaiveBayes
+from .text_scanner import scan_characters, scan_characters_batch
+
+# Patrones compilados una vez y compartidos entre la ruta individual y la vectorizada
+HTML_RE = re.compile(r'<[^>]+>')
+URL_RE = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\$$\$$,]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+URGENCY_WORDS = ['urgent', 'hurry', 'act now', 'limited time', 'urgente', 'rápido']
+
+# Valores de texto que se interpretan como spam en la columna de etiqueta
+SPAM_LABELS = {'1', 'spam', 'true', 'yes', 'si', 'sí'}
+
+
+# Por debajo de estos correos distintos sin caché, la ruta individual es más rápida que la
+# vectorizada (que paga ~1 ms fijo en construir las columnas de pandas)
+MIN_VECTORIZED_BATCH = 64
+
+# Tamaño de sub-lote para el análisis por code points (acota la memoria)
+BATCH_CHUNK_SIZE = 2048
+
+# Filas del CSV de entrenamiento de spam leídas por bloque
+TRAINING_CHUNK_SIZE = 10_000
+
+# Predicciones memorizadas por contenido (campañas que repiten el mismo correo) y su vigencia
+PREDICTION_CACHE_SIZE = 10_000
+PREDICTION_CACHE_TTL = 300.0
+
+
+class SpamSnapshot(NamedTuple):
+    """Estado publicado para predecir: nunca se modifica, cada cambio publica uno nuevo"""
+    # Versión de la caché de predicciones: cambia con el modelo o con las listas
+    version: int
+    # Clasificador congelado; None hasta que haya visto ambas clases (se usa el score heurístico)
+    model: Optional[FrozenNaiveBayes]
+    keyword_matcher: KeywordMatcher
+    # Listas de palabras clave con las que se construyó keyword_matcher
+    keyword_key: tuple
+
+
+class _FeatureClock:
+    """Cronómetro por vueltas que solo mide si hay un hook configurado"""
+    
+    def __init__(self, hook: Optional[Callable[[str, float], None]]):
+        self.hook = hook
+        self.last = time.perf_counter() if hook else 0.0
+    
+    def lap(self, name: str):
+        if self.hook is None:
+            return
+        now = time.perf_counter()
+        self.hook(name, now - self.last)
+        self.last = now
+
 
 class SpamDetector:
-    """Detector de spam basado en características del texto"""
+    """Detector de spam basado en características del texto.
+    
+    La predicción lee un SpamSnapshot: el entrenamiento y el feedback trabajan
+    sobre su propio modelo y al terminar publican una copia congelada con una
+    sola asignación, así que las predicciones no esperan a ningún lock.
+    """
     
     def __init__(self):
         # Palabras clave comunes en spam
@@ -21,59 +84,238 @@ class SpamDetector:
             'reunión', 'reporte', 'adjunto', 'saludos', 'gracias'
         ]
         
-        self.using_custom_model = False
-        self.training_data = None
+        # Conteos del clasificador; solo los modifican el entrenamiento y el feedback (bajo _update_lock)
+        self.spam_model: Optional[HashedNaiveBayes] = None
+        self._update_lock = threading.Lock()
+        
+        # Callback opcional (nombre, segundos) con el tiempo de cada grupo de características
+        self.feature_timing_hook: Optional[Callable[[str, float], None]] = None
+        
+        # Caché de resultados por hash del correo y versión del snapshot
+        self._prediction_cache = LRUCache(PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+        
+        key = self._keyword_key()
+        self._snapshot = SpamSnapshot(0, None, self._build_keyword_matcher(key), key)
+        self._publish_lock = threading.Lock()
+    
+    @property
+    def using_custom_model(self) -> bool:
+        return self._snapshot.model is not None
+    
+    @property
+    def model_version(self) -> int:
+        return self._snapshot.version
+    
+    def snapshot(self) -> SpamSnapshot:
+        """Estado actual; si cambiaron las listas de palabras clave se publica antes uno nuevo"""
+        snapshot = self._snapshot
+        key = self._keyword_key()
+        if key != snapshot.keyword_key:
+            snapshot = self._publish(keyword_matcher=self._build_keyword_matcher(key), keyword_key=key)
+        return snapshot
     
     def load_training_data(self, dataframe: pd.DataFrame) -> dict:
-        """Carga datos de entrenamiento de spam desde un DataFrame"""
+        """Entrena el clasificador de spam con un DataFrame de mensajes etiquetados"""
         try:
-            self.training_data = dataframe
-            self.using_custom_model = True
-            
-            # Detectar columnas de texto y etiqueta
-            text_cols = [col for col in dataframe.columns if 'text' in col.lower() or 'body' in col.lower() or 'message' in col.lower()]
-            label_cols = [col for col in dataframe.columns if 'label' in col.lower() or 'class' in col.lower() or 'spam' in col.lower()]
-            
-            if not text_cols or not label_cols:
-                raise Exception("No se encontraron columnas de texto o etiqueta apropiadas")
-            
-            # Actualizar palabras clave basadas en datos reales
-            spam_texts = dataframe[dataframe[label_cols[0]] == 1][text_cols[0]].str.lower()
-            ham_texts = dataframe[dataframe[label_cols[0]] == 0][text_cols[0]].str.lower()
-            
-            # Extraer palabras más comunes
-            spam_words = ' '.join(spam_texts.astype(str).tolist()).split()
-            ham_words = ' '.join(ham_texts.astype(str).tolist()).split()
-            
-            spam_counter = Counter(spam_words)
-            ham_counter = Counter(ham_words)
-            
-            # Actualizar palabras clave
-            self.spam_keywords.extend([word for word, _ in spam_counter.most_common(20)])
-            self.ham_keywords.extend([word for word, _ in ham_counter.most_common(20)])
-            
-            return {
-                'registros': len(dataframe),
-                'spam_count': int(dataframe[label_cols[0]].sum()),
-                'ham_count': int((~dataframe[label_cols[0]]).sum()),
-                'columna_texto': text_cols[0],
-                'columna_etiqueta': label_cols[0]
-            }
+            return self._train_from_chunks([dataframe])
+        except Exception as e:
+            raise Exception(f"Error al cargar datos de entrenamiento: {str(e)}")
+    
+    def load_training_stream(self, source, chunksize: int = TRAINING_CHUNK_SIZE) -> dict:
+        """Entrena leyendo un CSV por bloques: la memoria depende del tamaño del hash, no del corpus"""
+        try:
+            return self._train_from_chunks(pd.read_csv(source, chunksize=chunksize))
         except Exception as e:
-            self.using_custom_model = False
             raise Exception(f"Error al cargar datos de entrenamiento: {str(e)}")
     
+    def partial_fit(self, subjects: List[str], bodies: List[str], labels: List[bool],
+                    decay: float = 1.0) -> dict:
+        """Incorpora mensajes etiquetados al modelo sin reentrenar sobre el histórico"""
+        if not (len(subjects) == len(bodies) == len(labels)):
+            raise ValueError('subjects, bodies y labels deben tener la misma longitud')
+        
+        start = time.perf_counter()
+        texts = [f"{subject} {body}" for subject, body in zip(subjects, bodies)]
+        with self._update_lock:
+            model = self.spam_model if self.spam_model is not None else HashedNaiveBayes()
+            model.partial_fit(texts, labels, decay)
+            self.spam_model = model
+            self._publish(model=model.freeze() if model.is_fitted else None)
+            ham_docs, spam_docs = model.class_counts.tolist()
+            is_fitted = model.is_fitted
+        
+        spam_count = sum(1 for label in labels if label)
+        return {
+            'mensajes': len(labels),
+            'spam': spam_count,
+            'legitimos': len(labels) - spam_count,
+            'decaimiento': decay,
+            # Documentos acumulados por clase (fraccionarios tras aplicar decaimiento)
+            'documentos_spam': round(spam_docs, 3),
+            'documentos_legitimos': round(ham_docs, 3),
+            'modelo_listo': is_fitted,
+            'tiempo_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+    
+    def _train_from_chunks(self, chunks: Iterable[pd.DataFrame]) -> dict:
+        """Acumula los conteos bloque a bloque y publica el modelo al terminar"""
+        start = time.perf_counter()
+        model = HashedNaiveBayes()
+        text_col = label_col = None
+        
+        for chunk in chunks:
+            if text_col is None:
+                # Detectar columnas de texto y etiqueta
+                text_cols = [col for col in chunk.columns if 'text' in col.lower() or 'body' in col.lower() or 'message' in col.lower()]
+                label_cols = [col for col in chunk.columns if 'label' in col.lower() or 'class' in col.lower() or 'spam' in col.lower()]
+                if not text_cols or not label_cols:
+                    raise Exception("No se encontraron columnas de texto o etiqueta apropiadas")
+                text_col, label_col = text_cols[0], label_cols[0]
+            
+            texts = chunk[text_col].fillna('').astype(str)
+            model.accumulate(texts, self._binary_labels(chunk[label_col]))
+        
+        if not model.is_fitted:
+            raise Exception("Se necesitan mensajes de spam y legítimos para entrenar")
+        model.update_weights()
+        
+        # Publicar el modelo solo cuando está completo
+        with self._update_lock:
+            self.spam_model = model
+            self._publish(model=model.freeze())
+        
+        ham_count, spam_count = (int(count) for count in model.class_counts)
+        return {
+            'registros': ham_count + spam_count,
+            'spam_count': spam_count,
+            'ham_count': ham_count,
+            'columna_texto': text_col,
+            'columna_etiqueta': label_col,
+            'modelo': 'naive_bayes_multinomial',
+            'caracteristicas_hash': model.n_features,
+            'tiempo_entrenamiento_ms': round((time.perf_counter() - start) * 1000, 1)
+        }
+    
+    @staticmethod
+    def _binary_labels(labels: pd.Series) -> np.ndarray:
+        """Etiquetas 1/0 numéricas o textuales ('spam'/'ham') como vector booleano"""
+        if pd.api.types.is_numeric_dtype(labels) or pd.api.types.is_bool_dtype(labels):
+            return (labels.fillna(0).to_numpy() == 1)
+        return labels.astype(str).str.strip().str.lower().isin(SPAM_LABELS).to_numpy()
+    
     def predict(self, subject: str, body: str) -> dict:
-        """Predice si un correo es spam"""
+        """Predice si un correo es spam; los correos repetidos se sirven desde la caché"""
+        snapshot = self.snapshot()
+        return self._copy_result(self._prediction_cache.get_or_compute(
+            self._cache_key(snapshot, subject, body), lambda: self._predict_uncached(subject, body, snapshot)
+        ))
+    
+    def predict_batch(self, subjects: List[str], bodies: List[str]) -> List[dict]:
+        """Predice un lote de correos; solo se calculan los distintos que no estén en caché"""
+        if len(subjects) != len(bodies):
+            raise ValueError('subjects y bodies deben tener la misma longitud')
+        
+        snapshot = self.snapshot()
+        keys = [self._cache_key(snapshot, subject, body) for subject, body in zip(subjects, bodies)]
+        results = {}
+        pending = {}
+        for index, key in enumerate(keys):
+            if key in results or key in pending:
+                continue
+            cached = self._prediction_cache.get(key, _MISSING)
+            if cached is _MISSING:
+                pending[key] = index
+            else:
+                results[key] = cached
+        
+        if pending:
+            indices = list(pending.values())
+            if len(indices) < MIN_VECTORIZED_BATCH:
+                computed = [self._predict_uncached(subjects[i], bodies[i], snapshot) for i in indices]
+            else:
+                computed = self._predict_batch_uncached([subjects[i] for i in indices],
+                                                        [bodies[i] for i in indices], snapshot)
+            for key, result in zip(pending, computed):
+                self._prediction_cache.set(key, result)
+                results[key] = result
+        
+        return [self._copy_result(results[key]) for key in keys]
+    
+    @staticmethod
+    def _copy_result(result: dict) -> dict:
+        """Copia de un resultado de la caché: quien lo reciba puede modificarlo sin alterarla"""
+        return {**result, 'caracteristicas': dict(result['caracteristicas'])}
+    
+    def cache_stats(self) -> dict:
+        """Aciertos, fallos y expulsiones de la caché de predicciones"""
+        return {
+            **self._prediction_cache.stats(),
+            'ttl_segundos': PREDICTION_CACHE_TTL,
+            'version_modelo': self._snapshot.version
+        }
+    
+    def _cache_key(self, snapshot: SpamSnapshot, subject: str, body: str) -> tuple:
+        """Hash BLAKE2b del correo exacto más la versión del snapshot (modelo y listas).
+        
+        No se normaliza el texto: longitudes y porcentaje de mayúsculas forman parte
+        del resultado, así que solo un correo idéntico puede reutilizarlo.
+        """
+        digest = hashlib.blake2b(subject.encode('utf-8', 'surrogatepass'), digest_size=16)
+        digest.update(b'\x00')
+        digest.update(body.encode('utf-8', 'surrogatepass'))
+        return (snapshot.version, digest.digest())
+    
+    def _publish(self, **changes) -> SpamSnapshot:
+        """Publica un snapshot nuevo (nueva versión) y descarta los resultados del anterior"""
+        with self._publish_lock:
+            snapshot = self._snapshot._replace(version=self._snapshot.version + 1, **changes)
+            self._snapshot = snapshot
+            self._prediction_cache.clear()
+        return snapshot
+    
+    def _predict_uncached(self, subject: str, body: str, snapshot: Optional[SpamSnapshot] = None) -> dict:
+        """Extrae características y puntúa un correo"""
+        snapshot = snapshot or self.snapshot()
         text = f"{subject} {body}".lower()
         
         # Extraer características
-        features = self._extract_features(subject, body, text)
+        features = self._extract_features(subject, body, text, snapshot.keyword_matcher)
         
-        # Calcular score de spam (0-1)
-        spam_score = self._calculate_spam_score(features)
+        # Probabilidad del modelo entrenado o, si no lo hay, score heurístico (0-1)
+        if snapshot.model is not None:
+            spam_score = float(snapshot.model.predict_proba([text])[0])
+        else:
+            spam_score = self._calculate_spam_score(features)
         
-        # Clasificar
+        return self._build_result(features, spam_score, snapshot.model is not None)
+    
+    def _predict_batch_uncached(self, subjects: List[str], bodies: List[str],
+                                snapshot: Optional[SpamSnapshot] = None) -> List[dict]:
+        """Predice un lote de correos calculando las características por columnas"""
+        if len(subjects) == 0:
+            return []
+        snapshot = snapshot or self.snapshot()
+        
+        subjects = pd.Series(subjects, dtype=object)
+        bodies = pd.Series(bodies, dtype=object)
+        texts = (subjects + ' ' + bodies).str.lower()
+        
+        features = self._extract_features_batch(subjects, bodies, texts, snapshot.keyword_matcher)
+        if snapshot.model is not None:
+            scores = snapshot.model.predict_proba(texts.tolist())
+        else:
+            scores = self._calculate_spam_score_batch(features)
+        
+        # Convertir columnas a tipos nativos una sola vez
+        columns = list(features.columns)
+        rows = zip(*(features[col].tolist() for col in columns))
+        return [
+            self._build_result(dict(zip(columns, row)), spam_score, snapshot.model is not None)
+            for row, spam_score in zip(rows, scores.tolist())
+        ]
+    
+    def _build_result(self, features: dict, spam_score: float, using_custom_model: bool) -> dict:
+        """Construye la respuesta de clasificación a partir del score"""
         is_spam = spam_score > 0.5
         confidence = spam_score if is_spam else (1 - spam_score)
         
@@ -82,42 +324,104 @@ class SpamDetector:
             'confianza': round(confidence * 100, 2),
             'puntuacion_spam': round(spam_score, 3),
             'caracteristicas': features,
-            'usando_modelo_personalizado': self.using_custom_model
+            'usando_modelo_personalizado': using_custom_model
         }
     
-    def _extract_features(self, subject: str, body: str, text: str) -> dict:
+    def _extract_features(self, subject: str, body: str, text: str, matcher: KeywordMatcher) -> dict:
         """Extrae características del correo"""
         features = {}
+        clock = _FeatureClock(self.feature_timing_hook)
         
-        # Características básicas
+        # Características básicas y conteos de caracteres en una sola pasada
+        char_stats = scan_characters(text)
         features['longitud_total'] = len(text)
         features['longitud_asunto'] = len(subject)
-        features['palabras_totales'] = len(text.split())
-        
-        # Conteo de caracteres especiales
-        features['signos_exclamacion'] = text.count('!')
-        features['signos_pregunta'] = text.count('?')
-        features['simbolos_dinero'] = text.count('$') + text.count('€') + text.count('£')
-        features['mayusculas_pct'] = sum(1 for c in text if c.isupper()) / max(len(text), 1) * 100
+        features['palabras_totales'] = char_stats['palabras_totales']
+        features['signos_exclamacion'] = char_stats['signos_exclamacion']
+        features['signos_pregunta'] = char_stats['signos_pregunta']
+        features['simbolos_dinero'] = char_stats['simbolos_dinero']
+        features['mayusculas_pct'] = char_stats['mayusculas'] / max(len(text), 1) * 100
+        clock.lap('caracteres')
         
         # HTML y URLs
-        features['tiene_html'] = bool(re.search(r'<[^>]+>', body))
-        features['num_urls'] = len(re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\$$\$$,]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', text))
+        features['tiene_html'] = HTML_RE.search(body) is not None
+        clock.lap('html')
+        features['num_urls'] = len(URL_RE.findall(text))
+        clock.lap('urls')
         
-        # Palabras clave de spam
-        spam_count = sum(1 for keyword in self.spam_keywords if keyword in text)
+        # Palabras clave de spam, legítimas y de urgencia en un solo buscador
+        spam_count, ham_count, urgency_count = matcher.count(text)
         features['palabras_spam'] = spam_count
-        
-        # Palabras clave legítimas
-        ham_count = sum(1 for keyword in self.ham_keywords if keyword in text)
         features['palabras_legitimas'] = ham_count
-        
-        # Urgencia
-        urgency_words = ['urgent', 'hurry', 'act now', 'limited time', 'urgente', 'rápido']
-        features['palabras_urgencia'] = sum(1 for word in urgency_words if word in text)
+        features['palabras_urgencia'] = urgency_count
+        clock.lap('palabras_clave')
         
         return features
     
+    def _extract_features_batch(self, subjects: pd.Series, bodies: pd.Series,
+                                texts: pd.Series, matcher: KeywordMatcher) -> pd.DataFrame:
+        """Extrae las mismas características que _extract_features para un lote completo"""
+        lengths = texts.str.len()
+        clock = _FeatureClock(self.feature_timing_hook)
+        
+        # Conteos por carácter: un recorrido NumPy por sub-lote en vez de uno por mensaje
+        text_list = texts.tolist()
+        partial_stats = [
+            scan_characters_batch(text_list[start:start + BATCH_CHUNK_SIZE])
+            for start in range(0, len(text_list), BATCH_CHUNK_SIZE)
+        ]
+        char_stats = {
+            key: np.concatenate([stats[key] for stats in partial_stats])
+            for key in partial_stats[0]
+        }
+        
+        # Columnas en un dict y un solo DataFrame al final: insertarlas una a una cuesta
+        # ~0,2 ms por columna, que domina en los lotes pequeños del micro-batcher
+        features = {}
+        
+        # Características básicas
+        features['longitud_total'] = lengths
+        features['longitud_asunto'] = subjects.str.len()
+        features['palabras_totales'] = char_stats['palabras_totales']
+        
+        # Conteo de caracteres especiales
+        features['signos_exclamacion'] = char_stats['signos_exclamacion']
+        features['signos_pregunta'] = char_stats['signos_pregunta']
+        features['simbolos_dinero'] = char_stats['simbolos_dinero']
+        features['mayusculas_pct'] = (
+            char_stats['mayusculas'].astype(np.float64) / np.maximum(lengths.to_numpy(), 1) * 100
+        )
+        clock.lap('caracteres')
+        
+        # HTML y URLs
+        features['tiene_html'] = bodies.str.contains(HTML_RE, regex=True)
+        clock.lap('html')
+        features['num_urls'] = texts.str.count(URL_RE)
+        clock.lap('urls')
+        
+        # Palabras clave: un recorrido por palabra distinta sobre todo el lote concatenado
+        joined = '\x00'.join(text_list)
+        starts = np.concatenate(([0], np.cumsum(lengths.to_numpy()[:-1] + 1)))
+        spam_counts, ham_counts, urgency_counts = matcher.count_batch(joined, starts)
+        features['palabras_spam'] = spam_counts
+        features['palabras_legitimas'] = ham_counts
+        features['palabras_urgencia'] = urgency_counts
+        clock.lap('palabras_clave')
+        
+        return pd.DataFrame(features, index=texts.index)
+    
+    def _keyword_key(self) -> tuple:
+        return (tuple(self.spam_keywords), tuple(self.ham_keywords))
+    
+    def _build_keyword_matcher(self, key: tuple) -> KeywordMatcher:
+        """Buscador compilado de las listas de key (copias: no cambia aunque cambien las listas)"""
+        spam_keywords, ham_keywords = key
+        return KeywordMatcher({
+            'palabras_spam': list(spam_keywords),
+            'palabras_legitimas': list(ham_keywords),
+            'palabras_urgencia': URGENCY_WORDS
+        })
+    
     def _calculate_spam_score(self, features: dict) -> float:
         """Calcula un score de spam basado en características"""
         score = 0.0
@@ -149,3 +453,21 @@ class SpamDetector:
         
         # Normalizar entre 0 y 1
         return max(0.0, min(1.0, score))
+    
+    def _calculate_spam_score_batch(self, features: pd.DataFrame) -> np.ndarray:
+        """Versión vectorizada de _calculate_spam_score (mismo orden de sumas)"""
+        spam_words = features['palabras_spam'].to_numpy()
+        score = np.zeros(len(features), dtype=np.float64)
+        
+        score += np.where(spam_words > 2, 0.3, np.where(spam_words > 0, 0.15, 0.0))
+        score += np.where(features['palabras_urgencia'].to_numpy() > 0, 0.2, 0.0)
+        score += np.where(features['mayusculas_pct'].to_numpy() > 30, 0.15, 0.0)
+        score += np.where(features['signos_exclamacion'].to_numpy() > 3, 0.1, 0.0)
+        score += np.where(features['simbolos_dinero'].to_numpy() > 2, 0.1, 0.0)
+        score += np.where(features['num_urls'].to_numpy() > 3, 0.15, 0.0)
+        score -= np.where(features['palabras_legitimas'].to_numpy() > 2, 0.2, 0.0)
+        
+        return np.clip(score, 0.0, 1.0)
+
+
+_MISSING = object()
@@ -0,0 +1,150 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import expit
+from typing import Iterable, Tuple
+from .hashing_tokenizer import HASH_FEATURES, HashingTokenizer, accumulate_counts
+
+# Suavizado de Laplace de los conteos de tokens por clase
+NB_ALPHA = 1.0
+
+
+class HashedNaiveBayes:
+    """Naive Bayes multinomial binario sobre conteos de tokens hasheados.
+
+    El estado suficiente son los documentos por clase y los conteos de cada
+    token hasheado por clase. De ellos sale un único vector de log-razones
+    log P(t|spam) - log P(t|ham), así que el log-odds de un mensaje es un
+    producto disperso de sus conteos por ese vector: cuesta lo mismo tenga el
+    corpus cien palabras distintas o cien millones.
+
+    La normalización de cada clase se guarda aparte (token_offset, por token
+    del mensaje) para que partial_fit solo recalcule las columnas que tocó el lote.
+    """
+
+    def __init__(self, n_features: int = HASH_FEATURES, alpha: float = NB_ALPHA,
+                 ngram_range: Tuple[int, int] = (1, 1)):
+        self.n_features = n_features
+        self.alpha = alpha
+        self.tokenizer = HashingTokenizer(n_features, ngram_range)
+        # Fila 0 = legítimo, fila 1 = spam
+        self.class_counts = np.zeros(2, dtype=np.float64)
+        self.feature_counts = np.zeros((2, n_features), dtype=np.float64)
+        # Tokens totales por clase (suma de cada fila de feature_counts)
+        self.token_totals = np.zeros(2, dtype=np.float64)
+        self.weights = np.zeros(n_features, dtype=np.float64)
+        self.token_offset = 0.0
+        self.bias = 0.0
+
+    @property
+    def is_fitted(self) -> bool:
+        """Hace falta al menos un documento de cada clase"""
+        return bool(self.class_counts.all())
+
+    def vectorize(self, texts: Iterable[str]) -> sp.csr_matrix:
+        """Matriz dispersa (mensajes x tokens hasheados) con los conteos de cada token"""
+        return self.tokenizer.transform(texts)
+
+    def fit(self, texts: Iterable[str], labels: Iterable[bool]) -> 'HashedNaiveBayes':
+        """Entrena desde cero leyendo los mensajes uno a uno"""
+        self.class_counts[:] = 0
+        self.feature_counts[:] = 0
+        self.token_totals[:] = 0
+        self.accumulate(texts, labels)
+        self.update_weights()
+        return self
+
+    def accumulate(self, texts: Iterable[str], labels: Iterable[bool]):
+        """Suma los mensajes a los conteos por clase; los pesos cambian con update_weights"""
+        rows = np.fromiter((bool(label) for label in labels), dtype=np.int64)
+        read = accumulate_counts(self.tokenizer, texts, rows, self.feature_counts)
+        if read != len(rows):
+            raise ValueError('textos y etiquetas deben tener la misma longitud')
+        self.class_counts += np.bincount(rows, minlength=2)
+        self.token_totals = self.feature_counts.sum(axis=1)
+
+    def partial_fit(self, texts: Iterable[str], labels: Iterable[bool],
+                    decay: float = 1.0) -> 'HashedNaiveBayes':
+        """Incorpora un lote a los conteos en O(lote); decay < 1 atenúa antes lo ya aprendido"""
+        if not 0.0 < decay <= 1.0:
+            raise ValueError('decay debe estar en (0, 1]')
+        if decay < 1.0:
+            self.decay(decay)
+
+        counts = self.vectorize(texts).tocoo()
+        labels = np.fromiter((bool(label) for label in labels), dtype=np.int64)
+        if counts.shape[0] != len(labels):
+            raise ValueError('textos y etiquetas deben tener la misma longitud')
+
+        classes = labels[counts.row]
+        np.add.at(self.feature_counts, (classes, counts.col), counts.data)
+        self.class_counts += np.bincount(labels, minlength=2)
+        self.token_totals += np.bincount(classes, weights=counts.data, minlength=2)
+        self._update_columns(np.unique(counts.col))
+        return self
+
+    def decay(self, factor: float):
+        """Multiplica todos los conteos por factor: los datos antiguos pesan menos.
+
+        Con suavizado cambian todas las log-razones, así que es O(n_features);
+        pensado para aplicarse de forma periódica, no en cada lote.
+        """
+        self.feature_counts *= factor
+        self.class_counts *= factor
+        self.token_totals *= factor
+        self.update_weights()
+
+    def update_weights(self):
+        """Recalcula log-razones y sesgo a partir de los conteos"""
+        self._update_columns(slice(None))
+
+    def _update_columns(self, columns):
+        """Log-razones de las columnas indicadas y términos globales (normalización y priors)"""
+        smoothed = self.feature_counts[:, columns] + self.alpha
+        self.weights[columns] = np.log(smoothed[1]) - np.log(smoothed[0])
+        totals = np.log(self.token_totals + self.alpha * self.n_features)
+        self.token_offset = float(totals[0] - totals[1])
+        log_priors = np.log(np.maximum(self.class_counts, 1.0))
+        self.bias = float(log_priors[1] - log_priors[0])
+
+    def decision_function(self, texts: Iterable[str]) -> np.ndarray:
+        """Log-odds de spam de cada mensaje"""
+        return _log_odds(self.vectorize(texts), self.weights, self.token_offset, self.bias)
+
+    def predict_proba(self, texts: Iterable[str]) -> np.ndarray:
+        """Probabilidad de spam de cada mensaje"""
+        return expit(self.decision_function(texts))
+
+    def freeze(self) -> 'FrozenNaiveBayes':
+        """Copia de solo lectura de lo que usa la predicción (pesos, normalización y sesgo).
+
+        Los conteos siguen cambiando con partial_fit; quien predice con la copia
+        no ve nunca unos pesos a medio actualizar.
+        """
+        weights = self.weights.copy()
+        weights.flags.writeable = False
+        return FrozenNaiveBayes(self.tokenizer, weights, self.token_offset, self.bias)
+
+
+class FrozenNaiveBayes:
+    """Clasificador publicado: inmutable, se comparte entre hilos sin locks"""
+
+    __slots__ = ('tokenizer', 'weights', 'token_offset', 'bias')
+
+    def __init__(self, tokenizer: HashingTokenizer, weights: np.ndarray, token_offset: float, bias: float):
+        self.tokenizer = tokenizer
+        self.weights = weights
+        self.token_offset = token_offset
+        self.bias = bias
+
+    def decision_function(self, texts: Iterable[str]) -> np.ndarray:
+        """Log-odds de spam de cada mensaje"""
+        return _log_odds(self.tokenizer.transform(texts), self.weights, self.token_offset, self.bias)
+
+    def predict_proba(self, texts: Iterable[str]) -> np.ndarray:
+        """Probabilidad de spam de cada mensaje"""
+        return expit(self.decision_function(texts))
+
+
+def _log_odds(counts: sp.csr_matrix, weights: np.ndarray, token_offset: float, bias: float) -> np.ndarray:
+    tokens = np.asarray(counts.sum(axis=1)).ravel()
+    return counts @ weights + tokens * token_offset + bias
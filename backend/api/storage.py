@@ -0,0 +1,145 @@
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:
+    # Windows (desarrollo): exclusive_lock solo serializa los hilos de este proceso
+    fcntl = None
+
+PathLike = Union[str, Path]
+
+# Arrays .npy ya mapeados por este proceso: ruta -> ((mtime, inodo, tamaño), memmap de solo
+# lectura), del menos al más reciente
+_shared_arrays: 'OrderedDict[str, Tuple[Tuple[int, int, int], np.ndarray]]' = OrderedDict()
+_shared_arrays_lock = threading.Lock()
+
+# Arrays mapeados que conserva cada proceso; los workers del pool viven mucho y, sin
+# límite, mantendrían mapeadas todas las matrices de características ya podadas
+MAX_SHARED_ARRAYS = 8
+
+# Permisos de los artefactos publicados (mkstemp crea los temporales con 0600)
+ARTIFACT_FILE_MODE = 0o644
+
+_local_lock = threading.Lock()
+
+
+def atomic_write_json(path: PathLike, payload: Any):
+    """Escribe JSON en un temporal del mismo directorio y lo publica con os.replace.
+
+    Un lector (de este u otro proceso) ve el archivo anterior completo o el nuevo
+    completo, nunca uno a medio escribir.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+            json.dump(payload, handle, ensure_ascii=False)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(tmp_path, ARTIFACT_FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+@contextmanager
+def exclusive_lock(path: PathLike) -> Iterator[None]:
+    """Lock exclusivo entre procesos (flock sobre path) mientras dura el bloque"""
+    if fcntl is None:
+        with _local_lock:
+            yield
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def read_json(path: PathLike) -> Optional[Any]:
+    """Lee un JSON o devuelve None si el archivo no existe"""
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def atomic_memmap(path: PathLike, shape: Tuple[int, ...], dtype=np.float32) -> Iterator[np.memmap]:
+    """Crea un .npy mapeado en memoria para rellenarlo por bloques y lo publica al salir.
+
+    El array se escribe en un temporal y solo se renombra a path si el bloque
+    termina sin errores, de modo que np.load(path, mmap_mode='r') nunca ve un
+    archivo incompleto.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    os.close(fd)
+    try:
+        array = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=shape)
+        yield array
+        array.flush()
+        del array
+        os.chmod(tmp_path, ARTIFACT_FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def atomic_save_npy(path: PathLike, array: np.ndarray):
+    """Guarda un array completo como .npy con la misma publicación atómica"""
+    with atomic_memmap(path, array.shape, array.dtype) as out:
+        out[...] = array
+
+
+def open_shared_array(path: PathLike) -> np.ndarray:
+    """Abre un .npy en modo solo lectura sin copiarlo; cada proceso lo mapea una sola vez.
+
+    La entrada se reutiliza mientras el archivo en esa ruta sea el mismo (mtime,
+    inodo y tamaño). Al mapear uno nuevo se sueltan las entradas cuyo archivo ya
+    no existe o cambió, y las más antiguas por encima de MAX_SHARED_ARRAYS.
+    """
+    key = str(path)
+    stamp = _file_stamp(key)
+    with _shared_arrays_lock:
+        entry = _shared_arrays.get(key)
+        if entry is not None and entry[0] == stamp:
+            _shared_arrays.move_to_end(key)
+            return entry[1]
+
+    array = np.load(key, mmap_mode='r')
+    with _shared_arrays_lock:
+        _shared_arrays[key] = (stamp, array)
+        _shared_arrays.move_to_end(key)
+        for other, (other_stamp, _) in list(_shared_arrays.items()):
+            if other != key and _file_stamp(other) != other_stamp:
+                del _shared_arrays[other]
+        while len(_shared_arrays) > MAX_SHARED_ARRAYS:
+            _shared_arrays.popitem(last=False)
+    return array
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+from typing import List, Union
+
+# Filas de un bloque: array (filas x columnas) o DataFrame
+Rows = Union[np.ndarray, pd.DataFrame]
+
+
+class FeatureStatsAccumulator:
+    """Acumulador en streaming de estadísticas y co-momentos por pares de columnas.
+
+    Mantiene, para cada par de columnas (i, j) y sobre las filas donde ambas tienen
+    valor: el conteo, la media de i, M2 de i (Welford) y el co-momento. La diagonal
+    da las estadísticas por columna y el resto las correlaciones con la misma
+    semántica de pares completos que DataFrame.corr(). Los acumuladores parciales
+    (por bloque o por proceso) se combinan con merge().
+    """
+
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        size = len(self.columns)
+        self.count = np.zeros((size, size))
+        self.mean = np.zeros((size, size))
+        self.m2 = np.zeros((size, size))
+        self.comoment = np.zeros((size, size))
+        self.minimum = np.full(size, np.inf)
+        self.maximum = np.full(size, -np.inf)
+
+    @classmethod
+    def from_array(cls, columns: List[str], values: np.ndarray) -> 'FeatureStatsAccumulator':
+        """Construye el acumulador de un bloque (filas x columnas, NaN = faltante)"""
+        acc = cls(columns)
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return acc
+
+        present = ~np.isnan(values)
+        weights = present.astype(np.float64)
+        acc.count = weights.T @ weights
+
+        # Desplazar por la media de cada columna antes de acumular productos
+        shift = _safe_divide(np.where(present, values, 0.0).sum(axis=0), np.diag(acc.count))
+        centered = np.where(present, values - shift, 0.0)
+
+        sums = centered.T @ weights
+        local_mean = _safe_divide(sums, acc.count)
+        acc.mean = local_mean + shift[:, None]
+        acc.m2 = (centered * centered).T @ weights - sums * local_mean
+        acc.comoment = centered.T @ centered - sums * local_mean.T
+
+        acc.minimum = np.where(present, values, np.inf).min(axis=0)
+        acc.maximum = np.where(present, values, -np.inf).max(axis=0)
+        return acc
+
+    def update(self, values: np.ndarray) -> 'FeatureStatsAccumulator':
+        """Incorpora un bloque de filas"""
+        return self.merge(FeatureStatsAccumulator.from_array(self.columns, values))
+
+    def merge(self, other: 'FeatureStatsAccumulator') -> 'FeatureStatsAccumulator':
+        """Combina otro acumulador con las mismas columnas (fórmulas de Chan)"""
+        if other.columns != self.columns:
+            raise ValueError('Los acumuladores deben tener las mismas columnas')
+
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        weight = _safe_divide(self.count * other.count, total)
+
+        self.mean = self.mean + delta * _safe_divide(other.count, total)
+        self.m2 = self.m2 + other.m2 + delta * delta * weight
+        self.comoment = self.comoment + other.comoment + delta * delta.T * weight
+        self.count = total
+        self.minimum = np.minimum(self.minimum, other.minimum)
+        self.maximum = np.maximum(self.maximum, other.maximum)
+        return self
+
+    def feature_stats(self, columns: List[str]) -> List[dict]:
+        """Media, desviación (ddof=1), mínimo y máximo de las columnas pedidas"""
+        stats = []
+        for col in columns:
+            i = self.columns.index(col)
+            n = self.count[i, i]
+            if n == 0:
+                continue
+            variance = self.m2[i, i] / (n - 1) if n > 1 else 0.0
+            stats.append({
+                'nombre': col,
+                'media': float(self.mean[i, i]),
+                'std': float(np.sqrt(max(variance, 0.0))),
+                'min': float(self.minimum[i]),
+                'max': float(self.maximum[i])
+            })
+        return stats
+
+    def correlation_matrix(self) -> np.ndarray:
+        """Correlación de Pearson por pares completos (NaN si una varianza es cero)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            denominator = np.sqrt(self.m2 * self.m2.T)
+            corr = np.where(denominator > 0, self.comoment / denominator, np.nan)
+        return np.clip(corr, -1.0, 1.0)
+
+    def top_correlations(self, limit: int = 4) -> List[dict]:
+        """Pares de columnas con mayor correlación absoluta"""
+        corr = self.correlation_matrix()
+        rows, cols = np.triu_indices(len(self.columns), k=1)
+        values = corr[rows, cols]
+        valid = ~np.isnan(values)
+        rows, cols, values = rows[valid], cols[valid], values[valid]
+
+        order = np.argsort(-np.abs(values), kind='stable')[:limit]
+        return [
+            {
+                'feature1': self.columns[rows[k]],
+                'feature2': self.columns[cols[k]],
+                'correlacion': float(values[k])
+            }
+            for k in order
+        ]
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator, dtype=np.float64),
+                     where=denominator > 0)
+
+
+class ReservoirSample:
+    """Muestra uniforme de filas de tamaño acotado ("bottom-k" sobre claves aleatorias).
+
+    Cada fila recibe una clave uniforme y se conservan las capacity de clave más
+    pequeña, lo que equivale a un muestreo sin reemplazo sobre todo el flujo. Si
+    el flujo tiene menos filas que capacity la muestra es exacta. Los bloques
+    pueden ser arrays o DataFrames; las filas conservan su orden de llegada.
+    """
+
+    def __init__(self, capacity: int, random_state: int = 42):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(random_state)
+        self.keys = np.empty(0)
+        self.values = None
+
+    def update(self, values: Rows) -> 'ReservoirSample':
+        """Incorpora un bloque de filas (filas x columnas)"""
+        keys = self.rng.random(len(values))
+        if len(self.keys) >= self.capacity:
+            # Con la muestra llena solo pueden entrar filas bajo el umbral actual
+            candidates = keys < self.keys.max()
+            values, keys = _take_rows(values, candidates), keys[candidates]
+
+        self.values = values if self.values is None else _concat_rows(self.values, values)
+        self.keys = np.concatenate([self.keys, keys])
+        if len(self.keys) > self.capacity:
+            keep = np.sort(np.argpartition(self.keys, self.capacity)[:self.capacity])
+            self.values, self.keys = _take_rows(self.values, keep), self.keys[keep]
+        return self
+
+
+def _take_rows(values: Rows, rows: np.ndarray) -> Rows:
+    return values.iloc[rows] if isinstance(values, pd.DataFrame) else values[rows]
+
+
+def _concat_rows(first: Rows, second: Rows) -> Rows:
+    if isinstance(first, pd.DataFrame):
+        return pd.concat([first, second])
+    return np.concatenate([first, second])
@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+from sklearn import metrics
+from api.classification_metrics import binary_classification_report, confusion_matrix, threshold_counts
+
+
+def make_scores(rows: int, seed: int = 0, decimals: int = 2):
+    """Scores redondeados para que haya muchos empates entre clases"""
+    rng = np.random.default_rng(seed)
+    labels = rng.random(rows) < 0.3
+    scores = np.clip(rng.normal(0.35 + 0.3 * labels, 0.2), 0, 1).round(decimals)
+    return scores, labels
+
+
+class BinaryClassificationReportTests(unittest.TestCase):
+
+    def test_auc_and_average_precision_match_sklearn(self):
+        for seed, decimals in [(0, 2), (1, 1), (2, 6)]:
+            scores, labels = make_scores(5_000, seed, decimals)
+            report = binary_classification_report(scores, labels)
+            self.assertAlmostEqual(report['curva_roc']['auc'],
+                                   round(metrics.roc_auc_score(labels, scores), 4), places=4)
+            self.assertAlmostEqual(report['curva_pr']['precision_media'],
+                                   round(metrics.average_precision_score(labels, scores), 4), places=4)
+
+    def test_threshold_metrics_match_sklearn(self):
+        scores, labels = make_scores(3_000)
+        report = binary_classification_report(scores, labels, threshold=0.5)
+        predictions = scores >= 0.5
+        self.assertEqual(report['matriz_confusion'], metrics.confusion_matrix(labels, predictions).tolist())
+        self.assertAlmostEqual(report['precision'], metrics.precision_score(labels, predictions), places=4)
+        self.assertAlmostEqual(report['recall'], metrics.recall_score(labels, predictions), places=4)
+        self.assertAlmostEqual(report['f1_score'], metrics.f1_score(labels, predictions), places=4)
+        self.assertAlmostEqual(report['accuracy'], metrics.accuracy_score(labels, predictions), places=4)
+
+    def test_curves_keep_endpoints_within_point_budget(self):
+        scores, labels = make_scores(5_000, decimals=6)
+        report = binary_classification_report(scores, labels, max_points=20)
+        roc = report['curva_roc']
+        self.assertLessEqual(len(roc['fpr']), 20)
+        self.assertEqual((roc['fpr'][0], roc['tpr'][0]), (0.0, 0.0))
+        self.assertEqual((roc['fpr'][-1], roc['tpr'][-1]), (1.0, 1.0))
+        self.assertEqual(report['curva_pr']['recall'][-1], 1.0)
+
+    def test_single_class_has_no_auc(self):
+        report = binary_classification_report(np.array([0.2, 0.9, 0.4]), np.zeros(3, dtype=bool))
+        self.assertIsNone(report['curva_roc']['auc'])
+
+
+class ThresholdCountsTests(unittest.TestCase):
+
+    def test_counts_match_sklearn_roc_points(self):
+        scores, labels = make_scores(2_000)
+        counts = threshold_counts(scores, labels)
+        # roc_curve antepone el punto (0, 0) con umbral infinito
+        fpr, tpr, thresholds = metrics.roc_curve(labels, scores, drop_intermediate=False)
+        np.testing.assert_array_equal(counts.thresholds, thresholds[1:])
+        np.testing.assert_allclose(counts.true_positives / counts.positives, tpr[1:])
+        np.testing.assert_allclose(counts.false_positives / counts.negatives, fpr[1:])
+
+    def test_rejects_mismatched_or_empty_input(self):
+        with self.assertRaises(ValueError):
+            threshold_counts(np.zeros(3), np.zeros(2))
+        with self.assertRaises(ValueError):
+            threshold_counts(np.zeros(0), np.zeros(0))
+
+    def test_confusion_matrix_matches_sklearn(self):
+        rng = np.random.default_rng(0)
+        labels, predictions = rng.integers(0, 3, 500), rng.integers(0, 3, 500)
+        np.testing.assert_array_equal(confusion_matrix(labels, predictions, num_classes=3),
+                                      metrics.confusion_matrix(labels, predictions))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import MinMaxScaler, RobustScaler
+from api.dataset_handler import DatasetHandler
+from api.feature_pipeline import FeaturePipeline
+from api.preprocessing import DataPreprocessor
+
+NUMERIC = ['duracion', 'bytes', 'tasa']
+CATEGORICAL = ['protocolo', 'servicio']
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'duracion': rng.exponential(50, rows),
+        'bytes': rng.lognormal(6, 2, rows),
+        'tasa': rng.random(rows),
+        'protocolo': rng.choice(['tcp', 'udp', 'icmp'], rows, p=[0.7, 0.2, 0.1]),
+        'servicio': rng.choice(['http', 'ftp', 'smtp', 'other'], rows),
+        'class': rng.choice(['normal', 'neptune', 'satan'], rows)
+    })
+    frame.loc[rng.random(rows) < 0.1, 'duracion'] = np.nan
+    frame.loc[rng.random(rows) < 0.05, 'servicio'] = None
+    return frame
+
+
+def chunks(frame: pd.DataFrame, size: int):
+    return (frame.iloc[start:start + size] for start in range(0, len(frame), size))
+
+
+class FeaturePipelineTests(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = make_frame(5_000)
+
+    def test_transform_matches_sklearn_steps(self):
+        pipeline = FeaturePipeline.fit(chunks(self.frame, 777), NUMERIC, CATEGORICAL)
+        out = pipeline.transform(self.frame)
+
+        # Con la muestra de cuantiles cubriendo todas las filas el ajuste es exacto
+        numeric = SimpleImputer(strategy='median').fit_transform(self.frame[NUMERIC])
+        numeric = MinMaxScaler().fit_transform(RobustScaler().fit_transform(numeric))
+        np.testing.assert_allclose(out[:, :len(NUMERIC)], numeric, atol=1e-6)
+
+        dummies = pd.get_dummies(self.frame[CATEGORICAL], dtype=np.float32)
+        columns = pipeline.output_columns[len(NUMERIC):]
+        self.assertEqual(sorted(columns), sorted(dummies.columns))
+        np.testing.assert_array_equal(out[:, len(NUMERIC):], dummies[columns].to_numpy())
+
+    def test_fit_does_not_depend_on_chunking(self):
+        whole = FeaturePipeline.fit([self.frame], NUMERIC, CATEGORICAL, fingerprint='x')
+        split = FeaturePipeline.fit(chunks(self.frame, 333), NUMERIC, CATEGORICAL, fingerprint='x')
+        self.assertEqual(whole.digest(), split.digest())
+
+    def test_unseen_categories_and_missing_values(self):
+        pipeline = FeaturePipeline.fit([self.frame], NUMERIC, CATEGORICAL)
+        new = self.frame.head(3).copy()
+        new['protocolo'] = 'sctp'
+        new['duracion'] = np.nan
+        out = pipeline.transform(new)
+        protocol = [i for i, col in enumerate(pipeline.output_columns) if col.startswith('protocolo_')]
+        self.assertFalse(out[:, protocol].any())
+        # La mediana imputada es 0 tras el escalado robusto
+        expected = (0.0 - pipeline.minimum[0]) / pipeline.data_range[0]
+        np.testing.assert_allclose(out[:, 0], expected)
+
+    def test_state_round_trip_keeps_digest(self):
+        pipeline = FeaturePipeline.fit([self.frame], NUMERIC, CATEGORICAL, fingerprint='abc')
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline.save(f'{tmp}/pipeline.json')
+            loaded = FeaturePipeline.load(f'{tmp}/pipeline.json')
+        self.assertEqual(loaded.digest(), pipeline.digest())
+        np.testing.assert_array_equal(loaded.transform(self.frame), pipeline.transform(self.frame))
+
+        # La huella no depende de cuándo se ajustó
+        refit = FeaturePipeline.fit([self.frame], NUMERIC, CATEGORICAL, fingerprint='abc')
+        refit.fitted_at = '2000-01-01T00:00:00+00:00'
+        self.assertEqual(refit.digest(), pipeline.digest())
+
+
+class PipelineReuseTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.handler = DatasetHandler()
+        self.handler.load_dataset(make_frame(2_000))
+
+    def test_reuses_fit_in_memory_and_across_processes(self):
+        preprocessor = DataPreprocessor(self.handler, self.tmp.name)
+        first, reused = preprocessor.get_pipeline()
+        self.assertFalse(reused)
+        self.assertEqual(first.fingerprint, self.handler.fingerprint())
+
+        again, reused = preprocessor.get_pipeline()
+        self.assertTrue(reused)
+        self.assertIs(again, first)
+
+        # Otro proceso sobre el mismo dataset y directorio carga el ajuste guardado
+        other, reused = DataPreprocessor(self.handler, self.tmp.name).get_pipeline()
+        self.assertTrue(reused)
+        self.assertEqual(other.digest(), first.digest())
+
+        refit, reused = preprocessor.get_pipeline(refit=True)
+        self.assertFalse(reused)
+        self.assertEqual(refit.digest(), first.digest())
+
+    def test_new_dataset_invalidates_fit(self):
+        preprocessor = DataPreprocessor(self.handler, self.tmp.name)
+        first, _ = preprocessor.get_pipeline()
+
+        self.handler.load_dataset(make_frame(2_000, seed=1))
+        second, reused = preprocessor.get_pipeline()
+        self.assertFalse(reused)
+        self.assertNotEqual(second.fingerprint, first.fingerprint)
+        self.assertNotEqual(second.digest(), first.digest())
+
+        # Volver al primer dataset recupera su ajuste del disco
+        self.handler.load_dataset(make_frame(2_000))
+        restored, reused = DataPreprocessor(self.handler, self.tmp.name).get_pipeline()
+        self.assertTrue(reused)
+        self.assertEqual(restored.digest(), first.digest())
+
+
+if __name__ == '__main__':
+    unittest.main()
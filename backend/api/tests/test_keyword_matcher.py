@@ -0,0 +1,109 @@
+import time
+import unittest
+from unittest import mock
+import numpy as np
+from api import keyword_matcher
+from api.keyword_matcher import KeywordMatcher
+from api.spam_detector import URGENCY_WORDS, SpamDetector
+
+# Palabras que no son clave pero comparten prefijos o contienen alguna
+FILLER = ['fre', 'freedom', 'cas', 'cashier', 'act', 'now', 'nowhere', 'reunió', 'urgen', 'ofertas',
+          'hola', 'the', 'de', 'y', 'ñandú', 'über', '€100', '🚀', 'naïve', 'ok']
+
+
+def keyword_groups() -> dict:
+    detector = SpamDetector()
+    return {
+        'palabras_spam': detector.spam_keywords,
+        'palabras_legitimas': detector.ham_keywords,
+        'palabras_urgencia': URGENCY_WORDS,
+        # Duplicados, palabras contenidas en otras, cortas (< 4 bytes) y de 4 bytes en UTF-8
+        'extra': ['free', 'free', 'free cash', 'ok', 'ñ', 'ñandú', '🚀', 'ación', 'ré', 'now here']
+    }
+
+
+def legacy_count(groups: dict, text: str) -> tuple:
+    """Recorrido original de spam_detector: una búsqueda por palabra y lista"""
+    return tuple(sum(1 for keyword in keywords if keyword in text) for keywords in groups.values())
+
+
+def make_texts(count: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    vocabulary = [keyword for keywords in keyword_groups().values() for keyword in keywords] + FILLER
+    texts = []
+    for _ in range(count):
+        words = rng.choice(vocabulary, size=rng.integers(0, 12))
+        # Sin separador a veces, para que las palabras aparezcan pegadas o partidas
+        texts.append(''.join(word + rng.choice([' ', '', '. ']) for word in words))
+    return texts
+
+
+def join(texts: list):
+    """Lote concatenado con '\\x00' igual que _extract_features_batch"""
+    lengths = np.array([len(text) for text in texts])
+    starts = np.concatenate(([0], np.cumsum(lengths[:-1] + 1))).astype(np.int64)
+    return '\x00'.join(texts), starts
+
+
+class KeywordMatcherTests(unittest.TestCase):
+
+    def setUp(self):
+        self.groups = keyword_groups()
+        self.matcher = KeywordMatcher(self.groups)
+        self.texts = make_texts(2_000)
+
+    def assert_batch_matches_legacy(self, texts: list):
+        joined, starts = join(texts)
+        counts = self.matcher.count_batch(joined, starts)
+        self.assertEqual(counts.shape, (len(self.groups), len(texts)))
+        expected = np.array([legacy_count(self.groups, text) for text in texts]).T
+        np.testing.assert_array_equal(counts, expected)
+
+    def test_count_matches_legacy_loop(self):
+        for text in self.texts:
+            self.assertEqual(self.matcher.count(text), legacy_count(self.groups, text), text)
+
+    def test_count_batch_matches_legacy_loop(self):
+        self.assertGreater(len(join(self.texts)[0]), keyword_matcher.ANCHOR_MIN_LENGTH)
+        self.assert_batch_matches_legacy(self.texts)
+
+    def test_small_batches_with_and_without_numpy_anchors(self):
+        for threshold in (keyword_matcher.ANCHOR_MIN_LENGTH, 0):
+            with mock.patch.object(keyword_matcher, 'ANCHOR_MIN_LENGTH', threshold):
+                for size in (1, 2, 7, 50):
+                    self.assert_batch_matches_legacy(self.texts[:size])
+                self.assert_batch_matches_legacy(['', 'free', '', 'ñandú🚀', ''])
+                self.assert_batch_matches_legacy(['', ''])
+
+    def test_keywords_do_not_match_across_messages(self):
+        for threshold in (keyword_matcher.ANCHOR_MIN_LENGTH, 0):
+            with mock.patch.object(keyword_matcher, 'ANCHOR_MIN_LENGTH', threshold):
+                self.assert_batch_matches_legacy(['fr', 'ee cash', 'free c', 'ash', 'ñan', 'dú'])
+
+    def test_empty_batch(self):
+        counts = self.matcher.count_batch('', np.zeros(0, dtype=np.int64))
+        self.assertEqual(counts.shape, (len(self.groups), 0))
+
+    def test_not_slower_than_legacy_loop(self):
+        # Con margen amplio para no fallar por ruido; una regresión como la alternancia
+        # regex (2-4 veces más lenta) sí lo supera
+        texts = [text * 20 for text in self.texts[:500]]
+        joined, starts = join(texts)
+
+        def best(function, repeat: int = 5) -> float:
+            times = []
+            for _ in range(repeat):
+                clock = time.perf_counter()
+                function()
+                times.append(time.perf_counter() - clock)
+            return min(times)
+
+        legacy = best(lambda: [legacy_count(self.groups, text) for text in texts])
+        single = best(lambda: [self.matcher.count(text) for text in texts])
+        batch = best(lambda: self.matcher.count_batch(joined, starts))
+        self.assertLess(single, legacy * 1.5)
+        self.assertLess(batch, legacy * 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
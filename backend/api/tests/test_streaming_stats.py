@@ -0,0 +1,111 @@
+import io
+import unittest
+import numpy as np
+import pandas as pd
+from api.dataset_handler import DatasetHandler
+from api.streaming_stats import FeatureStatsAccumulator, ReservoirSample
+
+COLUMNS = ['a', 'b', 'c', 'd', 'constante']
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Columnas correlacionadas, escalas muy distintas y NaN con patrones diferentes"""
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=rows)
+    frame = pd.DataFrame({
+        'a': base * 3 + 1e6,
+        'b': -2 * base + rng.normal(scale=0.5, size=rows),
+        'c': rng.exponential(scale=1e-3, size=rows),
+        'd': rng.integers(0, 10, size=rows).astype(np.float64),
+        'constante': np.full(rows, 7.0)
+    })
+    frame.loc[rng.random(rows) < 0.10, 'a'] = np.nan
+    frame.loc[rng.random(rows) < 0.30, 'b'] = np.nan
+    frame.loc[::7, 'c'] = np.nan
+    return frame
+
+
+class FeatureStatsAccumulatorTests(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = make_frame(12_345)
+        self.values = self.frame.to_numpy(dtype=np.float64)
+
+    def accumulate(self, block_sizes) -> FeatureStatsAccumulator:
+        acc = FeatureStatsAccumulator(COLUMNS)
+        start = 0
+        for size in block_sizes:
+            acc.update(self.values[start:start + size])
+            start += size
+        acc.update(self.values[start:])
+        return acc
+
+    def assert_matches_pandas(self, acc: FeatureStatsAccumulator, frame: pd.DataFrame):
+        stats = {row['nombre']: row for row in acc.feature_stats(COLUMNS)}
+        for col in COLUMNS:
+            np.testing.assert_allclose(stats[col]['media'], frame[col].mean(), rtol=1e-12)
+            np.testing.assert_allclose(stats[col]['std'], frame[col].std(), rtol=1e-9, atol=1e-12)
+            self.assertEqual(stats[col]['min'], frame[col].min())
+            self.assertEqual(stats[col]['max'], frame[col].max())
+        # Columna constante: varianza cero, correlación NaN igual que pandas
+        np.testing.assert_allclose(acc.correlation_matrix(), frame[COLUMNS].corr().to_numpy(),
+                                   rtol=0, atol=1e-10)
+
+    def test_single_block_matches_pandas(self):
+        self.assert_matches_pandas(FeatureStatsAccumulator.from_array(COLUMNS, self.values), self.frame)
+
+    def test_chan_merge_of_uneven_blocks_matches_pandas(self):
+        self.assert_matches_pandas(self.accumulate([1, 2, 997, 0, 5000, 3]), self.frame)
+
+    def test_merge_is_independent_of_block_order(self):
+        first = FeatureStatsAccumulator.from_array(COLUMNS, self.values[:4000])
+        second = FeatureStatsAccumulator.from_array(COLUMNS, self.values[4000:])
+        forward = FeatureStatsAccumulator(COLUMNS).merge(first).merge(second)
+        backward = FeatureStatsAccumulator(COLUMNS).merge(second).merge(first)
+        np.testing.assert_allclose(forward.mean, backward.mean, rtol=1e-12)
+        np.testing.assert_allclose(forward.comoment, backward.comoment, rtol=1e-9, atol=1e-9)
+
+    def test_merge_rejects_different_columns(self):
+        with self.assertRaises(ValueError):
+            FeatureStatsAccumulator(COLUMNS).merge(FeatureStatsAccumulator(COLUMNS[:-1]))
+
+    def test_top_correlations_skip_undefined_pairs(self):
+        acc = FeatureStatsAccumulator.from_array(COLUMNS, self.values)
+        top = acc.top_correlations(limit=2)
+        self.assertEqual((top[0]['feature1'], top[0]['feature2']), ('a', 'b'))
+        self.assertTrue(all('constante' not in (row['feature1'], row['feature2']) for row in top))
+
+    def test_csv_stream_stats_match_pandas(self):
+        frame = make_frame(20_000, seed=1)
+        frame['class'] = np.where(frame['d'] > 4, 'anomaly', 'normal')
+        csv = frame.to_csv(index=False)
+
+        handler = DatasetHandler()
+        summary = handler.load_csv_stream(io.StringIO(csv), chunksize=3_000, max_rows_in_memory=1_000)
+        # Las estadísticas son del archivo completo aunque en memoria quede solo la muestra
+        self.assertEqual(summary['filas_en_memoria'], 1_000)
+        self.assert_matches_pandas(handler.snapshot().stats, pd.read_csv(io.StringIO(csv)))
+
+
+class ReservoirSampleTests(unittest.TestCase):
+
+    def test_keeps_everything_below_capacity(self):
+        sample = ReservoirSample(100, random_state=0)
+        sample.update(np.arange(30).reshape(-1, 1)).update(np.arange(30, 50).reshape(-1, 1))
+        np.testing.assert_array_equal(sample.values[:, 0], np.arange(50))
+
+    def test_dataframe_sample_is_uniform_subset(self):
+        frame = pd.DataFrame({'x': np.arange(10_000)})
+        sample = ReservoirSample(500, random_state=0)
+        for start in range(0, len(frame), 999):
+            sample.update(frame.iloc[start:start + 999])
+        values = sample.values['x'].to_numpy()
+        self.assertEqual(len(values), 500)
+        self.assertEqual(len(np.unique(values)), 500)
+        np.testing.assert_array_equal(sample.values.index.to_numpy(), values)
+        # Una muestra uniforme cubre el archivo entero, no solo los primeros bloques
+        self.assertLess(abs(values.mean() - 5_000), 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import sys
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List
+
+# Clases de carácter que distingue el escáner (índices en la tabla de conteos)
+OTHER, SPACE, EXCLAMATION, QUESTION, MONEY, UPPERCASE = range(6)
+NUM_CLASSES = 6
+
+STAT_KEYS = ('palabras_totales', 'signos_exclamacion', 'signos_pregunta', 'simbolos_dinero', 'mayusculas')
+
+
+@lru_cache(maxsize=1)
+def char_class_table() -> np.ndarray:
+    """Tabla code point -> clase; se construye una sola vez por proceso"""
+    table = np.zeros(sys.maxunicode + 1, dtype=np.uint8)
+
+    for char in filter(str.isspace, map(chr, range(sys.maxunicode + 1))):
+        table[ord(char)] = SPACE
+    # Los textos llegan en minúsculas: solo cuentan las mayúsculas que sobreviven a lower()
+    for char in filter(str.isupper, map(chr, range(sys.maxunicode + 1))):
+        for c in char.lower():
+            if c.isupper():
+                table[ord(c)] = UPPERCASE
+
+    table[ord('!')] = EXCLAMATION
+    table[ord('?')] = QUESTION
+    for symbol in '$€£':
+        table[ord(symbol)] = MONEY
+    return table
+
+
+def _code_points(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode('utf-32-le', errors='surrogatepass'), dtype=np.uint32)
+
+
+def _stats_from_counts(counts: np.ndarray, words: np.ndarray) -> Dict[str, np.ndarray]:
+    return {
+        'palabras_totales': words,
+        'signos_exclamacion': counts[..., EXCLAMATION],
+        'signos_pregunta': counts[..., QUESTION],
+        'simbolos_dinero': counts[..., MONEY],
+        'mayusculas': counts[..., UPPERCASE],
+    }
+
+
+def scan_characters(text: str) -> Dict[str, int]:
+    """Cuenta palabras, signos, símbolos de dinero y mayúsculas en una sola pasada"""
+    if not text:
+        return dict.fromkeys(STAT_KEYS, 0)
+
+    classes = char_class_table()[_code_points(text)]
+    counts = np.bincount(classes, minlength=NUM_CLASSES)
+
+    # Una palabra empieza en un no-espacio precedido de espacio o del inicio del texto
+    space = classes == SPACE
+    words = np.count_nonzero(space[:-1] & ~space[1:]) + (not space[0])
+
+    return {key: int(value) for key, value in _stats_from_counts(counts, words).items()}
+
+
+@lru_cache(maxsize=1)
+def _ascii_class_bytes() -> bytes:
+    """Tabla de traducción byte -> clase para los lotes ASCII (bytes.translate)"""
+    return bytes(char_class_table()[:256].tolist())
+
+
+def scan_characters_batch(texts: List[str]) -> Dict[str, np.ndarray]:
+    """Versión por lotes de scan_characters sobre un único array de clases.
+
+    Cada mensaje va entre espacios al unirlos, así que toda palabra empieza tras un
+    espacio de su propio mensaje. Las palabras se suman por tramos con reduceat y
+    los signos, escasos, se asignan a su mensaje por posición.
+    """
+    n = len(texts)
+    if n == 0:
+        return _stats_from_counts(np.zeros((0, NUM_CLASSES), dtype=np.int64), np.zeros(0, dtype=np.int64))
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=n)
+    begins = 1 + np.concatenate(([0], np.cumsum(lengths + 1)))[:-1]
+    joined = ' ' + ' '.join(texts) + ' '
+
+    # Texto ASCII (lo habitual): un byte por carácter y la tabla aplicada en C
+    if joined.isascii():
+        classes = np.frombuffer(joined.encode('ascii').translate(_ascii_class_bytes()), dtype=np.uint8)
+    else:
+        classes = char_class_table()[_code_points(joined)]
+
+    # word_start[k]: empieza palabra en la posición k + 1; el tramo de cada mensaje
+    # termina en su separador, que nunca empieza palabra
+    space = classes == SPACE
+    word_start = space[:-1] & ~space[1:]
+    words = np.add.reduceat(word_start.view(np.uint8), begins - 1, dtype=np.int32)
+
+    # Clases por encima de SPACE: signos, dinero y mayúsculas
+    marked = np.flatnonzero(classes > SPACE)
+    segments = np.searchsorted(begins, marked, side='right') - 1
+    counts = np.bincount(
+        segments * NUM_CLASSES + classes[marked], minlength=n * NUM_CLASSES
+    ).reshape(n, NUM_CLASSES)
+
+    return _stats_from_counts(counts, words)
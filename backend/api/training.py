@@ -0,0 +1,117 @@
+import time
+import numpy as np
+from concurrent.futures import wait
+from typing import Tuple
+from .classification_metrics import binary_classification_report
+from .cross_validation import get_process_pool
+from .estimators import binary_targets, build_estimator, negative_class_code
+from .jobs import CANCELLING, Job, JobCancelled
+from .model_evaluator import ModelEvaluator
+from .model_registry import ModelRegistry
+from .preprocessing import DataPreprocessor
+from .storage import open_shared_array
+
+# Fracción del dataset reservada para evaluar el modelo entrenado
+TRAINING_TEST_RATIO = 0.2
+
+# Cada cuánto se comprueba la cancelación mientras un proceso entrena (segundos)
+CANCEL_POLL_INTERVAL = 0.25
+
+
+def fit_and_score(features: np.ndarray, targets: np.ndarray, train_index: np.ndarray,
+                  test_index: np.ndarray, model_key: str, random_state: int) -> Tuple[object, np.ndarray, float]:
+    """Entrena con train_index y devuelve el modelo, los scores de test y los ms de entrenamiento"""
+    start = time.perf_counter()
+    model = build_estimator(model_key, random_state)
+    model.fit(features[train_index], targets[train_index])
+    fit_ms = (time.perf_counter() - start) * 1000
+    scores = model.predict_proba(features[test_index])[:, 1]
+    return model, scores, fit_ms
+
+
+def _fit_and_score_from_files(features_path: str, labels_path: str, negative_code: int,
+                              train_index: np.ndarray, test_index: np.ndarray, model_key: str,
+                              random_state: int) -> Tuple[object, np.ndarray, float]:
+    """Punto de entrada en el proceso trabajador: la matriz se mapea desde disco"""
+    features = open_shared_array(features_path)
+    targets = binary_targets(open_shared_array(labels_path), negative_code)
+    return fit_and_score(features, targets, train_index, test_index, model_key, random_state)
+
+
+def train_model(job: Job, preprocessor: DataPreprocessor, evaluator: ModelEvaluator,
+                registry: ModelRegistry, model_key: str, random_state: int = 42,
+                test_ratio: float = TRAINING_TEST_RATIO) -> dict:
+    """Trabajo de entrenamiento: prepara los datos, entrena en el pool de procesos, evalúa
+    y publica la nueva versión en el registro (activándola si aún no hay modelo activo).
+
+    El ajuste corre en otro proceso, así que el hilo del trabajo solo espera y los
+    endpoints de predicción del servidor no compiten con él por el GIL.
+    """
+    start = time.perf_counter()
+    job.report(0.05, 'Preparando matriz de características')
+    # Matriz, pipeline y particiones de la misma carga aunque entretanto se publique otra
+    snapshot = preprocessor.dataset_handler.snapshot()
+    matrix = preprocessor.get_feature_matrix(snapshot)
+    pipeline, _ = preprocessor.get_pipeline(snapshot=snapshot)
+    split = preprocessor.get_split_indices(1.0 - test_ratio, 0.0, True, random_state, snapshot)
+    train_index = np.concatenate([split.train, split.validation])
+    negative_code = negative_class_code(matrix.class_names)
+    prepare_ms = (time.perf_counter() - start) * 1000
+
+    job.report(0.2, 'Entrenando modelo')
+    if matrix.path is not None:
+        future = get_process_pool().submit(
+            _fit_and_score_from_files, str(matrix.path), str(matrix.labels_path), negative_code,
+            train_index, split.test, model_key, random_state
+        )
+        while not wait([future], timeout=CANCEL_POLL_INTERVAL).done:
+            if job.cancel_requested and job.status != CANCELLING:
+                if future.cancel():
+                    raise JobCancelled()
+                # Un ajuste ya en marcha en el pool no se puede interrumpir: el trabajo
+                # conserva su plaza hasta que el proceso termine, para no sobreasignar CPUs
+                job.mark_cancelling('Cancelando: esperando a que termine el proceso de entrenamiento')
+        if job.cancel_requested:
+            raise JobCancelled()
+        model, scores, fit_ms = future.result()
+    else:
+        targets = binary_targets(matrix.labels, negative_code)
+        model, scores, fit_ms = fit_and_score(matrix.features, targets, train_index, split.test,
+                                              model_key, random_state)
+
+    job.report(0.9, 'Evaluando en el conjunto de prueba')
+    eval_start = time.perf_counter()
+    test_labels = binary_targets(matrix.labels[split.test], negative_code)
+    report = binary_classification_report(scores, test_labels)
+    evaluator.register_predictions(model_key, scores, test_labels)
+    eval_ms = (time.perf_counter() - eval_start) * 1000
+
+    job.report(0.95, 'Guardando el modelo en el registro')
+    summary = {
+        'nombre': evaluator.models_data[model_key]['nombre'],
+        'metricas': {
+            'precision': report['precision'],
+            'recall': report['recall'],
+            'f1_score': report['f1_score'],
+            'exactitud': report['accuracy'],
+            'auc': report['curva_roc']['auc']
+        },
+        'dataset': {
+            'huella': pipeline.fingerprint,
+            'version': snapshot.version,
+            'registros': pipeline.rows
+        },
+        'pipeline': pipeline.digest(),
+        'muestras_entrenamiento': len(train_index),
+        'muestras_prueba': len(split.test),
+        'caracteristicas': len(matrix.columns),
+        'tiempos_ms': {
+            'preparacion': round(prepare_ms, 1),
+            'entrenamiento': round(fit_ms, 1),
+            'evaluacion': round(eval_ms, 1)
+        }
+    }
+    meta = registry.save(model_key, model, pipeline, summary)
+    if registry.get_active() is None:
+        registry.activate(meta['id'])
+    return meta
@@ -1,19 +1,31 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Con ASGI las rutas de uso intensivo usan las vistas async (el resto sigue siendo síncrono)
+heavy = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.api_root, name='api-root'),
     path('health/', views.health_check, name='health-check'),
-    path('spam/predict/', views.spam_predict, name='spam-predict'),
-    path('dataset/info/', views.dataset_info, name='dataset-info'),
-    path('dataset/visualizations/', views.dataset_visualizations, name='dataset-visualizations'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('spam/predict/', heavy.spam_predict, name='spam-predict'),
+    path('spam/predict/batch/', heavy.spam_predict_batch, name='spam-predict-batch'),
+    path('spam/train/', heavy.spam_train, name='spam-train'),
+    path('spam/feedback/', views.spam_feedback, name='spam-feedback'),
+    path('spam/cache/', views.spam_cache_stats, name='spam-cache-stats'),
+    path('dataset/info/', heavy.dataset_info, name='dataset-info'),
+    path('dataset/visualizations/', heavy.dataset_visualizations, name='dataset-visualizations'),
     path('preprocessing/split/', views.preprocessing_split, name='preprocessing-split'),
     path('preprocessing/transform/', views.preprocessing_transform, name='preprocessing-transform'),
-    path('model/metrics/', views.model_metrics, name='model-metrics'),
+    path('model/metrics/', heavy.model_metrics, name='model-metrics'),
     path('model/compare/', views.model_compare, name='model-compare'),
-    path('dataset/upload/', views.upload_dataset, name='upload-dataset'),
+    path('dataset/upload/', heavy.upload_dataset, name='upload-dataset'),
     path('dataset/status/', views.dataset_status, name='dataset-status'),
     path('model/train/', views.train_model, name='train-model'),
+    path('model/train/<str:job_id>/', views.training_status, name='training-status'),
+    path('model/train/<str:job_id>/cancel/', views.cancel_training, name='cancel-training'),
     path('model/list/', views.list_trained_models, name='list-trained-models'),
     path('model/load/', views.load_trained_model, name='load-trained-model'),
+    path('model/predict/', views.model_predict, name='model-predict'),
 ]
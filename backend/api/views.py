@@ -1,17 +1,180 @@
+import hashlib
+import time
+import pandas as pd
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import ParseError
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework import status
 from datetime import datetime
+from typing import List, Optional, Tuple
 from .spam_detector import SpamDetector
-from .dataset_handler import DatasetHandler
+from .dataset_handler import DatasetHandler, SCATTER_SAMPLE_SIZE
 from .preprocessing import DataPreprocessor
 from .model_evaluator import ModelEvaluator
+from .classification_metrics import CURVE_POINTS
+from .estimators import resolve_model_key
+from .jobs import JobManager, JobQueueFull
+from .model_registry import ModelRegistry
+from .metrics import registry as metrics_registry
+from . import training
 
 # Inicializar handlers
 spam_detector = SpamDetector()
-dataset_handler = DatasetHandler()
-preprocessor = DataPreprocessor()
-model_evaluator = ModelEvaluator()
+dataset_handler = DatasetHandler(settings.ML_ARTIFACTS_DIR / 'dataset_store')
+preprocessor = DataPreprocessor(dataset_handler, settings.ML_ARTIFACTS_DIR)
+job_manager = JobManager()
+model_evaluator = ModelEvaluator(preprocessor, job_manager)
+model_registry = ModelRegistry(settings.ML_ARTIFACTS_DIR / 'models')
+
+# Tiempos internos de los handlers en el registro de métricas
+spam_detector.feature_timing_hook = metrics_registry.stage_hook('handler_duration_seconds', handler='spam')
+preprocessor.timing_hook = metrics_registry.stage_hook('handler_duration_seconds', handler='preprocesamiento')
+
+# Límite de mensajes por petición en la predicción por lotes
+MAX_SPAM_BATCH_SIZE = 10000
+
+# Límite de puntos del scatter plot por petición
+MAX_SCATTER_SAMPLE_SIZE = 20000
+
+# Límite de puntos por curva ROC/PR en las métricas de un modelo
+MAX_CURVE_POINTS = 1000
+
+# Límite de registros por petición de predicción con el modelo activo
+MAX_MODEL_PREDICT_ROWS = 10000
+
+# Validación y cálculo compartidos por estas vistas y las async (async_views.py): las
+# dos rutas aceptan los mismos cuerpos y devuelven las mismas respuestas y errores
+
+def request_data(request) -> dict:
+    """Cuerpo parseado con los parsers de REST Framework (JSON, formulario o multipart).
+    
+    Un cuerpo malformado o que no es un objeto es un ValueError (400).
+    """
+    if not isinstance(request, Request):
+        request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+    try:
+        data = request.data
+    except ParseError as e:
+        raise ValueError(str(e.detail))
+    if not isinstance(data, dict):
+        raise ValueError('El cuerpo de la petición debe ser un objeto JSON')
+    return data
+
+def _parse_bool(value) -> bool:
+    """Interpreta un flag del cuerpo: "false" o "0" (formulario o JSON como texto) es falso"""
+    return str(value).strip().lower() in ('1', 'true', 'yes')
+
+def spam_message(data: dict) -> Tuple[str, str]:
+    """Asunto y cuerpo de un correo; ValueError si faltan o no son texto"""
+    subject = data.get('subject', '')
+    body = data.get('body', '')
+    if not subject and not body:
+        raise ValueError('Se requiere asunto o cuerpo del correo')
+    if not isinstance(subject, str) or not isinstance(body, str):
+        raise ValueError('El asunto y el cuerpo deben ser texto')
+    return subject, body
+
+def spam_messages(data: dict) -> Tuple[List[str], List[str]]:
+    """Asuntos y cuerpos de la lista messages de una predicción por lotes"""
+    messages = data.get('messages')
+    if not isinstance(messages, list) or not messages:
+        raise ValueError('Se requiere una lista no vacía de mensajes')
+    if len(messages) > MAX_SPAM_BATCH_SIZE:
+        raise ValueError(f'El lote no puede superar {MAX_SPAM_BATCH_SIZE} mensajes')
+    
+    subjects = []
+    bodies = []
+    for message in messages:
+        if not isinstance(message, dict):
+            raise ValueError('Cada mensaje debe ser un objeto con asunto y/o cuerpo')
+        subject = message.get('subject') or ''
+        body = message.get('body') or ''
+        if not isinstance(subject, str) or not isinstance(body, str):
+            raise ValueError('El asunto y el cuerpo deben ser texto')
+        if not subject and not body:
+            raise ValueError('Se requiere asunto o cuerpo en cada correo')
+        subjects.append(subject)
+        bodies.append(body)
+    return subjects, bodies
+
+def spam_feedback_messages(data: dict) -> Tuple[List[str], List[str], List[bool], float]:
+    """Correos etiquetados (es_spam) y decaimiento de una petición de feedback"""
+    subjects, bodies = spam_messages(data)
+    labels = [message.get('es_spam') for message in data['messages']]
+    if not all(isinstance(label, bool) for label in labels):
+        raise ValueError('Cada correo debe indicar es_spam (true/false)')
+    decay = data.get('decay', 1.0)
+    if isinstance(decay, bool) or not isinstance(decay, (int, float)) or not 0 < decay <= 1:
+        raise ValueError('decay debe ser un número en (0, 1]')
+    return subjects, bodies, labels, float(decay)
+
+def uploaded_file(request):
+    """Archivo del campo file (parsea el multipart); ValueError si no se envió"""
+    if 'file' not in request.FILES:
+        raise ValueError('No se proporcionó ningún archivo')
+    return request.FILES['file']
+
+def visualization_params(query) -> Tuple[int, Optional[str], Optional[str]]:
+    """Tamaño de muestra y ejes del scatter plot pedidos en la query"""
+    try:
+        sample_size = int(query.get('muestra', SCATTER_SAMPLE_SIZE))
+    except ValueError:
+        sample_size = -1
+    if not 0 < sample_size <= MAX_SCATTER_SAMPLE_SIZE:
+        raise ValueError(f'muestra debe ser un entero entre 1 y {MAX_SCATTER_SAMPLE_SIZE}')
+    return sample_size, query.get('x'), query.get('y')
+
+def metrics_params(query) -> Tuple[str, int]:
+    """Modelo y puntos por curva pedidos en la query"""
+    model_name = query.get('model', 'logistic_regression')
+    max_points = int(query.get('puntos', CURVE_POINTS))
+    if not 2 <= max_points <= MAX_CURVE_POINTS:
+        raise ValueError(f'puntos debe estar entre 2 y {MAX_CURVE_POINTS}')
+    return model_name, max_points
+
+def spam_batch_payload(subjects: List[str], bodies: List[str]) -> dict:
+    results = spam_detector.predict_batch(subjects, bodies)
+    return {
+        'resultados': results,
+        'total': len(results)
+    }
+
+def spam_train_payload(file) -> dict:
+    # Lectura por bloques: los mensajes se tokenizan sin cargar todo el CSV
+    summary = spam_detector.load_training_stream(file)
+    return {
+        'mensaje': 'Clasificador de spam entrenado exitosamente',
+        'nombre': file.name,
+        'resumen': summary
+    }
+
+def upload_dataset_payload(file) -> dict:
+    # Lectura por bloques directamente sobre el archivo subido
+    with metrics_registry.timer('handler_duration_seconds', handler='dataset', etapa='carga_csv'):
+        summary = dataset_handler.load_csv_stream(file)
+    return {
+        'mensaje': 'Dataset cargado exitosamente',
+        'nombre': file.name,
+        'resumen': summary
+    }
+
+def dataset_info_payload() -> dict:
+    with metrics_registry.timer('handler_duration_seconds', handler='dataset', etapa='info'):
+        return dataset_handler.get_info()
+
+def dataset_visualizations_payload(sample_size: int, x_col: Optional[str], y_col: Optional[str]) -> dict:
+    with metrics_registry.timer('handler_duration_seconds', handler='dataset', etapa='visualizaciones'):
+        return dataset_handler.get_visualizations(sample_size, x_col, y_col)
+
+def model_metrics_payload(model_name: str, max_points: int) -> dict:
+    with metrics_registry.timer('handler_duration_seconds', handler='evaluacion', etapa='metricas'):
+        return model_evaluator.get_metrics(model_name, max_points)
 
 @api_view(['GET'])
 def api_root(request):
@@ -25,7 +188,12 @@ def api_root(request):
         'descripcion': 'Plataforma de análisis con datos de ejemplo de NSL-KDD y detección de spam',
         'endpoints': {
             'health_check': '/api/health/',
+            'metricas': '/api/metrics/',
             'deteccion_spam': '/api/spam/predict/',
+            'deteccion_spam_lote': '/api/spam/predict/batch/',
+            'entrenar_spam': '/api/spam/train/',
+            'reportar_spam': '/api/spam/feedback/',
+            'cache_spam': '/api/spam/cache/',
             'info_dataset': '/api/dataset/info/',
             'visualizaciones_dataset': '/api/dataset/visualizations/',
             'preprocesamiento_split': '/api/preprocessing/split/',
@@ -35,11 +203,20 @@ def api_root(request):
             'subir_dataset': '/api/dataset/upload/',
             'estado_dataset': '/api/dataset/status/',
             'entrenar_modelo': '/api/model/train/',
+            'estado_entrenamiento': '/api/model/train/<id>/',
+            'cancelar_entrenamiento': '/api/model/train/<id>/cancel/',
             'listar_modelos': '/api/model/list/',
-            'cargar_modelo': '/api/model/load/'
+            'cargar_modelo': '/api/model/load/',
+            'predecir_modelo': '/api/model/predict/'
         }
     })
 
+@api_view(['GET'])
+def metrics_view(request):
+    """Métricas del proceso (latencias por ruta, errores, tiempos internos) en formato Prometheus"""
+    return HttpResponse(metrics_registry.render_prometheus(),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @api_view(['GET'])
 def health_check(request):
     return Response({
@@ -49,44 +226,136 @@ def health_check(request):
 
 @api_view(['POST'])
 def spam_predict(request):
-    """Detecta si un correo es spam usando el clasificador entrenado"""
+    """Detecta si un correo es spam usando el clasificador entrenado.
+
+    Sin micro-batching: con WSGI cada worker atiende una petición a la vez;
+    la agrupación solo existe en la vista async (ASGI).
+    """
     try:
-        subject = request.data.get('subject', '')
-        body = request.data.get('body', '')
-        
-        if not subject and not body:
-            return Response(
-                {'error': 'Se requiere asunto o cuerpo del correo'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
+        subject, body = spam_message(request_data(request))
         result = spam_detector.predict(subject, body)
         return Response(result)
     
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['POST'])
+def spam_predict_batch(request):
+    """Detecta spam en un lote de correos con una sola pasada vectorizada"""
+    try:
+        subjects, bodies = spam_messages(request_data(request))
+        return Response(spam_batch_payload(subjects, bodies))
+    
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         return Response(
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['POST'])
+def spam_train(request):
+    """Entrena el clasificador de spam con un CSV de mensajes etiquetados"""
+    try:
+        return Response(spam_train_payload(uploaded_file(request)))
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['POST'])
+def spam_feedback(request):
+    """Incorpora correos etiquetados al clasificador de spam sin reentrenarlo completo"""
+    try:
+        subjects, bodies, labels, decay = spam_feedback_messages(request_data(request))
+        summary = spam_detector.partial_fit(subjects, bodies, labels, decay)
+        return Response({
+            'mensaje': 'Correos incorporados al clasificador de spam',
+            'resumen': summary
+        })
+    
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+def spam_cache_stats(request):
+    """Estadísticas de la caché de predicciones de spam"""
+    try:
+        return Response(spam_detector.cache_stats())
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+def _dataset_last_modified(request):
+    return dataset_handler.last_modified
+
+def _dataset_info_etag(request):
+    return f'info-{dataset_handler.etag_token()}'
+
+def _dataset_visualizations_etag(request):
+    try:
+        params = visualization_params(request.GET)
+    except ValueError:
+        # Sin ETag: la vista responde el 400
+        return None
+    # Los parámetros ya validados, resumidos: el ETag no lleva texto arbitrario de la query
+    digest = hashlib.blake2b(repr(params).encode('utf-8')).hexdigest()[:16]
+    return f'viz-{dataset_handler.etag_token()}-{digest}'
+
+@cache_control(no_cache=True)
+@condition(etag_func=_dataset_info_etag, last_modified_func=_dataset_last_modified)
 @api_view(['GET'])
 def dataset_info(request):
     """Obtiene información del dataset NSL-KDD"""
     try:
-        info = dataset_handler.get_info()
-        return Response(info)
+        return Response(dataset_info_payload())
     except Exception as e:
         return Response(
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@cache_control(no_cache=True)
+@condition(etag_func=_dataset_visualizations_etag, last_modified_func=_dataset_last_modified)
 @api_view(['GET'])
 def dataset_visualizations(request):
     """Obtiene datos para visualizaciones del dataset NSL-KDD"""
     try:
-        visualizations = dataset_handler.get_visualizations()
-        return Response(visualizations)
+        sample_size, x_col, y_col = visualization_params(request.query_params)
+        return Response(dataset_visualizations_payload(sample_size, x_col, y_col))
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         return Response(
             {'error': str(e)},
@@ -100,14 +369,20 @@ def preprocessing_split(request):
         train_ratio = float(request.data.get('train_ratio', 0.6))
         val_ratio = float(request.data.get('val_ratio', 0.2))
         test_ratio = float(request.data.get('test_ratio', 0.2))
-        stratified = request.data.get('stratified', True)
+        stratified = _parse_bool(request.data.get('stratified', True))
         random_state = int(request.data.get('random_state', 42))
+        include_indices = _parse_bool(request.data.get('include_indices', False))
         
         result = preprocessor.split_dataset(
-            train_ratio, val_ratio, test_ratio, stratified, random_state
+            train_ratio, val_ratio, test_ratio, stratified, random_state, include_indices
         )
         return Response(result)
     
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         return Response(
             {'error': str(e)},
@@ -118,7 +393,8 @@ def preprocessing_split(request):
 def preprocessing_transform(request):
     """Aplica transformaciones al dataset (escalado, encoding, etc)"""
     try:
-        result = preprocessor.transform_data()
+        refit = _parse_bool(request.data.get('refit', False))
+        result = preprocessor.transform_data(refit)
         return Response(result)
     except Exception as e:
         return Response(
@@ -130,9 +406,10 @@ def preprocessing_transform(request):
 def model_metrics(request):
     """Obtiene métricas de evaluación de un modelo específico"""
     try:
-        model_name = request.query_params.get('model', 'logistic_regression')
-        metrics = model_evaluator.get_metrics(model_name)
-        return Response(metrics)
+        model_name, max_points = metrics_params(request.query_params)
+        return Response(model_metrics_payload(model_name, max_points))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response(
             {'error': str(e)},
@@ -155,17 +432,12 @@ def model_compare(request):
 def upload_dataset(request):
     """Carga un dataset (CSV) para ser procesado"""
     try:
-        if 'file' not in request.FILES:
-            return Response(
-                {'error': 'No se proporcionó ningún archivo'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        file = request.FILES['file']
-        return Response({
-            'mensaje': 'Archivo recibido',
-            'nombre': file.name
-        })
+        return Response(upload_dataset_payload(uploaded_file(request)))
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         return Response(
             {'error': str(e)},
@@ -189,30 +461,68 @@ def dataset_status(request):
 
 @api_view(['POST'])
 def train_model(request):
-    """Inicia el entrenamiento de un modelo"""
+    """Encola el entrenamiento de un modelo y devuelve el id del trabajo"""
     try:
         model_type = request.data.get('model_type', 'logistic_regression')
+        model_key = resolve_model_key(model_type)
+        random_state = int(request.data.get('random_state', 42))
+        
+        job = job_manager.submit(
+            'entrenamiento', f'Entrenamiento de {model_key}',
+            lambda job: training.train_model(job, preprocessor, model_evaluator, model_registry,
+                                             model_key, random_state)
+        )
         return Response({
             'mensaje': f'Entrenamiento iniciado para: {model_type}',
             'status': 'training_started',
+            'trabajo_id': job.id,
+            'estado_url': f'/api/model/train/{job.id}/',
             'timestamp': datetime.now().isoformat()
-        })
+        }, status=status.HTTP_202_ACCEPTED)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except JobQueueFull as e:
+        return Response({'error': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
     except Exception as e:
         return Response(
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET'])
+def training_status(request, job_id):
+    """Estado, progreso, tiempo transcurrido y métricas finales de un entrenamiento"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return Response({'error': 'Trabajo no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job.to_dict())
+
+@api_view(['POST'])
+def cancel_training(request, job_id):
+    """Solicita la cancelación de un entrenamiento en cola o en curso"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return Response({'error': 'Trabajo no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job.to_dict())
+
 @api_view(['GET'])
 def list_trained_models(request):
     """Lista todos los modelos entrenados disponibles"""
     try:
+        active = model_registry.get_active()
+        models = [
+            {
+                **meta,
+                'tipo': meta['nombre'],
+                'accuracy': meta['metricas']['exactitud'],
+                'activo': active is not None and active.meta['id'] == meta['id']
+            }
+            for meta in model_registry.list_models()
+        ]
         return Response({
-            'modelos': [
-                {'id': 'v1_logistic', 'tipo': 'Logistic Regression', 'accuracy': 0.95},
-                {'id': 'v1_forest', 'tipo': 'Random Forest', 'accuracy': 0.98}
-            ],
-            'total': 2,
+            'modelos': models,
+            'total': len(models),
+            'modelo_activo': active.meta['id'] if active else None,
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -231,12 +541,65 @@ def load_trained_model(request):
                 {'error': 'Se requiere el ID del modelo a cargar'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-            
+        
+        start = time.perf_counter()
+        loaded = model_registry.activate(model_id)
         return Response({
             'mensaje': f'Modelo {model_id} cargado exitosamente',
             'status': 'loaded',
+            'modelo': loaded.meta,
+            'tiempo_carga_ms': round((time.perf_counter() - start) * 1000, 2),
             'timestamp': datetime.now().isoformat()
         })
+    except KeyError:
+        return Response(
+            {'error': f'No existe el modelo {model_id}'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['POST'])
+def model_predict(request):
+    """Predice con el modelo activo sobre registros con las columnas originales del dataset"""
+    try:
+        records = request.data.get('registros')
+        if not isinstance(records, list) or not records:
+            return Response(
+                {'error': 'Se requiere una lista no vacía de registros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(records) > MAX_MODEL_PREDICT_ROWS:
+            return Response(
+                {'error': f'Máximo {MAX_MODEL_PREDICT_ROWS} registros por petición'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not all(isinstance(record, dict) for record in records):
+            return Response(
+                {'error': 'Cada registro debe ser un objeto'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Una sola lectura de la referencia: un cambio de modelo no afecta a esta petición
+        model = model_registry.get_active()
+        if model is None:
+            return Response(
+                {'error': 'No hay ningún modelo activo; entrene o cargue uno'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        scores = model.predict_proba(pd.DataFrame.from_records(records))
+        return Response({
+            'modelo': model.meta['id'],
+            'predicciones': [
+                {'es_ataque': score >= 0.5, 'probabilidad_ataque': round(score, 4)}
+                for score in scores.tolist()
+            ],
+            'total': len(records)
+        })
     except Exception as e:
         return Response(
             {'error': str(e)},
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""Microbenchmark del buscador de palabras clave frente al recorrido por palabra.
+
+Uso: python benchmarks/keyword_matcher.py [--caracteres N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.spam_detector import SpamDetector, URGENCY_WORDS  # noqa: E402
+
+BODY_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def _synthetic_text(rng: random.Random, vocabulary: list, size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(vocabulary)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)[:size]
+
+
+def _legacy_counts(detector: SpamDetector, text: str) -> tuple:
+    """Recorrido original: un `keyword in text` por cada entrada de cada lista"""
+    return (
+        sum(1 for keyword in detector.spam_keywords if keyword in text),
+        sum(1 for keyword in detector.ham_keywords if keyword in text),
+        sum(1 for word in URGENCY_WORDS if word in text),
+    )
+
+
+def _time_per_call(func, text: str, repetitions: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        func(text)
+    return (time.perf_counter() - start) / repetitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--caracteres', type=int, default=2_000_000,
+                        help='caracteres totales a procesar por medición')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    letters = 'abcdefghijklmnopqrstuvwxyzáéíóúñ'
+    vocabulary = [''.join(rng.choice(letters) for _ in range(rng.randint(2, 10))) for _ in range(5000)]
+    vocabulary += ['free', 'meeting', 'the', 'and', 'offer', 'regards', 'http://example.com', '<br>']
+
+    # Listas ampliadas con 40 palabras extra (con duplicados) para medir un buscador más grande
+    detector = SpamDetector()
+    detector.spam_keywords.extend(rng.sample(vocabulary, 18) + ['free', 'offer'])
+    detector.ham_keywords.extend(rng.sample(vocabulary, 18) + ['meeting', 'regards'])
+    matcher = detector.snapshot().keyword_matcher
+
+    print(f'Palabras clave: {len(detector.spam_keywords) + len(detector.ham_keywords) + len(URGENCY_WORDS)} '
+          f'entradas, {len(matcher.keywords)} distintas')
+    print(f'{"tamaño":>10} {"original (us)":>15} {"buscador (us)":>15} {"aceleración":>12}')
+
+    for size in BODY_SIZES:
+        text = _synthetic_text(rng, vocabulary, size).lower()
+        assert matcher.count(text) == _legacy_counts(detector, text)
+
+        repetitions = max(1, args.caracteres // size)
+        legacy = _time_per_call(lambda t: _legacy_counts(detector, t), text, repetitions)
+        compiled = _time_per_call(matcher.count, text, repetitions)
+        print(f'{size:>10} {legacy * 1e6:>15.1f} {compiled * 1e6:>15.1f} {legacy / compiled:>11.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+"""Suite de benchmarks de las rutas críticas del API (spam, dataset, división y métricas).
+
+Los datos sintéticos se generan con semillas fijas, así que dos ejecuciones miden
+exactamente el mismo trabajo. El resultado se escribe como JSON y puede compararse
+con una ejecución anterior para detectar regresiones.
+
+Uso:
+    python benchmarks/run.py [--rapido] [--filtro TEXTO] [--salida resultados.json]
+                             [--comparar base.json] [--tolerancia 0.2]
+    python manage.py benchmark ...   (mismas opciones)
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from api.classification_metrics import binary_classification_report  # noqa: E402
+from api.dataset_handler import DatasetHandler, SCATTER_SAMPLE_SIZE  # noqa: E402
+from api.preprocessing import DataPreprocessor  # noqa: E402
+from api.spam_detector import SpamDetector  # noqa: E402
+
+# Versión del formato del JSON de resultados
+RESULTS_FORMAT_VERSION = 1
+
+# Tamaños de cuerpo de correo (caracteres) y de lote de la predicción por lotes
+SPAM_BODY_SIZES = (1_000, 10_000, 100_000)
+SPAM_BATCH_SIZE = 1_000
+
+# Filas del dataset sintético; el modo rápido omite el millón
+DATASET_SIZES = (10_000, 100_000, 1_000_000)
+QUICK_DATASET_SIZES = (10_000, 100_000)
+
+# Predicciones de las métricas de clasificación
+METRIC_SIZES = (17_000, 125_000)
+
+# Repeticiones máximas y segundos de medición por caso (lo que se alcance antes)
+DEFAULT_REPETITIONS = 20
+TIME_BUDGET_SECONDS = 3.0
+
+# Aumento relativo de la mediana a partir del cual un caso se marca como regresión
+DEFAULT_TOLERANCE = 0.20
+
+SEED = 42
+
+
+class Benchmark(NamedTuple):
+    """Caso de la suite: setup() prepara los datos y devuelve la función a medir"""
+    name: str
+    setup: Callable[[], Callable[[], object]]
+
+
+def _synthetic_messages(count: int, size: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    vocabulary = ['free', 'cash', 'prize', 'click', 'meeting', 'report', 'regards', 'the', 'and',
+                  'offer', 'http://example.com/promo', '<b>', 'URGENT!!!', '$$$', 'reunión', 'gracias']
+    vocabulary += [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(2, 9)))
+                   for _ in range(2000)]
+    messages = []
+    for _ in range(count):
+        words = []
+        length = 0
+        while length < size:
+            word = rng.choice(vocabulary)
+            words.append(word)
+            length += len(word) + 1
+        messages.append(' '.join(words)[:size])
+    return messages
+
+
+_dataframes: Dict[int, pd.DataFrame] = {}
+
+
+def _synthetic_dataset(rows: int) -> pd.DataFrame:
+    """NSL-KDD simulado remuestreado (con reemplazo y semilla fija) hasta rows filas"""
+    if rows not in _dataframes:
+        base = DatasetHandler()._generate_simulated_dataframe(SEED)
+        frame = base.sample(n=rows, replace=rows > len(base), random_state=SEED).reset_index(drop=True)
+        frame['attack_type'] = frame['attack_type'].astype(str)
+        _dataframes[rows] = frame
+    return _dataframes[rows]
+
+
+def _loaded_handler(rows: int) -> DatasetHandler:
+    handler = DatasetHandler()
+    handler.load_dataset(_synthetic_dataset(rows))
+    return handler
+
+
+def _spam_predict(size: int):
+    detector = SpamDetector()
+    subject, body = 'Oferta', _synthetic_messages(1, size, SEED)[0]
+    # Sin caché: se mide la extracción de características y el score
+    return lambda: detector._predict_uncached(subject, body)
+
+
+def _spam_predict_cached():
+    detector = SpamDetector()
+    body = _synthetic_messages(1, 1_000, SEED)[0]
+    detector.predict('Oferta', body)
+    return lambda: detector.predict('Oferta', body)
+
+
+def _spam_predict_batch(size: int):
+    detector = SpamDetector()
+    bodies = _synthetic_messages(SPAM_BATCH_SIZE, size, SEED)
+    subjects = ['Oferta'] * len(bodies)
+    return lambda: detector._predict_batch_uncached(subjects, bodies)
+
+
+def _dataset_load_csv(rows: int):
+    data = _synthetic_dataset(rows).to_csv(index=False).encode('utf-8')
+    return lambda: DatasetHandler().load_csv_stream(io.BytesIO(data))
+
+
+def _dataset_stats(rows: int):
+    frame = _synthetic_dataset(rows)
+    return lambda: DatasetHandler().load_dataset(frame)
+
+
+def _dataset_visualizations(rows: int):
+    handler = _loaded_handler(rows)
+    snapshot = handler.snapshot()
+    return lambda: handler._build_visualizations(snapshot, SCATTER_SAMPLE_SIZE,
+                                                 *handler._scatter_axes(snapshot, None, None))
+
+
+def _preprocessing_split(rows: int):
+    preprocessor = DataPreprocessor(_loaded_handler(rows))
+    preprocessor.dataset_handler.get_label_codes()
+    return lambda: preprocessor._compute_split(0.6, 0.2, True, SEED)
+
+
+def _classification_report(size: int):
+    rng = np.random.default_rng(SEED)
+    labels = rng.random(size) < 0.47
+    scores = 1.0 / (1.0 + np.exp(-(rng.normal(0.0, 1.0, size) + 2.0 * labels - 1.0)))
+    return lambda: binary_classification_report(scores, labels)
+
+
+def build_suite(quick: bool = False) -> List[Benchmark]:
+    """Casos de la suite en orden de ejecución"""
+    dataset_sizes = QUICK_DATASET_SIZES if quick else DATASET_SIZES
+    suite = [Benchmark(f'spam.predict[cuerpo={size}]', lambda size=size: _spam_predict(size))
+             for size in SPAM_BODY_SIZES]
+    suite.append(Benchmark('spam.predict_cache[cuerpo=1000]', _spam_predict_cached))
+    suite += [Benchmark(f'spam.predict_batch[lote={SPAM_BATCH_SIZE},cuerpo={size}]',
+                        lambda size=size: _spam_predict_batch(size))
+              for size in SPAM_BODY_SIZES[:2]]
+    for rows in dataset_sizes:
+        suite += [
+            Benchmark(f'dataset.load_csv[filas={rows}]', lambda rows=rows: _dataset_load_csv(rows)),
+            Benchmark(f'dataset.stats[filas={rows}]', lambda rows=rows: _dataset_stats(rows)),
+            Benchmark(f'dataset.visualizations[filas={rows}]', lambda rows=rows: _dataset_visualizations(rows)),
+            Benchmark(f'preprocessing.split[filas={rows}]', lambda rows=rows: _preprocessing_split(rows)),
+        ]
+    suite += [Benchmark(f'metrics.report[predicciones={size}]', lambda size=size: _classification_report(size))
+              for size in METRIC_SIZES]
+    return suite
+
+
+def measure(func: Callable[[], object], repetitions: int = DEFAULT_REPETITIONS,
+            budget: float = TIME_BUDGET_SECONDS) -> dict:
+    """Tiempos en ms de hasta `repetitions` llamadas (tras una de calentamiento) dentro del presupuesto"""
+    start = time.perf_counter()
+    func()
+    warmup = time.perf_counter() - start
+
+    # Si el calentamiento ya agota el presupuesto se usa como única muestra
+    samples = [warmup] if warmup >= budget else []
+    deadline = time.perf_counter() + (0.0 if samples else budget)
+    while len(samples) < repetitions and not (samples and time.perf_counter() >= deadline):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+
+    samples_ms = [sample * 1000 for sample in samples]
+    return {
+        'mediana_ms': round(statistics.median(samples_ms), 4),
+        'min_ms': round(min(samples_ms), 4),
+        'media_ms': round(statistics.fmean(samples_ms), 4),
+        'repeticiones': len(samples_ms)
+    }
+
+
+def environment() -> dict:
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'plataforma': platform.platform(),
+        'nucleos': os.cpu_count()
+    }
+
+
+def run_suite(suite: List[Benchmark], repetitions: int, budget: float,
+              name_filter: Optional[str] = None, out=sys.stdout) -> dict:
+    results = {}
+    for benchmark in suite:
+        if name_filter and name_filter not in benchmark.name:
+            continue
+        func = benchmark.setup()
+        results[benchmark.name] = measure(func, repetitions, budget)
+        _write(out, f'{benchmark.name:<50} {results[benchmark.name]["mediana_ms"]:>12.3f} ms '
+              f'({results[benchmark.name]["repeticiones"]} rep.)')
+    return {
+        'formato': RESULTS_FORMAT_VERSION,
+        'fecha': datetime.now(timezone.utc).isoformat(),
+        'entorno': environment(),
+        'resultados': results
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE, out=sys.stdout) -> List[str]:
+    """Compara medianas con la línea base; devuelve los casos que empeoraron más de tolerance"""
+    if baseline.get('entorno') != current.get('entorno'):
+        _write(out, 'Aviso: la línea base se midió en otro entorno; las diferencias pueden no ser del código')
+
+    regressions = []
+    _write(out, f'{"caso":<50} {"base (ms)":>12} {"actual (ms)":>12} {"cambio":>9}')
+    for name, result in current['resultados'].items():
+        base = baseline.get('resultados', {}).get(name)
+        if base is None:
+            _write(out, f'{name:<50} {"-":>12} {result["mediana_ms"]:>12.3f} {"nuevo":>9}')
+            continue
+        ratio = result['mediana_ms'] / base['mediana_ms'] if base['mediana_ms'] else float('inf')
+        flag = ''
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = '  REGRESIÓN'
+        _write(out, f'{name:<50} {base["mediana_ms"]:>12.3f} {result["mediana_ms"]:>12.3f} '
+              f'{(ratio - 1) * 100:>+8.1f}%{flag}')
+    return regressions
+
+
+def _write(out, line: str):
+    """Una línea completa por escritura (vale para sys.stdout y para la salida de manage.py)"""
+    out.write(line + '\n')
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--rapido', action='store_true', help='omitir los casos de 1M de filas')
+    parser.add_argument('--filtro', default=None, help='ejecutar solo los casos cuyo nombre contenga el texto')
+    parser.add_argument('--repeticiones', type=int, default=DEFAULT_REPETITIONS,
+                        help='repeticiones máximas por caso')
+    parser.add_argument('--presupuesto', type=float, default=TIME_BUDGET_SECONDS,
+                        help='segundos de medición por caso')
+    parser.add_argument('--salida', default=None, help='archivo JSON donde guardar los resultados')
+    parser.add_argument('--comparar', default=None, help='JSON de una ejecución anterior (línea base)')
+    parser.add_argument('--tolerancia', type=float, default=DEFAULT_TOLERANCE,
+                        help='aumento relativo de la mediana tolerado antes de marcar regresión')
+
+
+def execute(options: dict, out=sys.stdout) -> int:
+    """Ejecuta la suite con las opciones de add_arguments; devuelve 1 si hay regresiones"""
+    results = run_suite(build_suite(options['rapido']), options['repeticiones'],
+                        options['presupuesto'], options['filtro'], out)
+
+    if options['salida']:
+        with open(options['salida'], 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2, ensure_ascii=False)
+        _write(out, f'Resultados guardados en {options["salida"]}')
+
+    if options['comparar']:
+        with open(options['comparar'], encoding='utf-8') as handle:
+            baseline = json.load(handle)
+        regressions = compare(results, baseline, options['tolerancia'], out)
+        if regressions:
+            _write(out, f'{len(regressions)} caso(s) con regresión: {", ".join(regressions)}')
+            return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    sys.exit(execute(vars(parser.parse_args())))
+
+
+if __name__ == '__main__':
+    main()
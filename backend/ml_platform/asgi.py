@@ -0,0 +1,10 @@
+import os
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ml_platform.settings')
+# Rutas de uso intensivo con vistas async (api/async_views.py)
+os.environ.setdefault('ASYNC_VIEWS', 'True')
+
+# Los estáticos (admin, API navegable) se sirven aquí en lugar de con WhiteNoise
+application = ASGIStaticFilesHandler(get_asgi_application())
@@ -10,6 +10,14 @@ DEBUG = os.environ.get('DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
+# Vistas async en las rutas de uso intensivo; lo activa ml_platform/asgi.py
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
+# Micro-batching de spam_predict: ventana (ms, 0 lo desactiva) y tamaño máximo del lote.
+# Solo se aplica con ASGI (ASYNC_VIEWS); la vista WSGI puntúa cada petición por separado
+SPAM_MICRO_BATCH_WINDOW_MS = float(os.environ.get('SPAM_MICRO_BATCH_WINDOW_MS', '2'))
+SPAM_MICRO_BATCH_MAX_SIZE = int(os.environ.get('SPAM_MICRO_BATCH_MAX_SIZE', '256'))
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -23,6 +31,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',  # Latencias y conteos por ruta (/api/metrics/)
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Para servir archivos estáticos en producción
@@ -34,6 +43,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if ASYNC_VIEWS:
+    # WhiteNoise solo funciona en modo síncrono y obligaría a Django a ejecutar
+    # las vistas async en un hilo; con ASGI los estáticos los sirve asgi.py
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'ml_platform.urls'
 
 TEMPLATES = [
@@ -89,6 +103,10 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Artefactos de ML (pipelines ajustados, matrices de características, modelos),
+# compartidos por todos los workers que apunten al mismo directorio
+ML_ARTIFACTS_DIR = Path(os.environ.get('ML_ARTIFACTS_DIR', BASE_DIR / 'artifacts'))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOWED_ORIGINS = os.environ.get(
@@ -113,7 +131,8 @@ REST_FRAMEWORK = {
 }
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50 MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50 MB
+# Archivos mayores se vuelcan a disco y se leen por bloques (ver DatasetHandler.load_csv_stream)
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5 MB
 
 if not DEBUG:
     SECURE_SSL_REDIRECT = True